@@ -2,7 +2,7 @@ from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks, WebSocket,
 import os
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 import logging
 import uuid
 import asyncio
@@ -14,6 +14,7 @@ import json
 from collections import defaultdict
 from concurrent.futures import ThreadPoolExecutor
 import functools
+import threading
 
 from src.models.request_models import TripPlanRequest, VoiceEditRequest, VoiceEditResponse, EditSuggestionsResponse
 from src.models.response_models import TripPlanResponse
@@ -30,6 +31,7 @@ from src.utils.validators import TripRequestValidator
 from src.utils.formatters import ResponseFormatter
 from src.utils.firestore_manager import FirestoreManager
 from src.utils.firebase_auth import initialize_firebase_admin, verify_firebase_token, is_firebase_initialized
+from src.utils.log_context import LogContextFilter
 
 # Configure logging
 logging.basicConfig(
@@ -37,6 +39,9 @@ logging.basicConfig(
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 )
 logger = logging.getLogger(__name__)
+# Attach per-request context (trip_id, destination) bound during generation to every record
+for _handler in logging.getLogger().handlers:
+    _handler.addFilter(LogContextFilter())
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -44,7 +49,8 @@ app = FastAPI(
     description="Generate comprehensive travel itineraries using Google Vertex AI Gemini Flash and Google Places API",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse
 )
 
 # Add middleware
@@ -92,6 +98,41 @@ websocket_rate_limits: Dict[str, List[datetime]] = defaultdict(list)
 # This prevents long-running tasks from blocking the event loop
 executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="trip_gen")
 
+# One long-lived event loop per executor thread. Unlike asyncio.run(), which builds and
+# tears down a loop per trip, these survive between trips, so the per-loop pooled clients
+# (Places HTTP/2, Vertex async) keep their keep-alive connections for the worker's lifetime.
+_worker_loop_local = threading.local()
+_worker_loops: List[asyncio.AbstractEventLoop] = []
+
+
+def _run_on_worker_loop(coro):
+    """Run a coroutine to completion on the calling executor thread's persistent loop."""
+    loop = getattr(_worker_loop_local, "loop", None)
+    if loop is None:
+        loop = asyncio.new_event_loop()
+        _worker_loop_local.loop = loop
+        _worker_loops.append(loop)
+    return loop.run_until_complete(coro)
+
+
+def _close_worker_loops() -> None:
+    """Close pooled clients bound to the worker loops, then the loops (after executor shutdown)."""
+    while _worker_loops:
+        loop = _worker_loops.pop()
+        try:
+            # Each service keeps its HTTP client / gRPC channel per loop
+            for service in (places_service, photo_service, vertex_ai_service):
+                if service:
+                    try:
+                        loop.run_until_complete(service.close())
+                    except Exception as e:
+                        logger.warning(f"Error closing client on worker event loop: {str(e)}")
+            loop.run_until_complete(loop.shutdown_default_executor())
+        except Exception as e:
+            logger.warning(f"Error closing worker event loop: {str(e)}")
+        finally:
+            loop.close()
+
 # Rate limiting config
 MAX_MESSAGES_PER_MINUTE = 10
 WEBSOCKET_TIMEOUT_SECONDS = 300  # 5 minutes
@@ -169,8 +210,23 @@ async def shutdown_event():
     if executor:
         logger.info("Shutting down thread pool executor...")
         executor.shutdown(wait=True, cancel_futures=False)
+        # The worker loops are idle now; close them off this (running) loop's thread
+        await asyncio.to_thread(_close_worker_loops)
         logger.info("Thread pool executor shut down successfully")
     
+    # Close pooled HTTP clients and the Vertex async channel of the server loop
+    for service in (places_service, photo_service, vertex_ai_service):
+        if service:
+            try:
+                await service.close()
+            except Exception as e:
+                logger.warning(f"Error closing HTTP client: {str(e)}")
+    if travel_service:
+        try:
+            travel_service.close()
+        except Exception as e:
+            logger.warning(f"Error closing HTTP client: {str(e)}")
+    
     # Close any remaining WebSocket connections
     for conn_id, ws in list(active_websocket_connections.items()):
         try:
@@ -298,14 +354,15 @@ async def generate_trip_plan(
         
         # Validate the request
         validation_result = TripRequestValidator.validate_complete_request(req)
-        logger.debug(
-            "[generate-trip] Validation completed",
-            extra={
-                "valid": validation_result.get("valid"),
-                "errors_count": len(validation_result.get("errors", [])),
-                "warnings_count": len(validation_result.get("warnings", []))
-            }
-        )
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "[generate-trip] Validation completed",
+                extra={
+                    "valid": validation_result.get("valid"),
+                    "errors_count": len(validation_result.get("errors", [])),
+                    "warnings_count": len(validation_result.get("warnings", []))
+                }
+            )
         
         if not validation_result['valid']:
             # If proxy flow, write failed status to Firestore and return 400
@@ -406,7 +463,7 @@ async def generate_trip_plan(
                 trip_response = await loop.run_in_executor(
                     executor,
                     functools.partial(
-                        asyncio.run,
+                        _run_on_worker_loop,
                         itinerary_generator.generate_comprehensive_plan(local_req, local_trip_id)
                     )
                 )
@@ -439,7 +496,10 @@ async def generate_trip_plan(
                         
                         # Create public trip copy (non-blocking, best-effort)
                         try:
-                            await itinerary_generator.create_and_save_public_trip(trip_response, local_req, fs_manager)
+                            await itinerary_generator.create_and_save_public_trip(
+                                trip_response, local_req, fs_manager,
+                                request_json=request_json, itinerary_json=itinerary_json,
+                            )
                             # Enrich public trip with photos
                             await _enrich_trip_with_photos(local_trip_id, True)
                         except Exception as pub_e:
@@ -551,7 +611,7 @@ async def get_trip_plan(trip_id: str):
                     response_data = trip_plan.get('response') or trip_plan.get('response_data')
                 if not response_data:
                     raise HTTPException(status_code=404, detail="Trip plan not found")
-                return TripPlanResponse(**response_data)
+                return TripPlanResponse.model_validate(response_data)
 
         # No SQL fallback; if Firestore not used or not found, return 404
         raise HTTPException(status_code=404, detail="Trip plan not found")
@@ -592,7 +652,7 @@ async def regenerate_trip_plan(
             raise HTTPException(status_code=404, detail="Trip plan not found")
         
         # Generate new plan
-        updated_trip = await itinerary_generator.generate_comprehensive_plan(request, trip_id)
+        updated_trip = await itinerary_generator.generate_comprehensive_plan(request, trip_id, use_cache=False)
         
         # Persist updated plan (non-blocking)
         try:
@@ -606,7 +666,10 @@ async def regenerate_trip_plan(
                 )
                 # Update public copy as well (non-blocking)
                 try:
-                    await itinerary_generator.create_and_save_public_trip(updated_trip, request, fs_manager)
+                    await itinerary_generator.create_and_save_public_trip(
+                        updated_trip, request, fs_manager,
+                        request_json=req_json, itinerary_json=upd_json,
+                    )
                 except Exception as pub_e:
                     logger.warning("Public trip save failed (non-blocking)", extra={"trip_id": trip_id, "error": str(pub_e)})
         except Exception as persist_e:
@@ -647,9 +710,7 @@ async def validate_trip_request(request: TripPlanRequest):
     """Validate trip request without generating a plan"""
     try:
         validation_result = TripRequestValidator.validate_complete_request(request)
-        print("🚀 ~ validation_result:", validation_result)
         suggestions = TripRequestValidator.suggest_improvements(request)
-        print("🚀 ~ suggestions:", suggestions)
         return {
             "valid": validation_result['valid'],
             "errors": validation_result['errors'],
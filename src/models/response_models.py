@@ -1,8 +1,17 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator, model_validator
 from datetime import date, datetime
 from typing import List, Optional, Dict, Any
 from decimal import Decimal
 
+# Places API / model price level names -> 0-4 scale
+_PRICE_LEVEL_NAMES = {
+    "PRICE_LEVEL_FREE": 0,
+    "PRICE_LEVEL_INEXPENSIVE": 1,
+    "PRICE_LEVEL_MODERATE": 2,
+    "PRICE_LEVEL_EXPENSIVE": 3,
+    "PRICE_LEVEL_VERY_EXPENSIVE": 4,
+}
+
 class TravelLegResponse(BaseModel):
     mode: str  # flight, train, bus, cab, ferry
     from_location: Optional[str] = None
@@ -19,6 +28,19 @@ class TravelOptionResponse(BaseModel):
     booking_link: Optional[str] = None
     legs: List[TravelLegResponse] = Field(default_factory=list)
 
+    @model_validator(mode="before")
+    @classmethod
+    def _fill_modes(cls, data: Any) -> Any:
+        # The model often omits modes; legs inherit the option's mode and stray entries are dropped
+        if isinstance(data, dict):
+            data = dict(data)
+            data["mode"] = data.get("mode") or "multi-leg"
+            legs = data.get("legs")
+            data["legs"] = [
+                {**leg, "mode": leg.get("mode") or data["mode"]} for leg in legs if isinstance(leg, dict)
+            ] if isinstance(legs, list) else []
+        return data
+
 class PlaceResponse(BaseModel):
     place_id: str
     name: str
@@ -44,6 +66,19 @@ class PlaceResponse(BaseModel):
     primary_photo: Optional[str] = Field(default=None, description="Primary photo URL for thumbnails")
     has_photos: bool = Field(default=False, description="Quick check if photos have been loaded")
 
+    @field_validator("price_level", mode="before")
+    @classmethod
+    def _coerce_price_level(cls, value: Any) -> Optional[int]:
+        # The model sometimes returns "PRICE_LEVEL_INEXPENSIVE" etc. or floats instead of integers
+        if value is None or isinstance(value, int):
+            return value
+        if isinstance(value, str):
+            return _PRICE_LEVEL_NAMES.get(value.upper())
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
+
 class MealResponse(BaseModel):
     restaurant: PlaceResponse
     cuisine_type: str
@@ -94,6 +129,21 @@ class TransportationResponse(BaseModel):
     daily_transport_costs: Dict[str, Decimal] = Field(default_factory=dict)
     recommended_apps: List[str] = Field(default_factory=list)
 
+    @model_validator(mode="before")
+    @classmethod
+    def _coerce_shapes(cls, data: Any) -> Any:
+        # The model sometimes returns plain strings where objects are expected
+        if isinstance(data, str):
+            return {"local_transport_guide": {"notes": data}}
+        if isinstance(data, dict):
+            data = dict(data)
+            for key in ("airport_transfers", "local_transport_guide"):
+                if isinstance(data.get(key), str):
+                    data[key] = {"notes": data[key]}
+            if "daily_transport_costs" in data and not isinstance(data["daily_transport_costs"], dict):
+                data["daily_transport_costs"] = {}
+        return data
+
 class BudgetBreakdownResponse(BaseModel):
     total_budget: Decimal
     currency: str
@@ -164,3 +214,10 @@ class TripPlanResponse(BaseModel):
     # Photo enrichment metadata (for lazy photo loading)
     photos_enriched_at: Optional[datetime] = Field(default=None, description="When photos were last enriched")
     photo_enrichment_version: Optional[str] = Field(default=None, description="Version of photo enrichment")
+
+    @field_validator("travel_options", mode="before")
+    @classmethod
+    def _drop_invalid_travel_options(cls, value: Any) -> Any:
+        if isinstance(value, list):
+            return [opt for opt in value if isinstance(opt, dict)]
+        return value
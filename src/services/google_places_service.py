@@ -1,14 +1,23 @@
-import googlemaps
 from typing import List, Dict, Optional, Tuple
 import logging
 import asyncio
+import math
+import sys
+import re
+import heapq
+import threading
+import weakref
+from concurrent.futures import Future
+from operator import itemgetter
 from datetime import datetime, timedelta
 import httpx
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
-from src.models.request_models import TripPlanRequest, TravelStyle, ActivityLevel, AccommodationType
+import orjson
+from tenacity import retry, stop_after_attempt, wait_exponential, wait_random, retry_if_exception_type
+from src.models.request_models import TripPlanRequest, TravelStyle, ActivityLevel
 from src.models.place_models import PlaceCategory, EnhancedPlace, PlacesSearchResult
 from src.utils.config import get_settings
 from src.services import places_cache
+from src.utils.rate_limiter import AsyncTokenBucket
 
 # Optional Vertex AI import for lightweight research prompt
 try:
@@ -18,225 +27,397 @@ except Exception:  # keep service resilient if vertexai not available
     vertexai = None
     GenerativeModel = None
 
+GEOCODE_URL = "https://maps.googleapis.com/maps/api/geocode/json"
+PLACES_SEARCH_URL = "https://places.googleapis.com/v1/places:searchText"
+
+# Fields requested from places:searchText for itinerary candidates
+PLACES_SEARCH_FIELD_MASK = (
+    "places.id,places.displayName,places.formattedAddress,"
+    "places.location,places.rating,places.userRatingCount,"
+    "places.priceLevel,places.types,places.websiteUri,"
+    "places.internationalPhoneNumber,places.googleMapsUri"
+)
+PHOTOS_SEARCH_FIELD_MASK = "places.id,places.displayName,places.formattedAddress,places.photos"
+
+# Per-endpoint request headers; the API key lives in the client's default headers
+_SEARCH_HEADERS = {"Content-Type": "application/json", "X-Goog-FieldMask": PLACES_SEARCH_FIELD_MASK}
+_PHOTOS_SEARCH_HEADERS = {"Content-Type": "application/json", "X-Goog-FieldMask": PHOTOS_SEARCH_FIELD_MASK}
+
+# Search term seeds keyed by accommodation type / preference name
+_ACCOMMODATION_TYPE_TERMS = {
+    'hotel': ['hotels', 'business hotels', 'city center hotels'],
+    'hostel': ['hostels', 'backpacker hostels'],
+    'airbnb': ['vacation rentals', 'serviced apartments'],
+    'resort': ['resorts', 'beach resorts', 'spa resorts'],
+    'boutique': ['boutique hotels', 'design hotels']
+}
+_PREFERENCE_ATTRACTION_TERMS = {
+    'history_culture': ['museums', 'historical sites', 'monuments'],
+    'nature_wildlife': ['parks', 'gardens', 'nature reserves'],
+    'art_museums': ['art museums', 'galleries'],
+    'architecture': ['landmarks', 'famous buildings'],
+    'beaches_water': ['beaches', 'waterfront'],
+    'mountains_hiking': ['hiking trails', 'viewpoints'],
+    'photography': ['scenic viewpoints', 'photo spots']
+}
+
+# Places API v1 priceLevel enum -> 0-4 scale
+_PRICE_LEVELS = {
+    "PRICE_LEVEL_FREE": 0,
+    "PRICE_LEVEL_INEXPENSIVE": 1,
+    "PRICE_LEVEL_MODERATE": 2,
+    "PRICE_LEVEL_EXPENSIVE": 3,
+    "PRICE_LEVEL_VERY_EXPENSIVE": 4,
+}
+
+# Researched attractions are a nice-to-have: once this long after the research started,
+# the trip proceeds with the baseline searches and the research only warms the cache
+_ATTRACTION_RESEARCH_TIMEOUT_SECONDS = 6.0
+
+# Near-duplicate detection
+_METERS_PER_DEGREE = 111_320.0
+_NON_ALNUM_RE = re.compile(r"[^0-9a-z]+")
+
+
+def _normalize_place_name(name: Optional[str]) -> str:
+    return _NON_ALNUM_RE.sub(" ", (name or "").lower()).strip()
+
+
+# Accommodation type heuristics: compiled once, matched against the place name
+_HOSTEL_RE = re.compile(r"hostel", re.IGNORECASE)
+_RENTAL_RE = re.compile(r"apartment|vacation rental|homestay|bnb", re.IGNORECASE)
+_RESORT_RE = re.compile(r"resort", re.IGNORECASE)
+_BOUTIQUE_RE = re.compile(r"boutique", re.IGNORECASE)
+_BOUTIQUE_STYLE_RE = re.compile(r"boutique|heritage|design", re.IGNORECASE)
+_HOTEL_RE = re.compile(r"hotel", re.IGNORECASE)
+
+_ACCOMMODATION_MATCHERS = {
+    'hotel': lambda name, lodging: lodging or bool(_HOTEL_RE.search(name)),
+    'hostel': lambda name, lodging: bool(_HOSTEL_RE.search(name)),
+    'airbnb': lambda name, lodging: bool(_RENTAL_RE.search(name)),
+    'resort': lambda name, lodging: lodging and bool(_RESORT_RE.search(name)),
+    'boutique': lambda name, lodging: bool(_BOUTIQUE_RE.search(name)) or (lodging and bool(_BOUTIQUE_STYLE_RE.search(name))),
+}
+
+# Transient Places API statuses worth retrying (quota bursts and backend hiccups)
+_RETRYABLE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+# Exponential backoff plus up to 1s of jitter (wait_exponential_jitter's `initial` is deprecated)
+_RETRY_BACKOFF = wait_exponential(multiplier=0.2, max=4.0) + wait_random(0, 1)
+
+
+class _RetryablePlacesStatus(Exception):
+    """Raised for a retryable Places API status so tenacity can back off and retry."""
+
+    def __init__(self, status_code: int, retry_after: Optional[float] = None):
+        super().__init__(f"Places API returned {status_code}")
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+def _wait_for_places_retry(retry_state) -> float:
+    """Honor Retry-After when the API sends one, otherwise exponential backoff with jitter."""
+    exc = retry_state.outcome.exception() if retry_state.outcome else None
+    retry_after = getattr(exc, "retry_after", None)
+    if retry_after is not None:
+        return min(retry_after, 10.0)
+    return _RETRY_BACKOFF(retry_state)
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    try:
+        return max(float(value), 0.0) if value else None
+    except (TypeError, ValueError):
+        return None
+
+
 class GooglePlacesService:
     def __init__(self, api_key: str):
-        self.client = googlemaps.Client(key=api_key)
         self.logger = logging.getLogger(__name__)
         self.api_calls_made = 0
-        # Shared async HTTP client with connection pooling (reused across requests)
-        self.http_client = httpx.AsyncClient(
-            timeout=20.0,
-            limits=httpx.Limits(max_keepalive_connections=20, max_connections=50)
-        )
+        # Shared async HTTP/2 clients with connection pooling (one per event loop, reused across requests)
+        self._http_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+        # In-flight searchText requests, keyed like the Places cache. Trips run on their own
+        # worker-thread loops and the search endpoint on the server loop, so waiters share a
+        # thread-safe concurrent.futures.Future rather than an asyncio primitive.
+        self._inflight_searches: Dict[tuple, "Future[Optional[List[Dict]]]"] = {}
+        self._inflight_searches_lock = threading.Lock()
         self.api_key = api_key
         # Cap total Places API calls per trip (configurable); prefer richer data
         try:
             settings = get_settings()
             self.max_calls_per_trip = int(getattr(settings, "MAX_API_CALLS_PER_REQUEST", 30))
+            max_qps = float(getattr(settings, "PLACES_API_MAX_QPS", 10.0))
+            self.max_concurrency = max(1, int(getattr(settings, "PLACES_API_MAX_CONCURRENCY", 10)))
+            self.places_cache_ttl = int(getattr(settings, "PLACES_CACHE_TTL_SECONDS", 21600))
         except Exception:
             self.max_calls_per_trip = 30
-        # Semaphore for rate limiting concurrent requests (max 10 concurrent Places API calls)
-        self._rate_limiter = asyncio.Semaphore(10)
+            max_qps = 10.0
+            self.max_concurrency = 10
+            self.places_cache_ttl = 21600
+        # Token bucket keeps Places calls under the per-second quota while allowing bursts
+        self._token_bucket = AsyncTokenBucket(rate=max_qps, capacity=max_qps)
+        # Semaphores for bounding concurrent requests (max_concurrency in-flight Places API calls).
+        # Trip generation runs on per-worker-thread event loops, so each event loop
+        # gets its own semaphore; asyncio primitives cannot be shared across loops.
+        self._rate_limiters: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+    
+    def _get_rate_limiter(self) -> asyncio.Semaphore:
+        """Return the concurrency semaphore bound to the running event loop."""
+        loop = asyncio.get_running_loop()
+        limiter = self._rate_limiters.get(loop)
+        if limiter is None:
+            limiter = asyncio.Semaphore(self.max_concurrency)
+            self._rate_limiters[loop] = limiter
+        return limiter
+    
+    def _get_http_client(self) -> httpx.AsyncClient:
+        """Return the pooled HTTP/2 client bound to the running event loop."""
+        loop = asyncio.get_running_loop()
+        client = self._http_clients.get(loop)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                http2=True,
+                headers={"X-Goog-Api-Key": self.api_key},
+                timeout=httpx.Timeout(20.0, connect=5.0),
+                limits=httpx.Limits(max_connections=50, max_keepalive_connections=50, keepalive_expiry=30.0)
+            )
+            self._http_clients[loop] = client
+        return client
+    
+    async def close(self):
+        """Close the HTTP client owned by the running event loop"""
+        loop = asyncio.get_running_loop()
+        client = self._http_clients.pop(loop, None)
+        if client is not None:
+            await client.aclose()
     
     async def fetch_all_places_for_trip(self, request: TripPlanRequest) -> Dict[str, List[Dict]]:
         """Fetch all relevant places for the trip based on user preferences and requirements.
         Optimized with async/await, batching, caching, and concurrent requests."""
         
+        research_task: Optional[asyncio.Task] = None
         try:
-            # Reset per-trip counter and get destination coordinates (cached)
-            self.api_calls_made = 0
+            # Resolve per-trip preference lookups once
+            pref_scores: Dict[str, int] = request.preferences.model_dump()
+            high_prefs = {name: score for name, score in pref_scores.items() if score >= 3}
+            accom_type = str(getattr(request.accommodation_type, 'value', request.accommodation_type)).lower()
+            
+            # Step 0: Lightweight AI research for iconic must-visit attractions. It only needs
+            # the destination name, so it runs in the background from the start, overlapping
+            # the geocode and the baseline searches below.
+            research_task = asyncio.create_task(self._research_top_attractions_async(request.destination))
+            research_deadline = asyncio.get_running_loop().time() + _ATTRACTION_RESEARCH_TIMEOUT_SECONDS
+            
+            # Get destination coordinates (cached)
             coordinates = await self._geocode_destination_async(request.destination)
             if not coordinates:
                 raise ValueError(f"Could not find coordinates for {request.destination}")
             
-            self.logger.info(f"Fetching places (Places API v1) for {request.destination} at {coordinates}")
+            # Trips that would issue the same queries share one result set. Only the
+            # request fields that shape the queries or the ranking are part of the key.
+            # The destination is keyed by its geocoded centre rather than its spelling, so
+            # "Paris", "Paris, France" and "paris fr" resolve to the same entry.
+            trip_cache_params = {
+                "location": [round(coordinates[0], 3), round(coordinates[1], 3)],
+                "style": str(getattr(request.primary_travel_style, 'value', request.primary_travel_style)).lower(),
+                "accommodation": accom_type,
+                "preferences": pref_scores,
+                "cuisines": sorted(c.strip().lower() for c in request.must_try_cuisines or []),
+                "dietary": sorted(d.strip().lower() for d in request.dietary_restrictions or []),
+                "must_visit": sorted(m.strip().lower() for m in request.must_visit_places or []),
+            }
+            cached_trip_places = places_cache.get_cached("trip_places", **trip_cache_params)
+            if cached_trip_places is not None:
+                research_task.cancel()
+                self.logger.info(f"Using cached places for {request.destination}")
+                # Callers add keys (e.g. travel options) to the result, so hand out fresh containers
+                return {category: list(places) for category, places in cached_trip_places.items()}
+            
+            # Reset per-trip counter
+            self.api_calls_made = 0
             
-            # Step 0: Lightweight AI research for iconic must-visit attractions (async)
-            researched_attraction_names: List[str] = await self._research_top_attractions_async(request.destination)
+            self.logger.info(f"Fetching places (Places API v1) for {request.destination} at {coordinates}")
             
-            # Build all search queries upfront for parallel execution
-            search_tasks = []
+            # Build all search queries upfront for parallel execution.
+            # Categories share terms ("parks", "museums", ...), so queries are keyed by
+            # (text_query, radius) and each unique query is issued once, then fanned out
+            # to every category that asked for it.
+            query_plan: Dict[Tuple[str, int], Dict] = {}
             
-            # Researched attractions (if any)
-            if researched_attraction_names:
-                for place_name in researched_attraction_names[:10]:  # Limit to top 10
-                    search_tasks.append(self._places_search_text_v1_async(
-                        text_query=f"{place_name} in {request.destination}",
-                        coordinates=coordinates,
-                        radius=20000,
-                        page_size=10,
-                        category="researched_attraction"
-                    ))
+            def add_query(text_query: str, radius: int, category: str):
+                spec = query_plan.setdefault(
+                    (text_query.strip().lower(), radius),
+                    {"text_query": text_query, "radius": radius, "categories": []}
+                )
+                if category not in spec["categories"]:
+                    spec["categories"].append(category)
             
-            # Accommodations searches
-            acc_terms = self._get_accommodation_search_terms(request)
-            for term in acc_terms[:12]:  # Limit searches
-                search_tasks.append(self._places_search_text_v1_async(
-                    text_query=term,
+            def search(spec: Dict):
+                return self._places_search_text_v1_async(
+                    text_query=spec["text_query"],
                     coordinates=coordinates,
-                    radius=12000,
+                    radius=spec["radius"],
                     page_size=10,
-                    category="accommodations"
-                ))
+                    category=spec["categories"][0]
+                )
+            
+            # Accommodations searches
+            acc_terms = self._get_accommodation_search_terms(request, accom_type)
+            for term in acc_terms:
+                add_query(term, 12000, "accommodations")
             
             # Restaurants searches
             rest_terms = self._get_restaurant_search_terms(request)
             for term in rest_terms[:10]:
-                search_tasks.append(self._places_search_text_v1_async(
-                    text_query=term,
-                    coordinates=coordinates,
-                    radius=5000,
-                    page_size=10,
-                    category="restaurants"
-                ))
+                add_query(term, 5000, "restaurants")
             
             # Attractions searches
-            attr_terms = self._get_attraction_search_terms(request)
+            attr_terms = self._get_attraction_search_terms(request, high_prefs)
             for term in attr_terms[:12]:
-                search_tasks.append(self._places_search_text_v1_async(
-                    text_query=term,
-                    coordinates=coordinates,
-                    radius=10000,
-                    page_size=10,
-                    category="attractions"
-                ))
+                add_query(term, 10000, "attractions")
             
             # Conditional categories
-            if request.preferences.shopping >= 3:
+            if pref_scores.get('shopping', 0) >= 3:
                 for term in ['shopping malls', 'markets', 'local markets', 'boutiques']:
-                    search_tasks.append(self._places_search_text_v1_async(
-                        text_query=f"{term} in {request.destination}",
-                        coordinates=coordinates,
-                        radius=8000,
-                        page_size=10,
-                        category="shopping"
-                    ))
-            
-            if request.preferences.nightlife_entertainment >= 3:
+                    add_query(f"{term} in {request.destination}", 8000, "shopping")
+            
+            if pref_scores.get('nightlife_entertainment', 0) >= 3:
                 for term in ['bars', 'nightclubs', 'pubs', 'live music']:
-                    search_tasks.append(self._places_search_text_v1_async(
-                        text_query=f"{term} in {request.destination}",
-                        coordinates=coordinates,
-                        radius=5000,
-                        page_size=10,
-                        category="nightlife"
-                    ))
-            
-            if request.preferences.history_culture >= 4 or request.preferences.art_museums >= 4:
+                    add_query(f"{term} in {request.destination}", 5000, "nightlife")
+            
+            if pref_scores.get('history_culture', 0) >= 4 or pref_scores.get('art_museums', 0) >= 4:
                 for term in ['museums', 'cultural centers', 'theaters', 'art galleries']:
-                    search_tasks.append(self._places_search_text_v1_async(
-                        text_query=f"{term} in {request.destination}",
-                        coordinates=coordinates,
-                        radius=8000,
-                        page_size=10,
-                        category="cultural_sites"
-                    ))
-            
-            if request.preferences.nature_wildlife >= 3 or request.preferences.mountains_hiking >= 3:
+                    add_query(f"{term} in {request.destination}", 8000, "cultural_sites")
+            
+            if pref_scores.get('nature_wildlife', 0) >= 3 or pref_scores.get('mountains_hiking', 0) >= 3:
                 for term in ['parks', 'hiking trails', 'nature reserves', 'beaches']:
-                    search_tasks.append(self._places_search_text_v1_async(
-                        text_query=f"{term} in {request.destination}",
-                        coordinates=coordinates,
-                        radius=15000,
-                        page_size=10,
-                        category="outdoor_activities"
-                    ))
+                    add_query(f"{term} in {request.destination}", 15000, "outdoor_activities")
             
             # Must-visit places
             if request.must_visit_places:
                 for place_name in request.must_visit_places:
-                    search_tasks.append(self._places_search_text_v1_async(
-                        text_query=f"{place_name} in {request.destination}",
-                        coordinates=coordinates,
-                        radius=20000,
-                        page_size=10,
-                        category="must_visit"
-                    ))
+                    add_query(f"{place_name} in {request.destination}", 20000, "must_visit")
             
             # Transportation hubs
             for term in ['airport', 'train station', 'bus station']:
-                search_tasks.append(self._places_search_text_v1_async(
-                    text_query=f"{term} in {request.destination}",
-                    coordinates=coordinates,
-                    radius=20000,
-                    page_size=10,
-                    category="transportation_hubs"
-                ))
-            
-            # Execute all searches concurrently with rate limiting
-            self.logger.info(f"Executing {len(search_tasks)} concurrent search queries")
-            search_results = await asyncio.gather(*search_tasks, return_exceptions=True)
-            
-            # Aggregate results by category
-            places_data: Dict[str, List[Dict]] = {
-                "restaurants": [],
-                "attractions": [],
-                "accommodations": [],
-                "shopping": [],
-                "nightlife": [],
-                "cultural_sites": [],
-                "outdoor_activities": [],
-                "transportation_hubs": [],
-                "must_visit": [],
-                "researched_attraction": []
+                add_query(f"{term} in {request.destination}", 20000, "transportation_hubs")
+            
+            # Execute baseline searches concurrently with rate limiting
+            query_specs = list(query_plan.values())
+            self.logger.info(f"Executing {len(query_specs)} concurrent search queries")
+            baseline_searches = asyncio.gather(*[search(spec) for spec in query_specs], return_exceptions=True)
+            
+            # Researched attractions (if any) fan out as soon as the research resolves. A slow
+            # research call doesn't hold up generation: past the deadline the trip goes ahead
+            # without it, while the research keeps running in its thread and caches the names
+            # for the next trip to this destination.
+            research_timed_out = False
+            try:
+                researched_attraction_names: List[str] = await asyncio.wait_for(
+                    research_task, timeout=max(0.0, research_deadline - asyncio.get_running_loop().time())
+                )
+            except asyncio.TimeoutError:
+                research_timed_out = True
+                researched_attraction_names = []
+                self.logger.info(f"Attraction research for {request.destination} still running; continuing without it")
+            research_specs: List[Dict] = []
+            for place_name in researched_attraction_names[:10]:  # Limit to top 10
+                text_query = f"{place_name} in {request.destination}"
+                is_new = (text_query.strip().lower(), 20000) not in query_plan
+                add_query(text_query, 20000, "researched_attraction")
+                if is_new:
+                    research_specs.append(query_plan[(text_query.strip().lower(), 20000)])
+            research_results = await asyncio.gather(*[search(spec) for spec in research_specs], return_exceptions=True)
+            
+            query_specs.extend(research_specs)
+            search_results = list(await baseline_searches) + list(research_results)
+            
+            # Aggregate results by category, de-duplicating by place_id at insertion
+            found: Dict[str, Dict[str, Dict]] = {
+                category: {} for category in (
+                    "restaurants", "attractions", "accommodations", "shopping", "nightlife",
+                    "cultural_sites", "outdoor_activities", "transportation_hubs", "must_visit",
+                    "researched_attraction"
+                )
             }
             
-            for result in search_results:
-                if isinstance(result, Exception):
-                    self.logger.warning(f"Search task failed: {result}")
+            # Errors, cap skips and cancelled (coalesced) searches all leave the result set
+            # incomplete
+            failed_searches = 0
+            for spec, result in zip(query_specs, search_results):
+                if isinstance(result, BaseException):
+                    self.logger.warning(f"Search task failed: {result!r}")
+                    failed_searches += 1
                     continue
                 if result and isinstance(result, dict):
-                    category = result.get('category', 'unknown')
+                    if result.get("failed"):
+                        failed_searches += 1
                     places = result.get('places', [])
-                    if category in places_data:
-                        places_data[category].extend(places)
+                    for category in spec["categories"]:
+                        bucket = found.get(category)
+                        if bucket is None:
+                            continue
+                        for place in places:
+                            place_id = place.get('place_id')
+                            if place_id and place_id not in bucket:
+                                bucket[place_id] = place
             
             # Merge researched attractions into main attractions
-            places_data["attractions"].extend(places_data.pop("researched_attraction", []))
-            
-            # Post-process: deduplicate, rank, and limit each category
-            places_data["accommodations"] = await self._process_accommodations(places_data["accommodations"], request)
-            places_data["attractions"] = await self._process_attractions(places_data["attractions"])
-            places_data["restaurants"] = await self._process_restaurants(places_data["restaurants"], request)
-            places_data["shopping"] = self._remove_duplicates(places_data["shopping"])[:15]
-            places_data["nightlife"] = self._remove_duplicates(places_data["nightlife"])[:10]
-            places_data["cultural_sites"] = self._remove_duplicates(places_data["cultural_sites"])[:15]
-            places_data["outdoor_activities"] = self._remove_duplicates(places_data["outdoor_activities"])[:15]
-            places_data["must_visit"] = self._remove_duplicates(places_data["must_visit"])
-            places_data["transportation_hubs"] = self._remove_duplicates(places_data["transportation_hubs"])[:10]
-            
-            total_places = sum(len(v) for v in places_data.values())
-            self.logger.info(f"Successfully fetched {total_places} places across {len([k for k, v in places_data.items() if v])} categories")
+            for place_id, place in found.pop("researched_attraction").items():
+                found["attractions"].setdefault(place_id, place)
+            
+            places_data: Dict[str, List[Dict]] = {category: list(bucket.values()) for category, bucket in found.items()}
+            
+            # Post-process: rank and limit each category. Scoring and near-duplicate merging
+            # are pure CPU, so they run in a worker thread rather than on the event loop.
+            places_data["accommodations"], places_data["attractions"], places_data["restaurants"] = await asyncio.to_thread(
+                self._rank_core_categories, places_data, request, accom_type
+            )
+            places_data["shopping"] = places_data["shopping"][:15]
+            places_data["nightlife"] = places_data["nightlife"][:10]
+            places_data["cultural_sites"] = places_data["cultural_sites"][:15]
+            places_data["outdoor_activities"] = places_data["outdoor_activities"][:15]
+            places_data["transportation_hubs"] = places_data["transportation_hubs"][:10]
+            
+            # One pass over the categories gives both the total and the non-empty count
+            counts = [len(v) for v in places_data.values()]
+            total_places = sum(counts)
+            self.logger.info(
+                "Successfully fetched %d places across %d categories",
+                total_places, len(counts) - counts.count(0),
+            )
+            # Partial results (failed or skipped searches, missing research) are not cached so
+            # the next trip retries them. The ranked set keeps the default cache TTL: the
+            # searches behind it stay cached for places_cache_ttl, so rebuilding it is cheap.
+            if failed_searches:
+                self.logger.info("Not caching trip places: %d searches failed or were skipped", failed_searches)
+            if total_places and not failed_searches and not research_timed_out:
+                places_cache.set_cached(
+                    "trip_places",
+                    {category: tuple(places) for category, places in places_data.items()},
+                    **trip_cache_params
+                )
             return places_data
             
         except Exception as e:
+            if research_task is not None and not research_task.done():
+                research_task.cancel()
             self.logger.error(f"Error fetching places for trip: {str(e)}")
             raise
     
-    def _get_accommodation_search_terms(self, request: TripPlanRequest) -> List[str]:
+    def _get_accommodation_search_terms(self, request: TripPlanRequest, accom_type: str) -> List[str]:
         """Generate accommodation search terms based on type and style."""
-        type_mapping = {
-            'hotel': ['hotels', 'business hotels', 'city center hotels'],
-            'hostel': ['hostels', 'backpacker hostels'],
-            'airbnb': ['vacation rentals', 'serviced apartments'],
-            'resort': ['resorts', 'beach resorts', 'spa resorts'],
-            'boutique': ['boutique hotels', 'design hotels']
-        }
-        base_terms = type_mapping.get(
-            request.accommodation_type.value if hasattr(request.accommodation_type, 'value') else request.accommodation_type,
-            ['hotels']
-        )
+        base_terms = _ACCOMMODATION_TYPE_TERMS.get(accom_type, ['hotels'])
         
+        # Hotel-style stays get dedicated style searches; other types fold the style into a
+        # single qualified search so the budget isn't spent on off-type hotel results.
         style_terms = []
         if request.primary_travel_style == TravelStyle.LUXURY:
-            style_terms = ['luxury hotels', '5 star hotels']
+            style_terms = ['luxury hotels', '5 star hotels'] if accom_type in ('hotel', 'boutique') else [f"luxury {base_terms[0]}"]
         elif request.primary_travel_style == TravelStyle.BUDGET:
-            style_terms = ['budget hotels', 'guest houses']
+            style_terms = ['budget hotels', 'guest houses'] if accom_type in ('hotel', 'boutique') else [f"budget {base_terms[0]}"]
         
-        all_terms = []
-        for term in base_terms + style_terms:
-            all_terms.append(f"{term} in {request.destination}")
-        return all_terms
+        return [f"{term} in {request.destination}" for term in base_terms + style_terms]
     
     def _get_restaurant_search_terms(self, request: TripPlanRequest) -> List[str]:
         """Generate restaurant search terms based on preferences."""
@@ -259,22 +440,11 @@ class GooglePlacesService:
         
         return [f"{term} in {request.destination}" for term in terms]
     
-    def _get_attraction_search_terms(self, request: TripPlanRequest) -> List[str]:
-        """Generate attraction search terms based on preferences."""
-        preference_mapping = {
-            'history_culture': ['museums', 'historical sites', 'monuments'],
-            'nature_wildlife': ['parks', 'gardens', 'nature reserves'],
-            'art_museums': ['art museums', 'galleries'],
-            'architecture': ['landmarks', 'famous buildings'],
-            'beaches_water': ['beaches', 'waterfront'],
-            'mountains_hiking': ['hiking trails', 'viewpoints'],
-            'photography': ['scenic viewpoints', 'photo spots']
-        }
-        
+    def _get_attraction_search_terms(self, request: TripPlanRequest, high_prefs: Dict[str, int]) -> List[str]:
+        """Generate attraction search terms from the trip's high-scoring (>= 3) preferences."""
         terms = ['tourist attractions']
-        for pref_name, score in request.preferences.dict().items():
-            if score >= 3 and pref_name in preference_mapping:
-                terms.extend(preference_mapping[pref_name])
+        for pref_name in high_prefs:
+            terms.extend(_PREFERENCE_ATTRACTION_TERMS.get(pref_name, ()))
         
         return [f"{term} in {request.destination}" for term in terms]
     
@@ -286,403 +456,112 @@ class GooglePlacesService:
     )
     async def _geocode_destination_async(self, destination: str) -> Optional[Tuple[float, float]]:
         """Get coordinates for a destination (cached, async)"""
-        # Check cache first
-        cached = places_cache.get_cached("geocode", destination=destination)
+        # Check cache first (normalized so "Paris" and " paris " share an entry)
+        destination_key = (destination or "").strip().lower()
+        cached = places_cache.get_cached("geocode", destination=destination_key)
         if cached:
             return cached
         
         try:
-            # Use sync client in thread pool to avoid blocking
-            loop = asyncio.get_event_loop()
-            geocode_result = await loop.run_in_executor(None, self.client.geocode, destination)
+            # Geocoding API over the shared pooled client (no blocking SDK call, no extra TLS session)
+            resp = await self._get_http_client().get(
+                GEOCODE_URL, params={"address": destination, "key": self.api_key}
+            )
+            if resp.status_code != 200:
+                self.logger.error(f"Geocoding error for {destination}: {resp.status_code} {resp.text}")
+                return None
+            geocode_result = orjson.loads(resp.content).get("results") or []
             
             if geocode_result:
                 location = geocode_result[0]['geometry']['location']
                 coords = (location['lat'], location['lng'])
                 # Cache for 24 hours (coordinates don't change)
-                places_cache.set_cached("geocode", coords, ttl_seconds=86400, destination=destination)
+                places_cache.set_cached("geocode", coords, ttl_seconds=86400, destination=destination_key)
                 return coords
             return None
         except Exception as e:
             self.logger.error(f"Error geocoding destination {destination}: {str(e)}")
             return None
     
-    def _fetch_restaurants(self, request: TripPlanRequest, coordinates: Tuple[float, float]) -> List[Dict]:
-        """Fetch restaurants based on travel style and preferences"""
-        restaurants = []
-        
-        # Determine price levels based on travel style
-        price_levels = self._get_price_levels_for_style(request.primary_travel_style)
-        
-        # Search for different meal types and cuisines
-        search_terms = [
-            "restaurants",
-            "cafes",
-            "local food",
-            "fine dining" if request.primary_travel_style == TravelStyle.LUXURY else "budget food"
-        ]
-        
-        # Add cuisine-specific searches
-        if request.must_try_cuisines:
-            for cuisine in request.must_try_cuisines[:3]:  # Limit to top 3
-                search_terms.append(f"{cuisine} restaurants")
-        
-        # Add dietary restriction searches
-        if request.dietary_restrictions:
-            for restriction in request.dietary_restrictions[:2]:  # Limit to top 2
-                search_terms.append(f"{restriction} restaurants")
-        
-        # Weight cuisines/diet preferences a bit higher by placing them later and scoring later
-        for search_term in search_terms:
-            results = self._places_search_text_v1(
-                text_query=f"{search_term} in {request.destination}",
-                coordinates=coordinates,
-                radius=5000,
-                page_size=10
-            )
-            for place in results[:5]:  # limit per search
-                place_details = self._transform_place_v1(place)
-                if place_details and self._matches_price_level(place_details, price_levels):
-                    restaurants.append(place_details)
-        
-        # Remove duplicates
-        unique_restaurants = self._remove_duplicates(restaurants)
-
-        # Score and sort by rating, reviews, and cuisine alignment
-        must_try = set((request.must_try_cuisines or [])[:5])
-        dietary = set((request.dietary_restrictions or [])[:3])
-
-        def _score_rest(p: Dict) -> float:
-            rating = float(p.get('rating') or 0.0)
-            reviews = float(p.get('user_ratings_total') or 0)
-            name = (p.get('name') or '').lower()
-            addr = (p.get('address') or '').lower()
-            text = name + ' ' + addr
-            cuisine_boost = 0.0
-            for c in must_try:
-                if isinstance(c, str) and c.lower() in text:
-                    cuisine_boost += 10.0
-            for d in dietary:
-                if isinstance(d, str) and d.lower() in text:
-                    cuisine_boost += 6.0
-            return rating * 100 + min(reviews, 10000) * 0.03 + cuisine_boost
-
-        unique_restaurants.sort(key=_score_rest, reverse=True)
-        # Ensure minimal required fields exist (place_id, coordinates)
-        cleaned: List[Dict] = []
-        for r in unique_restaurants:
-            if not r.get('place_id'):
-                continue
-            coords = r.get('coordinates') or {}
-            if coords.get('lat') is None or coords.get('lng') is None:
-                continue
-            cleaned.append(r)
-
-        return cleaned[:25]
-    
-    def _fetch_attractions(self, request: TripPlanRequest, coordinates: Tuple[float, float], researched_attractions: Optional[List[Dict]] = None) -> List[Dict]:
-        """Fetch attractions based on user preferences"""
-        attractions = []
-        
-        # Map preferences to search terms
-        preference_mapping = {
-            'history_culture': ['museums', 'historical sites', 'cultural centers', 'monuments'],
-            'nature_wildlife': ['parks', 'gardens', 'nature reserves', 'zoos', 'aquariums'],
-            'art_museums': ['art museums', 'galleries', 'art centers', 'sculpture gardens'],
-            'architecture': ['landmarks', 'architectural sites', 'famous buildings', 'castles'],
-            'beaches_water': ['beaches', 'waterfront', 'water activities', 'marinas'],
-            'mountains_hiking': ['hiking trails', 'viewpoints', 'nature walks', 'mountains'],
-            'photography': ['scenic viewpoints', 'photo spots', 'landmarks', 'parks'],
-            'wellness_relaxation': ['spas', 'wellness centers', 'thermal baths', 'meditation centers']
-        }
-        
-        # Search based on high-scoring preferences
-        for pref_name, score in request.preferences.dict().items():
-            if score >= 3 and pref_name in preference_mapping:
-                for search_term in preference_mapping[pref_name]:
-                    results = self._places_search_text_v1(
-                        text_query=f"{search_term} in {request.destination}",
-                        coordinates=coordinates,
-                        radius=10000,
-                        page_size=10
-                    )
-                    for place in results[:5]:
-                        place_details = self._transform_place_v1(place)
-                        if place_details:
-                            attractions.append(place_details)
-        
-        # Also search for general tourist attractions
-        general_results = self._places_search_text_v1(
-            text_query=f"tourist attractions in {request.destination}",
-            coordinates=coordinates,
-            radius=10000,
-            page_size=10
-        )
-        for place in general_results[:5]:
-            place_details = self._transform_place_v1(place)
-            if place_details:
-                attractions.append(place_details)
-        
-        # Merge with researched iconic attractions, then de-duplicate and rank lightly
-        merged = attractions + (researched_attractions or [])
-        unique_attractions = self._remove_duplicates(merged)
-
-        def _score_attr(p: Dict) -> float:
-            rating = float(p.get('rating') or 0.0)
-            reviews = float(p.get('user_ratings_total') or 0)
-            # Prefer high-rating and crowd-validated spots
-            return rating * 100 + min(reviews, 20000) * 0.02
-
-        unique_attractions.sort(key=_score_attr, reverse=True)
-        return unique_attractions[:40]
-    
-    def _fetch_accommodations(self, request: TripPlanRequest, coordinates: Tuple[float, float]) -> List[Dict]:
-        """Fetch accommodations based on type and travel style with richer diversity."""
-        accommodations: List[Dict] = []
-
-        # Core terms by type
-        type_mapping = {
-            'hotel': [
-                'hotels', 'business hotels', 'city center hotels'
-            ],
-            'hostel': [
-                'hostels', 'backpacker hostels', 'youth hostels'
-            ],
-            'airbnb': [
-                'vacation rentals', 'serviced apartments', 'apartments'
-            ],
-            'resort': [
-                'resorts', 'beach resorts', 'spa resorts', 'all inclusive resorts'
-            ],
-            'boutique': [
-                'boutique hotels', 'design hotels', 'heritage hotels'
-            ]
-        }
-
-        search_terms = type_mapping.get(request.accommodation_type.value if hasattr(request.accommodation_type, 'value') else request.accommodation_type, ['hotels'])
-
-        # Style-specific refinements
-        style = request.primary_travel_style
-        if style == TravelStyle.LUXURY:
-            search_terms.extend(['luxury hotels', '5 star hotels', 'premium accommodation', 'executive suites'])
-        elif style == TravelStyle.BUDGET:
-            search_terms.extend(['budget hotels', 'cheap accommodation', 'guest houses', 'capsule hotel'])
-        elif style == TravelStyle.ADVENTURE:
-            search_terms.extend(['eco lodges', 'nature lodges'])
-        elif style == TravelStyle.CULTURAL:
-            search_terms.extend(['heritage stays', 'traditional inns'])
-
-        # Geographical qualifiers to diversify results
-        qualifiers = [
-            '', ' near city center', ' near main station', ' near airport', ' old town', ' downtown'
-        ]
-
-        # Query and collect
-        for term in search_terms:
-            for qual in qualifiers:
-                text = f"{term}{qual} in {request.destination}".strip()
-                results = self._places_search_text_v1(
-                    text_query=text,
-                    coordinates=coordinates,
-                    radius=12000,
-                    page_size=10
-                )
-                for place in results[:5]:
-                    place_details = self._transform_place_v1(place)
-                    if place_details:
-                        # Filter by accommodation type heuristics
-                        if self._accommodation_matches_type(place_details, request.accommodation_type):
-                            accommodations.append(place_details)
-
-        unique_accommodations = self._remove_duplicates(accommodations)
-
-        # Filter by price levels that match the travel style (when available)
-        allowed_levels = self._get_price_levels_for_style(request.primary_travel_style)
-        filtered: List[Dict] = []
-        for p in unique_accommodations:
-            if p.get('price_level') is None or p.get('price_level') in allowed_levels:
-                filtered.append(p)
-
-        # Rank by rating, reviews, and alignment with style cost band
-        def _score(place: Dict) -> float:
-            rating = float(place.get('rating') or 0.0)
-            reviews = float(place.get('user_ratings_total') or 0)
-            price = place.get('price_level')
-            # Price alignment: budget prefers 1-2; luxury prefers 3-4; others prefer 2-3
-            target_low, target_high = {
-                TravelStyle.BUDGET: (1, 2),
-                TravelStyle.LUXURY: (3, 4),
-            }.get(request.primary_travel_style, (2, 3))
-            align = 0.0
-            if isinstance(price, int):
-                if target_low <= price <= target_high:
-                    align = 1.0
-                else:
-                    align = 0.5
-            # Weighted score
-            return rating * 100 + min(reviews, 5000) * 0.02 + align * 10
-
-        filtered.sort(key=_score, reverse=True)
-        # Return a concise, high-quality set for the AI
-        return filtered[:20]
-
     def _accommodation_matches_type(self, place: Dict, accommodation_type) -> bool:
         """Heuristic match of a place to the requested accommodation type using types and name."""
-        name = (place.get('name') or '').lower()
-        types = [t.lower() for t in (place.get('types') or [])]
-        if accommodation_type == getattr(AccommodationType, 'HOTEL', 'hotel') or str(accommodation_type).lower() == 'hotel':
-            return ('lodging' in types) or ('hotel' in name)
-        if str(accommodation_type).lower() == 'hostel':
-            return ('lodging' in types and 'hostel' in name) or ('hostel' in name)
-        if str(accommodation_type).lower() == 'airbnb':
-            return any(k in name for k in ['apartment', 'serviced apartment', 'vacation rental', 'homestay', 'bnb'])
-        if str(accommodation_type).lower() == 'resort':
-            return ('lodging' in types) and ('resort' in name)
-        if str(accommodation_type).lower() == 'boutique':
-            return ('lodging' in types and ('boutique' in name or 'heritage' in name or 'design' in name)) or ('boutique' in name)
-        # Fallback: accept lodging
-        return 'lodging' in types
-    
-    def _fetch_shopping_venues(self, request: TripPlanRequest, coordinates: Tuple[float, float]) -> List[Dict]:
-        """Fetch shopping venues"""
-        shopping = []
-        
-        search_terms = ['shopping malls', 'markets', 'local markets', 'boutiques', 'souvenir shops']
-        
-        for search_term in search_terms:
-            results = self._places_search_text_v1(
-                text_query=f"{search_term} in {request.destination}",
-                coordinates=coordinates,
-                radius=8000,
-                page_size=10
-            )
-            for place in results[:5]:
-                place_details = self._transform_place_v1(place)
-                if place_details:
-                    shopping.append(place_details)
-        
-        return self._remove_duplicates(shopping)[:15]
-    
-    def _fetch_nightlife_venues(self, request: TripPlanRequest, coordinates: Tuple[float, float]) -> List[Dict]:
-        """Fetch nightlife venues"""
-        nightlife = []
-        
-        search_terms = ['bars', 'nightclubs', 'pubs', 'live music', 'entertainment']
-        
-        for search_term in search_terms:
-            results = self._places_search_text_v1(
-                text_query=f"{search_term} in {request.destination}",
-                coordinates=coordinates,
-                radius=5000,
-                page_size=10
-            )
-            for place in results[:5]:
-                place_details = self._transform_place_v1(place)
-                if place_details:
-                    nightlife.append(place_details)
-        
-        return self._remove_duplicates(nightlife)[:10]
-    
-    def _fetch_cultural_sites(self, request: TripPlanRequest, coordinates: Tuple[float, float]) -> List[Dict]:
-        """Fetch cultural sites"""
-        cultural = []
-        
-        search_terms = ['museums', 'cultural centers', 'theaters', 'art galleries', 'historical sites']
-        
-        for search_term in search_terms:
-            results = self._places_search_text_v1(
-                text_query=f"{search_term} in {request.destination}",
-                coordinates=coordinates,
-                radius=8000,
-                page_size=10
-            )
-            for place in results[:5]:
-                place_details = self._transform_place_v1(place)
-                if place_details:
-                    cultural.append(place_details)
-        
-        return self._remove_duplicates(cultural)[:15]
-    
-    def _fetch_outdoor_activities(self, request: TripPlanRequest, coordinates: Tuple[float, float]) -> List[Dict]:
-        """Fetch outdoor activities"""
-        outdoor = []
-        
-        search_terms = ['parks', 'hiking trails', 'nature reserves', 'beaches', 'outdoor activities']
-        
-        for search_term in search_terms:
-            results = self._places_search_text_v1(
-                text_query=f"{search_term} in {request.destination}",
-                coordinates=coordinates,
-                radius=15000,
-                page_size=10
-            )
-            for place in results[:5]:
-                place_details = self._transform_place_v1(place)
-                if place_details:
-                    outdoor.append(place_details)
-        
-        return self._remove_duplicates(outdoor)[:15]
-    
-    def _fetch_specific_places(self, destination: str, place_names: List[str], coordinates: Tuple[float, float]) -> List[Dict]:
-        """Fetch specific places mentioned by user using Places API v1."""
-        places = []
-        
-        for place_name in place_names:
-            results = self._places_search_text_v1(
-                text_query=f"{place_name} in {destination}",
-                coordinates=coordinates,
-                radius=20000,
-                page_size=10
-            )
-            for place in results[:3]:
-                place_details = self._transform_place_v1(place)
-                if place_details:
-                    places.append(place_details)
-        
-        return self._remove_duplicates(places)
-    
-    def _fetch_transportation_hubs(self, destination: str, coordinates: Tuple[float, float]) -> List[Dict]:
-        """Fetch transportation hubs using Places API v1."""
-        transport = []
-        
-        search_terms = ['airport', 'train station', 'bus station', 'metro station']
-        
-        for search_term in search_terms:
-            results = self._places_search_text_v1(
-                text_query=f"{search_term} in {destination}",
-                coordinates=coordinates,
-                radius=20000,
-                page_size=10
-            )
-            for place in results[:3]:
-                place_details = self._transform_place_v1(place)
-                if place_details:
-                    transport.append(place_details)
-        
-        return self._remove_duplicates(transport)[:10]
+        type_key = str(getattr(accommodation_type, 'value', accommodation_type)).lower()
+        lodging = 'lodging' in (place.get('types') or ())
+        matcher = _ACCOMMODATION_MATCHERS.get(type_key)
+        if matcher is None:
+            # Fallback: accept lodging
+            return lodging
+        return matcher(place.get('name') or '', lodging)
     
     @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=2, max=10),
-        retry=retry_if_exception_type((httpx.HTTPError, httpx.TimeoutException)),
+        stop=stop_after_attempt(4),
+        wait=_wait_for_places_retry,
+        retry=retry_if_exception_type((httpx.TransportError, _RetryablePlacesStatus)),
         reraise=True
     )
+    async def _post_places(self, url: str, headers: Dict[str, str], body: Dict) -> httpx.Response:
+        """POST to the Places API under the concurrency and rate limits, retrying transient failures.
+        The semaphore slot is released while backing off so other searches keep flowing."""
+        content = orjson.dumps(body)
+        async with self._get_rate_limiter():
+            await self._token_bucket.acquire()
+            resp = await self._get_http_client().post(url, headers=headers, content=content)
+        if resp.status_code in _RETRYABLE_STATUS_CODES:
+            self.logger.warning(f"Places API returned {resp.status_code}; retrying")
+            raise _RetryablePlacesStatus(resp.status_code, _parse_retry_after(resp.headers.get("Retry-After")))
+        return resp
+    
     async def _places_search_text_v1_async(self, text_query: str, coordinates: Optional[Tuple[float, float]] = None,
                                             radius: Optional[int] = None, page_size: int = 10, category: str = "general") -> Dict:
         """Use Places API v1 (New) places:searchText endpoint with caching and rate limiting."""
-        # Check cache first
+        # Check cache first; coordinates are rounded (~100m) so repeat trips to a destination share entries
         cache_key_params = {
-            "text_query": text_query,
-            "lat": coordinates[0] if coordinates else None,
-            "lng": coordinates[1] if coordinates else None,
+            "text_query": text_query.strip().lower(),
+            "lat": round(coordinates[0], 3) if coordinates else None,
+            "lng": round(coordinates[1], 3) if coordinates else None,
             "radius": radius,
             "page_size": page_size
         }
         cached = places_cache.get_cached("places_search", **cache_key_params)
-        if cached:
-            self.logger.debug(f"Cache hit for places_search: {text_query}")
+        if cached is not None:
+            self.logger.debug("Cache hit for places_search: %s", text_query)
             return {"category": category, "places": cached}
         
+        # Coalesce concurrent identical searches (e.g. two trips to the same city, or the
+        # search endpoint racing a generation) onto one request
+        inflight_key = tuple(cache_key_params.values())
+        with self._inflight_searches_lock:
+            inflight = self._inflight_searches.get(inflight_key)
+            is_leader = inflight is None
+            if is_leader:
+                inflight = Future()
+                self._inflight_searches[inflight_key] = inflight
+        if not is_leader:
+            # Shielded: a cancelled waiter must not cancel the future other waiters share
+            return self._search_result(category, await asyncio.shield(asyncio.wrap_future(inflight)))
+        
+        places: Optional[List[Dict]] = None
+        try:
+            places = await self._search_text_uncached(text_query, coordinates, radius, page_size, cache_key_params)
+            return self._search_result(category, places)
+        finally:
+            # A cancelled leader hands waiters a failed search (None), never its cancellation
+            inflight.set_result(places)
+            with self._inflight_searches_lock:
+                self._inflight_searches.pop(inflight_key, None)
+    
+    @staticmethod
+    def _search_result(category: str, places: Optional[List[Dict]]) -> Dict:
+        """Wrap searchText places for callers; a failed or skipped search (None) is returned as
+        no places, flagged "failed" so trip-level results built from it are not cached."""
+        if places is None:
+            return {"category": category, "places": [], "failed": True}
+        return {"category": category, "places": places}
+    
+    async def _search_text_uncached(self, text_query: str, coordinates: Optional[Tuple[float, float]],
+                                    radius: Optional[int], page_size: int, cache_key_params: Dict) -> Optional[List[Dict]]:
+        """Issue one searchText request and cache the transformed places.
+        Returns None when the search failed or was skipped at the per-trip call cap."""
         try:
             # Enforce per-trip API call limit
             if self.max_calls_per_trip and self.api_calls_made >= self.max_calls_per_trip:
@@ -690,54 +569,43 @@ class GooglePlacesService:
                     "Places API call skipped: max_calls_per_trip reached",
                     extra={"max_calls_per_trip": self.max_calls_per_trip}
                 )
-                return {"category": category, "places": []}
-            
-            # Rate limit with semaphore
-            async with self._rate_limiter:
-                url = "https://places.googleapis.com/v1/places:searchText"
-                headers = {
-                    "X-Goog-Api-Key": self.api_key,
-                    "X-Goog-FieldMask": (
-                        "places.id,places.displayName,places.formattedAddress,"
-                        "places.location,places.rating,places.userRatingCount,"
-                        "places.priceLevel,places.types,places.websiteUri,"
-                        "places.internationalPhoneNumber,places.googleMapsUri"
-                    )
-                }
-                body: Dict[str, any] = {"textQuery": text_query, "pageSize": page_size}
-                if coordinates and radius:
-                    body["locationBias"] = {
-                        "circle": {
-                            "center": {"latitude": coordinates[0], "longitude": coordinates[1]},
-                            "radius": radius
-                        }
+                return None
+            
+            body: Dict[str, any] = {"textQuery": text_query, "pageSize": page_size}
+            if coordinates and radius:
+                body["locationBias"] = {
+                    "circle": {
+                        "center": {"latitude": coordinates[0], "longitude": coordinates[1]},
+                        "radius": radius
                     }
-                
-                resp = await self.http_client.post(url, headers=headers, json=body)
-                self.api_calls_made += 1
-                
-                if resp.status_code != 200:
-                    self.logger.error(f"Places v1 searchText error: {resp.status_code} {resp.text}")
-                    return {"category": category, "places": []}
-                
-                data = resp.json()
-                raw_places = data.get("places", [])
-                
-                # Transform and cache
-                transformed = []
-                for place in raw_places:
-                    t = self._transform_place_v1(place)
-                    if t:
-                        transformed.append(t)
-                
-                # Cache for 1 hour
-                places_cache.set_cached("places_search", transformed, ttl_seconds=3600, **cache_key_params)
-                
-                return {"category": category, "places": transformed}
-                
+                }
+            
+            # Rate limited and retried on 429/5xx; only successful calls count against the cap
+            resp = await self._post_places(PLACES_SEARCH_URL, _SEARCH_HEADERS, body)
+            
+            if resp.status_code != 200:
+                self.logger.error(f"Places v1 searchText error: {resp.status_code} {resp.text}")
+                return None
+            
+            self.api_calls_made += 1
+            data = orjson.loads(resp.content)
+            raw_places = data.get("places", [])
+            
+            # Transform and cache
+            transformed = []
+            for place in raw_places:
+                t = self._transform_place_v1(place)
+                if t:
+                    transformed.append(t)
+            
+            # Venues change slowly; share results across trips for PLACES_CACHE_TTL_SECONDS
+            places_cache.set_cached("places_search", transformed, ttl_seconds=self.places_cache_ttl, **cache_key_params)
+            
+            return transformed
+            
         except Exception as e:
             self.logger.error(f"Places v1 searchText exception: {str(e)}")
-            return {"category": category, "places": []}
+            return None
 
     async def _research_top_attractions_async(self, destination: str) -> List[str]:
         """Use a lightweight Gemini prompt to list top must-visit attractions by name only (async).
@@ -747,9 +615,12 @@ class GooglePlacesService:
         try:
             if not vertexai or not GenerativeModel:
                 return names
-
-            # Run in executor to avoid blocking
-            loop = asyncio.get_event_loop()
+            
+            # The prompt depends only on the destination, so popular cities are served from cache
+            destination_key = (destination or "").strip().lower()
+            cached = places_cache.get_cached("attraction_research", destination=destination_key)
+            if cached is not None:
+                return list(cached)
             
             def _do_research():
                 # Initialize Vertex AI from global settings
@@ -797,9 +668,8 @@ Return ONLY a JSON array of strings. Example: ["Place Name 1", "Place Name 2", "
                     return []
 
                 # Try direct JSON parsing, otherwise find first bracketed array
-                import json as _json
                 try:
-                    parsed = _json.loads(text)
+                    parsed = orjson.loads(text)
                     if isinstance(parsed, list):
                         return [str(x) for x in parsed if isinstance(x, (str, int, float))]
                 except Exception:
@@ -809,118 +679,170 @@ Return ONLY a JSON array of strings. Example: ["Place Name 1", "Place Name 2", "
                 end = text.rfind(']')
                 if start != -1 and end != -1 and end > start:
                     try:
-                        parsed = _json.loads(text[start:end+1])
+                        parsed = orjson.loads(text[start:end+1])
                         if isinstance(parsed, list):
                             return [str(x) for x in parsed if isinstance(x, (str, int, float))]
                     except Exception:
                         return []
                 return []
             
-            names = await loop.run_in_executor(None, _do_research)
-            return names
+            def _research_and_cache():
+                # Cached from the worker thread, so the result is kept even if the awaiting
+                # trip stopped waiting for it
+                result = _do_research()
+                if result:
+                    places_cache.set_cached("attraction_research", tuple(result), ttl_seconds=7 * 86400, destination=destination_key)
+                return result
+            
+            # Run in a worker thread to avoid blocking
+            return await asyncio.to_thread(_research_and_cache)
         except Exception:
             return []
     
-    async def _process_accommodations(self, places: List[Dict], request: TripPlanRequest) -> List[Dict]:
-        """Process and rank accommodation places."""
-        unique = self._remove_duplicates(places)
-        
-        # Filter by price levels
-        allowed_levels = self._get_price_levels_for_style(request.primary_travel_style)
-        filtered = [p for p in unique if p.get('price_level') is None or p.get('price_level') in allowed_levels]
-        
-        # Score and sort
-        def score(p: Dict) -> float:
-            rating = float(p.get('rating') or 0.0)
-            reviews = float(p.get('user_ratings_total') or 0)
+    def _rank_core_categories(self, places_data: Dict[str, List[Dict]], request: TripPlanRequest, accom_type: str) -> Tuple[List[Dict], List[Dict], List[Dict]]:
+        """Ranked (accommodations, attractions, restaurants) for the trip."""
+        return (
+            self._process_accommodations(places_data["accommodations"], request, accom_type),
+            self._process_attractions(places_data["attractions"]),
+            self._process_restaurants(places_data["restaurants"], request),
+        )
+    
+    def _process_accommodations(self, places: List[Dict], request: TripPlanRequest, accom_type: str) -> List[Dict]:
+        """Process and rank accommodation places (already unique by place_id)."""
+        # The allowed price band and the style-aligned band are the same levels, so a single
+        # membership test both filters a place and sets its alignment bonus. Places without
+        # price info are kept with the lower bonus.
+        target = frozenset(self._get_price_levels_for_style(request.primary_travel_style))
+        
+        # Filter and score in one pass, then select the top 20 without a full sort. Places
+        # that look like the requested accommodation type rank ahead of the rest.
+        scored = []
+        for p in places:
             price = p.get('price_level')
-            
-            # Align price to style
-            style = request.primary_travel_style
-            if style == TravelStyle.BUDGET:
-                target = {1, 2}
-            elif style == TravelStyle.LUXURY:
-                target = {3, 4}
+            if price is None:
+                align = 0.6
+            elif price in target:
+                align = 1.0
             else:
-                target = {2, 3}
-            align = 1.0 if (isinstance(price, int) and price in target) else 0.6
-            
-            return rating * 100 + min(reviews, 5000) * 0.02 + align * 10
+                continue
+            score = float(p.get('rating') or 0.0) * 100 + min(float(p.get('user_ratings_total') or 0), 5000) * 0.02 + align * 10
+            scored.append(((self._accommodation_matches_type(p, accom_type), score), p))
         
-        filtered.sort(key=score, reverse=True)
-        return filtered[:20]
+        return [p for _, p in heapq.nlargest(20, scored, key=itemgetter(0))]
     
-    async def _process_restaurants(self, places: List[Dict], request: TripPlanRequest) -> List[Dict]:
-        """Process and rank restaurant places."""
-        unique = self._remove_duplicates(places)
-        
-        must_try = set((request.must_try_cuisines or [])[:5])
-        dietary = set((request.dietary_restrictions or [])[:3])
-        
-        def score(p: Dict) -> float:
-            rating = float(p.get('rating') or 0.0)
-            reviews = float(p.get('user_ratings_total') or 0)
-            name = (p.get('name') or '').lower()
-            addr = (p.get('address') or '').lower()
-            text = name + ' ' + addr
-            cuisine_boost = 0.0
-            for c in must_try:
-                if isinstance(c, str) and c.lower() in text:
-                    cuisine_boost += 10.0
-            for d in dietary:
-                if isinstance(d, str) and d.lower() in text:
-                    cuisine_boost += 6.0
-            return rating * 100 + min(reviews, 10000) * 0.03 + cuisine_boost
-        
-        unique.sort(key=score, reverse=True)
-        
-        # Filter valid coordinates
-        cleaned = []
-        for r in unique:
-            if not r.get('place_id'):
+    def _process_restaurants(self, places: List[Dict], request: TripPlanRequest) -> List[Dict]:
+        """Process and rank restaurant places (already unique by place_id)."""
+        # Lower-case cuisine/dietary preferences once instead of per scored place
+        must_try = {c.lower() for c in (request.must_try_cuisines or [])[:5] if isinstance(c, str)}
+        dietary = {d.lower() for d in (request.dietary_restrictions or [])[:3] if isinstance(d, str)}
+        
+        scored = []
+        for p in places:
+            # Filter valid coordinates
+            if not p.get('place_id'):
                 continue
-            coords = r.get('coordinates') or {}
+            coords = p.get('coordinates') or {}
             if coords.get('lat') is None or coords.get('lng') is None:
                 continue
-            cleaned.append(r)
+            text = (p.get('name') or '').lower() + ' ' + (p.get('address') or '').lower()
+            cuisine_boost = 10.0 * sum(1 for c in must_try if c in text) + 6.0 * sum(1 for d in dietary if d in text)
+            score = float(p.get('rating') or 0.0) * 100 + min(float(p.get('user_ratings_total') or 0), 10000) * 0.03 + cuisine_boost
+            scored.append((score, p))
         
-        return cleaned[:25]
+        return [p for _, p in heapq.nlargest(25, scored, key=itemgetter(0))]
     
-    async def _process_attractions(self, places: List[Dict]) -> List[Dict]:
-        """Process and rank attraction places."""
-        unique = self._remove_duplicates(places)
-        
-        def score(p: Dict) -> float:
-            rating = float(p.get('rating') or 0.0)
-            reviews = float(p.get('user_ratings_total') or 0)
-            return rating * 100 + min(reviews, 20000) * 0.02
+    def _process_attractions(self, places: List[Dict]) -> List[Dict]:
+        """Process and rank attraction places (already unique by place_id)."""
+        # Landmarks often come back under several place IDs across queries
+        places = self._merge_nearby_duplicates(places)
+        
+        # Prefer high-rating and crowd-validated spots. The pool (baseline + researched)
+        # is often several times the cut, so select the top 40 without a full sort.
+        scored = [
+            (float(p.get('rating') or 0.0) * 100 + min(float(p.get('user_ratings_total') or 0), 20000) * 0.02, p)
+            for p in places
+        ]
+        return [p for _, p in heapq.nlargest(40, scored, key=itemgetter(0))]
+    
+    def _merge_nearby_duplicates(self, places: List[Dict], radius_m: float = 25.0) -> List[Dict]:
+        """Collapse same-venue entries that carry different place IDs.
+        Two places are merged when they lie within radius_m of each other and one normalized
+        name contains the other; the entry with the best rating * log(1 + reviews) is kept.
+        Uses a uniform lat/lng grid so each place is only compared with its neighbouring cells."""
+        lat_cell = radius_m / _METERS_PER_DEGREE
+        lng_cell = None
+        grid: Dict[Tuple[int, int], List[int]] = {}
+        kept: List[Dict] = []
+        meta: List[Tuple[float, float, str, float]] = []
         
-        unique.sort(key=score, reverse=True)
-        return unique[:40]
+        for place in places:
+            coords = place.get('coordinates') or {}
+            lat, lng = coords.get('lat'), coords.get('lng')
+            name = _normalize_place_name(place.get('name'))
+            if lat is None or lng is None or not name:
+                kept.append(place)
+                meta.append((0.0, 0.0, '', 0.0))
+                continue
+            if lng_cell is None:
+                lng_scale = max(math.cos(math.radians(lat)), 0.01)
+                lng_cell = lat_cell / lng_scale
+            quality = float(place.get('rating') or 0.0) * math.log1p(float(place.get('user_ratings_total') or 0))
+            cell_x, cell_y = int(lat // lat_cell), int(lng // lng_cell)
+            
+            match = None
+            for dx in (-1, 0, 1):
+                for dy in (-1, 0, 1):
+                    for idx in grid.get((cell_x + dx, cell_y + dy), ()):
+                        o_lat, o_lng, o_name, _ = meta[idx]
+                        dist = math.hypot((lat - o_lat) * _METERS_PER_DEGREE, (lng - o_lng) * _METERS_PER_DEGREE * lng_scale)
+                        if dist <= radius_m and (name in o_name or o_name in name):
+                            match = idx
+                            break
+                    if match is not None:
+                        break
+                if match is not None:
+                    break
+            
+            if match is None:
+                grid.setdefault((cell_x, cell_y), []).append(len(kept))
+                kept.append(place)
+                meta.append((lat, lng, name, quality))
+            elif quality > meta[match][3]:
+                kept[match] = place
+                meta[match] = (meta[match][0], meta[match][1], meta[match][2], quality)
+        
+        if len(kept) < len(places):
+            self.logger.debug("Merged %d near-duplicate places", len(places) - len(kept))
+        return kept
     
     def _transform_place_v1(self, place: Dict[str, any]) -> Optional[Dict]:
-        """Transform Places API v1 place into our standardized structure."""
-        try:
-            return {
-                'place_id': place.get('id'),
-                'name': (place.get('displayName') or {}).get('text'),
-                'address': place.get('formattedAddress'),
-                'coordinates': {
-                    'lat': (place.get('location') or {}).get('latitude'),
-                    'lng': (place.get('location') or {}).get('longitude')
-                },
-                'rating': place.get('rating'),
-                'price_level': place.get('priceLevel'),
-                'opening_hours': None,
-                'website': place.get('websiteUri'),
-                'phone': place.get('internationalPhoneNumber'),
-                'types': place.get('types', []),
-                'user_ratings_total': place.get('userRatingCount', 0),
-                'vicinity': None
-            }
-        except Exception as e:
-            self.logger.error(f"Transform place v1 error: {str(e)}")
+        """Transform Places API v1 place into our standardized structure.
+        price_level is normalized to the 0-4 integer scale used by scoring and the response models."""
+        if not isinstance(place, dict):
+            self.logger.error(f"Transform place v1 error: unexpected payload {type(place).__name__}")
             return None
+        location = place.get('location') or {}
+        price_level = place.get('priceLevel')
+        if isinstance(price_level, str):
+            price_level = _PRICE_LEVELS.get(price_level)
+        return {
+            'place_id': place.get('id'),
+            'name': (place.get('displayName') or {}).get('text'),
+            'address': place.get('formattedAddress'),
+            'coordinates': {
+                'lat': location.get('latitude'),
+                'lng': location.get('longitude')
+            },
+            'rating': place.get('rating'),
+            'price_level': price_level,
+            'opening_hours': None,
+            'website': place.get('websiteUri'),
+            'phone': place.get('internationalPhoneNumber'),
+            # Immutable and interned: the same few dozen type tokens repeat across every cached place
+            'types': tuple(sys.intern(t) for t in place.get('types') or () if isinstance(t, str)),
+            'user_ratings_total': place.get('userRatingCount', 0),
+            'vicinity': None
+        }
     
     def _get_price_levels_for_style(self, travel_style: TravelStyle) -> List[int]:
         """Get appropriate price levels for travel style"""
@@ -938,19 +860,6 @@ Return ONLY a JSON array of strings. Example: ["Place Name 1", "Place Name 2", "
             return True  # Include places without price level info
         return place_price_level in allowed_levels
     
-    def _remove_duplicates(self, places: List[Dict]) -> List[Dict]:
-        """Remove duplicate places based on place_id"""
-        seen_ids = set()
-        unique_places = []
-        
-        for place in places:
-            place_id = place.get('place_id')
-            if place_id and place_id not in seen_ids:
-                seen_ids.add(place_id)
-                unique_places.append(place)
-        
-        return unique_places
-    
     def get_api_calls_made(self) -> int:
         """Get total number of API calls made"""
         return self.api_calls_made
@@ -959,31 +868,29 @@ Return ONLY a JSON array of strings. Example: ["Place Name 1", "Place Name 2", "
     async def fetch_destination_photos(self, destination: str, max_images: int = 3, max_width_px: int = 800) -> List[str]:
         """Fetch up to max_images photo URLs for the destination using Places API v1 (async).
         Returns a list of HTTPS URLs or an empty list on failure.
+        One call per destination (and cached), so it stays outside the per-trip search budget:
+        it neither checks nor counts against max_calls_per_trip.
         """
         try:
             if max_images <= 0:
                 return []
-            # Respect per-trip cap lightly
-            if self.max_calls_per_trip and self.api_calls_made >= self.max_calls_per_trip:
-                return []
-            
-            url = "https://places.googleapis.com/v1/places:searchText"
-            headers = {
-                "X-Goog-Api-Key": self.api_key,
-                "X-Goog-FieldMask": (
-                    "places.id,places.displayName,places.formattedAddress,places.photos"
-                )
+            # Depends only on the destination, so a prefetched or earlier result is reused
+            cache_params = {
+                "destination": (destination or "").strip().lower(),
+                "max_images": max_images,
+                "max_width_px": int(max_width_px),
             }
+            cached = places_cache.get_cached("destination_photos", **cache_params)
+            if cached is not None:
+                return list(cached)
+            
             body = {"textQuery": destination, "pageSize": 1}
             
-            async with self._rate_limiter:
-                resp = await self.http_client.post(url, headers=headers, json=body)
-                self.api_calls_made += 1
-                
+            resp = await self._post_places(PLACES_SEARCH_URL, _PHOTOS_SEARCH_HEADERS, body)
             if resp.status_code != 200:
                 self.logger.warning(f"Destination photos search failed: {resp.status_code} {resp.text}")
                 return []
-            data = resp.json() or {}
+            data = orjson.loads(resp.content) or {}
             places = data.get("places") or []
             if not places:
                 return []
@@ -999,6 +906,8 @@ Return ONLY a JSON array of strings. Example: ["Place Name 1", "Place Name 2", "
                     out.append(media_url)
                 except Exception:
                     continue
+            if out:
+                places_cache.set_cached("destination_photos", tuple(out), ttl_seconds=self.places_cache_ttl, **cache_params)
             return out
         except Exception as e:
             self.logger.warning(f"fetch_destination_photos error: {e}")
@@ -1,14 +1,341 @@
+import asyncio
 import logging
-from typing import Dict, Any, List, Optional
+import re
+import threading
+import time
+from concurrent.futures import Future
+from types import MappingProxyType
+from typing import Dict, Any, List, Optional, Set, Tuple
 from datetime import datetime
 from decimal import Decimal
+from itertools import chain
+from operator import itemgetter
+from urllib.parse import urlencode
 from src.models.request_models import TripPlanRequest
 from src.models.response_models import TripPlanResponse
 from src.services.vertex_ai_service import VertexAIService
 from src.services.google_places_service import GooglePlacesService
 from src.services.travel_service import TravelService
 from src.services.progressive_itinerary_generator import ProgressiveItineraryGenerator
+from src.services import places_cache
+from src.utils.config import get_settings
+from src.utils.log_context import bind_log_context, reset_log_context
 import json
+import orjson
+
+# Time-of-day blocks of a DayItinerary, in chronological order
+_DAY_SLOTS = ("morning", "afternoon", "evening")
+
+# Defaults for required PlaceResponse fields, copied under each coerced place. Read-only
+# so no caller can mutate the shared prototype.
+_PLACE_DEFAULTS = MappingProxyType({
+    "place_id": "unknown",
+    "name": "Unknown",
+    "address": "N/A",
+    "subcategory": None,
+    "rating": None,
+    "price_level": None,
+    "estimated_cost": None,
+    "duration_hours": None,
+    "coordinates": None,
+    "opening_hours": None,
+    "website": None,
+    "phone": None,
+    "why_recommended": None,
+    "booking_required": False,
+    "booking_url": None,
+})
+
+# Keys a coerced place always carries
+_PLACE_REQUIRED_KEYS = frozenset(_PLACE_DEFAULTS) | {"category"}
+
+# Scalar defaults for a DayItinerary time-of-day block ("activities" is set per block)
+_SLOT_BLOCK_DEFAULTS = MappingProxyType({
+    "estimated_cost": 0,
+    "total_duration_hours": 0.0,
+    "transportation_notes": "",
+})
+
+# place_id prefixes the model uses for invented places
+_PLACEHOLDER_PLACE_ID_PREFIXES = ("generic_", "simulated_")
+
+# Activity types that don't point at a visitable place and are dropped from day blocks
+_NON_PLACE_ACTIVITY_TYPES = frozenset({"transport", "accommodation"})
+
+# Candidate categories a generic activity can be replaced from, per target type (in rank-tie order)
+_FALLBACK_CATEGORIES = MappingProxyType({
+    "meal": ("restaurants",),
+    "place": ("attractions", "outdoor_activities", "cultural_sites"),
+})
+
+# Destination photos on public trip cards; shared by the prefetch and the public save so
+# both hit the same cache entry
+_PUBLIC_PHOTO_PARAMS = MappingProxyType({"max_images": 3, "max_width_px": 800})
+
+# Static scaffolding of the minimal response returned when generation fails. Built once;
+# TripPlanResponse validation copies every container, so responses never share it.
+_MINIMAL_RESPONSE_TEMPLATE: Dict[str, Any] = {
+    "version": "1.0",
+    "daily_itineraries": [],
+    "transportation": {
+        "airport_transfers": {},
+        "local_transport_guide": {},
+        "daily_transport_costs": {},
+        "recommended_apps": []
+    },
+    "map_data": {
+        "interactive_map_embed_url": "",
+        "daily_route_maps": {}
+    },
+    "local_information": {
+        "currency_info": {},
+        "language_info": {},
+        "cultural_etiquette": [],
+        "safety_tips": [],
+        "emergency_contacts": {},
+        "local_customs": [],
+        "tipping_guidelines": {},
+        "useful_phrases": {}
+    },
+    "packing_suggestions": [],
+    "weather_forecast_summary": None,
+    "seasonal_considerations": [],
+    "photography_spots": [],
+    "hidden_gems": [],
+    "alternative_itineraries": {},
+    "customization_suggestions": [],
+    "data_freshness_score": 0.0,
+    "confidence_score": 0.0
+}
+_MINIMAL_ACCOMMODATIONS: Dict[str, Any] = {
+    "primary_recommendation": {
+        "place_id": "error",
+        "name": "Error in generation",
+        "address": "N/A",
+        "category": "error",
+        "coordinates": {"lat": 0.0, "lng": 0.0},
+    },
+    "alternative_options": [],
+    "booking_platforms": [],
+    "estimated_cost_per_night": 0,
+    "total_accommodation_cost": 0
+}
+_MINIMAL_BUDGET_BREAKDOWN: Dict[str, Any] = {
+    "accommodation_cost": 0,
+    "food_cost": 0,
+    "activities_cost": 0,
+    "transport_cost": 0,
+    "miscellaneous_cost": 0,
+    "daily_budget_suggestion": 0,
+    "cost_per_person": 0,
+}
+
+# Generations in flight, keyed by request signature. Trips are generated on separate event
+# loops (worker threads) as well as the server loop, so waiters share a thread-safe
+# concurrent.futures.Future rather than an asyncio primitive.
+_inflight_trip_plans: Dict[bytes, "Future[TripPlanResponse]"] = {}
+_inflight_trip_plans_lock = threading.Lock()
+
+
+class _PlanLeaderCancelled(RuntimeError):
+    """Set on a shared in-flight plan when its leader is cancelled; waiters on other loops
+    were not cancelled themselves, so they generate the plan on their own instead."""
+
+# Free-text request fields whose order and spelling don't change the plan
+_CANONICAL_TEXT_FIELDS = ("origin", "destination")
+_CANONICAL_LIST_FIELDS = (
+    "transport_preferences", "dietary_restrictions", "accessibility_needs", "special_occasions",
+    "must_visit_places", "must_try_cuisines", "avoid_places", "language_preferences",
+)
+_WHITESPACE_RE = re.compile(r"\s+")
+# Request fields no generation step reads; requests differing only in these share a plan
+_PLAN_IRRELEVANT_FIELDS = ("budget_breakdown",)
+
+def _canonical_text(value: Any) -> Any:
+    return _WHITESPACE_RE.sub(" ", value).strip().lower() if isinstance(value, str) else value
+
+def _canonical_request(request: TripPlanRequest) -> Dict[str, Any]:
+    """Request dump used as the plan cache key, so near-duplicate requests share an entry.
+
+    Case, surrounding/repeated whitespace and list order of free-text preferences are
+    normalized away; everything that can change the generated plan is kept as-is.
+    """
+    data = request.model_dump(mode="json", exclude=set(_PLAN_IRRELEVANT_FIELDS))
+    for field in _CANONICAL_TEXT_FIELDS:
+        data[field] = _canonical_text(data.get(field))
+    for field in _CANONICAL_LIST_FIELDS:
+        values = data.get(field)
+        if isinstance(values, list):
+            data[field] = sorted({_canonical_text(v) for v in values if isinstance(v, str) and v.strip()})
+    if isinstance(data.get("traveler_ages"), list):
+        data["traveler_ages"] = sorted(data["traveler_ages"])
+    return data
+
+# Sanitizer helpers, defined once at module level rather than rebuilt on every
+# _sanitize_trip_data call
+def _coerce_place(place: Dict[str, Any], default_category: str, context: str) -> Dict[str, Any]:
+    """Fill required PlaceResponse fields on a model-produced place dict."""
+    if not isinstance(place, dict):
+        return place
+    # Fast path: a place that is already complete is returned untouched, without a copy
+    coords = place.get("coordinates")
+    if (
+        _PLACE_REQUIRED_KEYS <= place.keys() and "photos" not in place and place["why_recommended"]
+        and isinstance(coords, dict) and "lat" in coords and "lng" in coords
+    ):
+        return place
+    # Required base fields: copy the prototype, then let existing values win
+    out = _PLACE_DEFAULTS.copy()
+    out["category"] = default_category
+    out.update(place)
+    place = out
+    # price_level strings/floats are coerced by PlaceResponse during validation
+
+    coords = place["coordinates"]
+    if not isinstance(coords, dict) or "lat" not in coords or "lng" not in coords:
+        place["coordinates"] = {"lat": 0.0, "lng": 0.0}
+    # photos removed from schema; ensure none are added
+    place.pop("photos", None)
+    if not place["why_recommended"]:
+        place["why_recommended"] = f"Recommended option for {context}."
+    return place
+
+def _safe_float(value: Any) -> float:
+    """float(value), or 0.0 for missing and non-numeric values (model output is untrusted)."""
+    # Places data is already numeric; skip the float()/try round-trip for it
+    if type(value) is float:
+        return value
+    if type(value) is int:
+        return float(value)
+    try:
+        return float(value or 0.0)
+    except (TypeError, ValueError):
+        return 0.0
+
+def _is_usable_fallback(c: Any) -> bool:
+    if not isinstance(c, dict):
+        return False
+    coords = c.get("coordinates")
+    return (
+        bool(c.get("place_id")) and isinstance(coords, dict)
+        and coords.get("lat") is not None and coords.get("lng") is not None
+    )
+
+def _fallback_score(p: Dict[str, Any]) -> float:
+    # Prefer high rating and reviews
+    get = p.get
+    return _safe_float(get("rating")) * 100 + _safe_float(get("user_ratings_total")) * 0.03
+
+def _enforce_real_place(
+    activity: Dict[str, Any],
+    fallback_pools: Dict[str, Tuple[List[Dict], ...]],
+    target_type: str,
+    best_fallbacks: Dict[str, Optional[Dict[str, Any]]],
+) -> Optional[Dict[str, Any]]:
+    """Keep an activity that points at a real place; swap invalid/simulated/generic ones for
+    the best fallback of `target_type` (memoized in `best_fallbacks`), or drop it (None)."""
+    # Fast path: most activities are well-formed, so index straight in and let a
+    # malformed shape (missing key, None, wrong type) drop to the checks below
+    try:
+        place = activity["activity"]
+        coords = place["coordinates"]
+        pid = place["place_id"]
+        if (
+            pid and not pid.startswith(_PLACEHOLDER_PLACE_ID_PREFIXES)
+            and coords["lat"] not in (None, 0.0) and coords["lng"] not in (None, 0.0)
+        ):
+            return activity
+    except (KeyError, TypeError, AttributeError):
+        pass
+    # Slow path: the shapes are checked explicitly, so nothing below can raise
+    if not isinstance(activity, dict):
+        return None
+    place = activity.get("activity")
+    if not isinstance(place, dict):
+        place = {}
+    pid = place.get("place_id")
+    coords = place.get("coordinates")
+    has_coords = isinstance(coords, dict) and coords.get("lat") not in (None, 0.0) and coords.get("lng") not in (None, 0.0)
+    invalid_pid = not isinstance(pid, str) or not pid or pid.startswith(_PLACEHOLDER_PLACE_ID_PREFIXES)
+    if not invalid_pid and has_coords:
+        return activity
+    if target_type not in best_fallbacks:
+        candidates = chain.from_iterable(fallback_pools.get(target_type, ()))
+        # Filter and rank in one pass, without materializing the usable list
+        best_fallbacks[target_type] = max(
+            (c for c in candidates if _is_usable_fallback(c)), key=_fallback_score, default=None
+        )
+    b = best_fallbacks[target_type]
+    if b is None:
+        return None
+    # Build a new activity with same meta values but real place
+    new_place = {
+        "place_id": b.get("place_id"),
+        "name": b.get("name"),
+        "address": b.get("address"),
+        "category": b.get("category") or ("meal" if target_type == "meal" else "attraction"),
+        "subcategory": b.get("subcategory"),
+        "rating": b.get("rating"),
+        "price_level": b.get("price_level"),
+        "estimated_cost": place.get("estimated_cost"),
+        "duration_hours": place.get("duration_hours"),
+        "coordinates": b.get("coordinates"),
+        "opening_hours": b.get("opening_hours"),
+        "website": b.get("website"),
+        "phone": b.get("phone"),
+        "description": place.get("description") or ("Meal at a recommended spot" if target_type == "meal" else "Visit a popular local place"),
+        "why_recommended": place.get("why_recommended") or ("Highly rated and popular with travelers"),
+        "booking_required": place.get("booking_required", False),
+        "booking_url": place.get("booking_url"),
+        "user_ratings_total": b.get("user_ratings_total")
+    }
+    return {
+        **activity,
+        "activity": new_place,
+        "activity_type": activity.get("activity_type") or ("meal" if target_type == "meal" else "attraction")
+    }
+
+def _thumbnail_score(cat: str, sub: str, rating: float, urt: int, name: str, dest: str) -> float:
+    """Prominence of a place as the public-trip thumbnail for destination `dest` (lower-cased)."""
+    s = 0.0
+    # Category weights
+    if "attraction" in cat or "tourist_attraction" in sub or "landmark" in sub:
+        s += 200
+    elif "cultural" in cat or "museum" in sub:
+        s += 150
+    elif "outdoor" in cat or sub in ("park", "zoo", "aquarium"):
+        s += 120
+    elif "shopping" in cat:
+        s += 60
+    elif "restaurant" in cat or "cafe" in sub or "bar" in sub:
+        s += 40
+    elif "accommodation" in cat or sub == "lodging":
+        s += 30
+    else:
+        s += 10
+
+    # Popularity
+    s += rating * 100.0
+    s += min(urt, 10000) * 0.03
+
+    # Name contains destination keyword bonus
+    if dest and name and dest in name.lower():
+        s += 50
+    return s
+
+# Route-map helpers for _ensure_daily_route_maps
+_MAPS_DIR_URL = "https://www.google.com/maps/dir/?"
+_MAPS_SEARCH_URL = "https://www.google.com/maps/search/?"
+_LAT_LNG = itemgetter("lat", "lng")
+
+def _fmt_point(lat: Any, lng: Any) -> Optional[str]:
+    try:
+        return f"{float(lat):.6f},{float(lng):.6f}"
+    except (TypeError, ValueError):
+        return None
+
+def _is_https_url(s: Any) -> bool:
+    return isinstance(s, str) and s.lower().startswith("https://")
 
 class ItineraryGeneratorService:
     def __init__(self, vertex_ai_service: VertexAIService, places_service: GooglePlacesService, travel_service: TravelService | None = None):
@@ -24,21 +351,121 @@ class ItineraryGeneratorService:
             travel_service=self.travel_service
         )
     
-    async def generate_comprehensive_plan(self, request: TripPlanRequest, trip_id: str) -> TripPlanResponse:
+    async def generate_comprehensive_plan(self, request: TripPlanRequest, trip_id: str, *, use_cache: bool = True) -> TripPlanResponse:
         """Generate a comprehensive trip plan using Vertex AI and Google Places data
         
         Uses progressive generation for trips longer than 7 days to avoid token exhaustion.
+        Identical requests are served from a short-lived plan cache, and concurrent identical
+        requests share a single generation; pass use_cache=False to force a fresh plan (which
+        then replaces the cached one).
         """
+        cache_params = {"request": _canonical_request(request)}
+        if not use_cache:
+            trip_response = await self._generate_plan(request, trip_id)
+            self._store_plan(trip_response, cache_params)
+            return trip_response
+        
+        cached = places_cache.get_cached("trip_plan", **cache_params)
+        if cached is not None:
+            self.logger.info("[itinerary] Serving cached trip plan", extra={"trip_id": trip_id})
+            return self._reissue_plan(cached, trip_id, request)
+        
+        key = orjson.dumps(cache_params, option=orjson.OPT_SORT_KEYS)
+        with _inflight_trip_plans_lock:
+            inflight = _inflight_trip_plans.get(key)
+            if inflight is None:
+                inflight = Future()
+                _inflight_trip_plans[key] = inflight
+                is_leader = True
+            else:
+                is_leader = False
         
-        start_time = datetime.utcnow()
+        if not is_leader:
+            self.logger.info("[itinerary] Joining in-flight generation for identical request", extra={"trip_id": trip_id})
+            try:
+                # Shielded: a cancelled waiter must not cancel the future other waiters share
+                shared = await asyncio.shield(asyncio.wrap_future(inflight))
+            except _PlanLeaderCancelled:
+                self.logger.info("[itinerary] In-flight generation was cancelled; generating", extra={"trip_id": trip_id})
+                return await self.generate_comprehensive_plan(request, trip_id, use_cache=False)
+            return self._reissue_plan(shared, trip_id, request)
+        
+        try:
+            trip_response = await self._generate_plan(request, trip_id)
+            inflight.set_result(self._store_plan(trip_response, cache_params))
+            return trip_response
+        except Exception as e:
+            inflight.set_exception(e)
+            raise
+        except BaseException:
+            # Cancellation (e.g. shutdown) belongs to the leader's loop; never forward a
+            # CancelledError into waiters that callers only guard with `except Exception`
+            inflight.set_exception(_PlanLeaderCancelled("Trip plan generation was cancelled"))
+            raise
+        finally:
+            with _inflight_trip_plans_lock:
+                _inflight_trip_plans.pop(key, None)
+    
+    def _store_plan(self, trip_response: TripPlanResponse, cache_params: Dict[str, Any]) -> TripPlanResponse:
+        """Cache a complete plan under the request key; returns the snapshot shared with waiters.
+
+        The snapshot is a deep copy, untouched by the caller's later edits.
+        """
+        snapshot = trip_response.model_copy(deep=True)
+        if self._is_cacheable_plan(snapshot):
+            places_cache.set_cached(
+                "trip_plan",
+                snapshot,
+                ttl_seconds=get_settings().TRIP_PLAN_CACHE_TTL_SECONDS,
+                **cache_params
+            )
+        return snapshot
+    
+    @staticmethod
+    def _reissue_plan(plan: TripPlanResponse, trip_id: str, request: TripPlanRequest) -> TripPlanResponse:
+        """Independent copy of a shared plan under the caller's trip id.
+
+        The cache key normalizes origin/destination spelling, so they are echoed back as
+        this caller wrote them.
+        """
+        now = datetime.utcnow()
+        return plan.model_copy(
+            update={
+                "trip_id": trip_id,
+                "generated_at": now,
+                "last_updated": now,
+                "origin": request.origin,
+                "destination": request.destination,
+            },
+            deep=True,
+        )
+    
+    @staticmethod
+    def _is_cacheable_plan(trip_response: TripPlanResponse) -> bool:
+        """Only complete plans are cached: no error response, no placeholder (failed) days."""
+        if not trip_response.confidence_score or not trip_response.daily_itineraries:
+            return False
+        for day in trip_response.daily_itineraries:
+            if not any((getattr(day, slot, None) or {}).get("activities") for slot in _DAY_SLOTS):
+                return False
+        return True
+    
+    async def _generate_plan(self, request: TripPlanRequest, trip_id: str) -> TripPlanResponse:
+        """Run the full generation pipeline (no caching)."""
+        start_perf = time.perf_counter()
         trip_duration = (request.end_date - request.start_date).days
+        # Every log record emitted while generating this trip carries its id and destination
+        log_token = bind_log_context(trip_id=trip_id, destination=request.destination)
+        # The public copy needs destination photos; fetch them while the plan is generated
+        # so the save after generation is served from the places cache
+        photos_prefetch = asyncio.create_task(
+            self.places_service.fetch_destination_photos(request.destination, **_PUBLIC_PHOTO_PARAMS)
+        )
         
         try:
             self.logger.info(
                 "[itinerary] Start generation",
                 extra={
-                    "trip_id": trip_id,
-                    "destination": request.destination,
                     "dates": f"{request.start_date} to {request.end_date}",
                     "duration": trip_duration,
                     "group_size": request.group_size,
@@ -53,8 +480,7 @@ class ItineraryGeneratorService:
             self.logger.info(
                 "[itinerary] Trip plan completed successfully",
                 extra={
-                    "trip_id": trip_id,
-                    "generation_time_s": round((datetime.utcnow() - start_time).total_seconds(), 2),
+                    "generation_time_s": round(time.perf_counter() - start_perf, 2),
                     "days": trip_response.trip_duration_days,
                     "itineraries_count": len(trip_response.daily_itineraries or [])
                 }
@@ -65,11 +491,16 @@ class ItineraryGeneratorService:
         except Exception as e:
             self.logger.error("[itinerary] Error during generation", extra={"error": str(e)})
             return self._create_minimal_response(request, trip_id, str(e))
+        finally:
+            if not photos_prefetch.done():
+                photos_prefetch.cancel()
+            reset_log_context(log_token)
 
     # --- Public trips: save without photos (photos removed from schema) ---
-    async def create_and_save_public_trip(self, trip_response: TripPlanResponse, request: TripPlanRequest, fs_manager, *, title: str | None = None, summary: str | None = None) -> None:
+    async def create_and_save_public_trip(self, trip_response: TripPlanResponse, request: TripPlanRequest, fs_manager, *, title: str | None = None, summary: str | None = None, request_json: Dict[str, Any] | None = None, itinerary_json: Dict[str, Any] | None = None) -> None:
+        """Save the public copy of a trip; callers that already dumped the request/itinerary can pass those dicts to skip a second dump."""
         try:
-            self.logger.info(f"[public_trip] Starting generation for trip ID: {trip_response.trip_id}")
+            self.logger.info("[public_trip] Starting generation for trip ID: %s", trip_response.trip_id)
             # Build an enhanced title/summary derived from itinerary content
             style = (getattr(trip_response, "travel_style", None) or "travel").strip()
             out_title = title or f"{trip_response.destination}: {trip_response.trip_duration_days}-day {style} itinerary".strip()
@@ -102,15 +533,15 @@ class ItineraryGeneratorService:
             # Fetch up to 3 destination-level photos for public trip cards (does not affect AI response schema)
             destination_photos: list[str] = []
             try:
-                destination_photos = await self.places_service.fetch_destination_photos(request.destination, max_images=3, max_width_px=800)
+                destination_photos = await self.places_service.fetch_destination_photos(request.destination, **_PUBLIC_PHOTO_PARAMS)
             except Exception as ph_err:
                 self.logger.warning("[public_trip] Destination photos fetch failed", extra={"error": str(ph_err)})
 
             try:
                 await fs_manager.save_public_trip(
                     trip_id=trip_response.trip_id,
-                    request_data=request.model_dump(mode="json"),
-                    itinerary_data=trip_response.model_dump(mode="json"),
+                    request_data=request_json if request_json is not None else request.model_dump(mode="json"),
+                    itinerary_data=itinerary_json if itinerary_json is not None else trip_response.model_dump(mode="json"),
                     title=out_title,
                     summary=out_summary,
                     thumbnail_photo_reference=selected_place_id,
@@ -125,235 +556,125 @@ class ItineraryGeneratorService:
     # (photo sanitization removed)
 
     def _sanitize_trip_data(self, data: Dict[str, Any]) -> Dict[str, Any]:
-        """Coerce a few common fields into expected shapes without transforming semantics."""
-        try:
-            # Travel options: coerce to list of TravelOptionResponse-compatible dicts
-            tos = data.get("travel_options")
-            if isinstance(tos, list):
-                norm: List[Dict[str, Any]] = []
-                for opt in tos:
-                    if not isinstance(opt, dict):
-                        continue
-                    o = {
-                        "mode": opt.get("mode") or "multi-leg",
-                        "details": opt.get("details"),
-                        "estimated_cost": opt.get("estimated_cost"),
-                        "booking_link": opt.get("booking_link"),
-                        "legs": []
-                    }
-                    legs = opt.get("legs")
-                    if isinstance(legs, list):
-                        for leg in legs:
-                            if isinstance(leg, dict):
-                                o["legs"].append({
-                                    "mode": leg.get("mode") or o["mode"],
-                                    "from_location": leg.get("from_location"),
-                                    "to_location": leg.get("to_location"),
-                                    "estimated_cost": leg.get("estimated_cost"),
-                                    "duration_hours": leg.get("duration_hours"),
-                                    "booking_link": leg.get("booking_link"),
-                                    "notes": leg.get("notes"),
-                                })
-                    norm.append(o)
-                data["travel_options"] = norm
-
-            def _coerce_place(place: Dict[str, Any], default_category: str, context: str) -> Dict[str, Any]:
-                if not isinstance(place, dict):
-                    return place
-                # Required base fields
-                place.setdefault("place_id", "unknown")
-                place.setdefault("name", "Unknown")
-                place.setdefault("address", "N/A")
-                place.setdefault("category", default_category)
-                place.setdefault("subcategory", None)
-                place.setdefault("rating", None)
-                
-                # Convert price_level from string to integer if needed
-                price_level = place.get("price_level")
-                if isinstance(price_level, str):
-                    # LLM sometimes returns "PRICE_LEVEL_INEXPENSIVE" etc instead of integers
-                    price_mapping = {
-                        "PRICE_LEVEL_FREE": 0,
-                        "PRICE_LEVEL_INEXPENSIVE": 1,
-                        "PRICE_LEVEL_MODERATE": 2,
-                        "PRICE_LEVEL_EXPENSIVE": 3,
-                        "PRICE_LEVEL_VERY_EXPENSIVE": 4,
-                    }
-                    place["price_level"] = price_mapping.get(price_level.upper(), None)
-                elif price_level is not None and not isinstance(price_level, int):
-                    # Try to convert to int, or set to None
-                    try:
-                        place["price_level"] = int(price_level)
-                    except (ValueError, TypeError):
-                        place["price_level"] = None
-                else:
-                    place.setdefault("price_level", None)
-                
-                place.setdefault("estimated_cost", None)
-                place.setdefault("duration_hours", None)
-                coords = place.get("coordinates")
-                if not isinstance(coords, dict) or "lat" not in coords or "lng" not in coords:
-                    place["coordinates"] = {"lat": 0.0, "lng": 0.0}
-                place.setdefault("opening_hours", None)
-                place.setdefault("website", None)
-                place.setdefault("phone", None)
-                # photos removed from schema; ensure none are added
-                if "photos" in place:
-                    place.pop("photos", None)
-                if not place.get("why_recommended"):
-                    place["why_recommended"] = f"Recommended option for {context}."
-                if "booking_required" not in place:
-                    place["booking_required"] = False
-                if "booking_url" not in place:
-                    place["booking_url"] = None
-                return place
-
-            # Helper: enforce that activity points to a real place; replace invalid/simulated/generic
-            def _enforce_real_place(activity: Dict[str, Any], fallback_lists: Dict[str, List[Dict]], target_type: str) -> Optional[Dict[str, Any]]:
-                try:
-                    act = activity or {}
-                    place = act.get("activity") or {}
-                    pid = place.get("place_id")
-                    coords = (place.get("coordinates") or {})
-                    has_coords = isinstance(coords, dict) and coords.get("lat") not in (None, 0.0) and coords.get("lng") not in (None, 0.0)
-                    invalid_pid = not isinstance(pid, str) or not pid or pid.startswith("generic_") or pid.startswith("simulated_")
-                    if not invalid_pid and has_coords:
-                        return activity
-                    # Choose fallback list based on target_type
-                    if target_type == "meal":
-                        candidates = fallback_lists.get("restaurants") or []
-                    else:
-                        candidates = (fallback_lists.get("attractions") or []) + (fallback_lists.get("outdoor_activities") or []) + (fallback_lists.get("cultural_sites") or [])
-                    if not candidates:
-                        return None
-                    # Prefer high rating and reviews
-                    def _score(p: Dict[str, Any]) -> float:
-                        return float(p.get("rating") or 0.0) * 100 + float(p.get("user_ratings_total") or 0) * 0.03
-                    best = sorted([c for c in candidates if c.get("place_id") and (c.get("coordinates") or {}).get("lat") is not None and (c.get("coordinates") or {}).get("lng") is not None], key=_score, reverse=True)
-                    if not best:
-                        return None
-                    b = best[0]
-                    # Build a new activity with same meta values but real place
-                    new_place = {
-                        "place_id": b.get("place_id"),
-                        "name": b.get("name"),
-                        "address": b.get("address"),
-                        "category": b.get("category") or ("meal" if target_type == "meal" else "attraction"),
-                        "subcategory": b.get("subcategory"),
-                        "rating": b.get("rating"),
-                        "price_level": b.get("price_level"),
-                        "estimated_cost": place.get("estimated_cost"),
-                        "duration_hours": place.get("duration_hours"),
-                        "coordinates": b.get("coordinates"),
-                        "opening_hours": b.get("opening_hours"),
-                        "website": b.get("website"),
-                        "phone": b.get("phone"),
-                        "description": place.get("description") or ("Meal at a recommended spot" if target_type == "meal" else "Visit a popular local place"),
-                        "why_recommended": place.get("why_recommended") or ("Highly rated and popular with travelers"),
-                        "booking_required": place.get("booking_required", False),
-                        "booking_url": place.get("booking_url"),
-                        "user_ratings_total": b.get("user_ratings_total")
-                    }
-                    return {
-                        **activity,
-                        "activity": new_place,
-                        "activity_type": activity.get("activity_type") or ("meal" if target_type == "meal" else "attraction")
-                    }
-                except Exception:
-                    return None
-
-            # Daily itineraries: ensure morning/afternoon/evening have proper blocks
-            itins = data.get("daily_itineraries")
-            if isinstance(itins, list):
-                for day in itins:
-                    if not isinstance(day, dict):
-                        continue
-                    for slot in ("morning", "afternoon", "evening"):
-                        blk = day.get(slot)
-                        if not isinstance(blk, dict):
-                            day[slot] = {"activities": [], "estimated_cost": 0, "total_duration_hours": 0.0, "transportation_notes": ""}
-                        else:
-                            if not isinstance(blk.get("activities"), list):
-                                blk["activities"] = []
-                            if "estimated_cost" not in blk:
-                                blk["estimated_cost"] = 0
-                            if "total_duration_hours" not in blk:
-                                blk["total_duration_hours"] = 0.0
-                            if "transportation_notes" not in blk:
-                                blk["transportation_notes"] = ""
-
-                    # Enforce place-only activities and replace generics
-                    fallback_lists = {
-                        "restaurants": (data.get("restaurants") or []) + ((data.get("places_data") or {}).get("restaurants") or []),
-                        "attractions": (data.get("attractions") or []) + ((data.get("places_data") or {}).get("attractions") or []),
-                        "outdoor_activities": (data.get("outdoor_activities") or []) + ((data.get("places_data") or {}).get("outdoor_activities") or []),
-                        "cultural_sites": (data.get("cultural_sites") or []) + ((data.get("places_data") or {}).get("cultural_sites") or []),
-                    }
-                    for slot in ("morning", "afternoon", "evening"):
-                        blk = day.get(slot) or {}
-                        new_acts = []
-                        for act in blk.get("activities", []) or []:
-                            a_type = (act or {}).get("activity_type") or ""
-                            if a_type in ("transport", "accommodation"):
-                                # Drop non-place activities
-                                continue
-                            target_type = "meal" if a_type == "meal" else "place"
-                            fixed = _enforce_real_place(act, fallback_lists, target_type)
-                            if fixed:
-                                new_acts.append(fixed)
-                        # Keep it concise: max 2 activities per block
-                        blk["activities"] = new_acts[:2]
-
-            # Transportation: ensure dicts, not strings
-            trans = data.get("transportation")
-            if isinstance(trans, dict):
-                for key in ("airport_transfers", "local_transport_guide"):
-                    if key in trans and isinstance(trans[key], str):
-                        trans[key] = {"notes": trans[key]}
-                if "daily_transport_costs" in trans and not isinstance(trans["daily_transport_costs"], dict):
-                    trans["daily_transport_costs"] = {}
-            elif isinstance(trans, str):
-                data["transportation"] = {"local_transport_guide": {"notes": trans}, "daily_transport_costs": {}, "airport_transfers": {}}
-
-            # Accommodations: ensure primary_recommendation has a string place_id
-            acc = data.get("accommodations")
-            if isinstance(acc, dict):
-                primary = acc.get("primary_recommendation")
-                if isinstance(primary, dict):
-                    pid = primary.get("place_id")
-                    if pid is None or not isinstance(pid, str) or not pid:
-                        # Try to take from alternative_options
-                        alts = acc.get("alternative_options") or []
-                        if isinstance(alts, list) and alts:
-                            first = alts[0]
-                            if isinstance(first, dict) and isinstance(first.get("place_id"), str):
-                                primary["place_id"] = first.get("place_id")
-                                primary["name"] = primary.get("name") or first.get("name")
-                                primary["address"] = primary.get("address") or first.get("address")
-                        if primary.get("place_id") in (None, ""):
-                            primary["place_id"] = "unknown"
-                            primary["name"] = primary.get("name") or "Accommodation"
-                            primary["address"] = primary.get("address") or "N/A"
-
-                    # Ensure required PlaceResponse fields
-                    _coerce_place(primary, "accommodation", "primary accommodation")
-
-                # Coerce alternative_options under accommodations
-                alt_acc = acc.get("alternative_options")
-                if isinstance(alt_acc, list):
-                    acc["alternative_options"] = [_coerce_place(p, "accommodation", "accommodation alternative") for p in alt_acc]
-
-            # Photography spots & hidden gems
-            spots = data.get("photography_spots")
-            if isinstance(spots, list):
-                data["photography_spots"] = [_coerce_place(p, "photography_spot", "photography spot") for p in spots]
-            gems = data.get("hidden_gems")
-            if isinstance(gems, list):
-                data["hidden_gems"] = [_coerce_place(p, "hidden_gem", "hidden gem") for p in gems]
+        """Coerce a few common fields into expected shapes without transforming semantics.
 
+        Every shape is checked explicitly, so malformed model output is repaired or skipped
+        here, and a genuine bug surfaces to the caller instead of half-sanitized data.
+        """
+        if not isinstance(data, dict):
             return data
-        except Exception:
-            return data
+        # Travel options (missing modes, non-dict entries) are normalized by
+        # TravelOptionResponse while the response is validated
+
+        # Best-scored fallback place per target type. The fallback lists are the same for
+        # every activity in this trip, so each type is ranked once, not per replacement.
+        best_fallbacks: Dict[str, Optional[Dict[str, Any]]] = {}
+        # Activities swapped for a fallback or dropped; a rise signals model-output regressions
+        replaced = dropped = 0
+
+        # Daily itineraries: ensure morning/afternoon/evening have proper blocks
+        itins = data.get("daily_itineraries")
+        if isinstance(itins, list):
+            # Replacement pools for generic activities, one per target type; they depend
+            # only on the trip, so they are resolved once rather than per day. Each pool is
+            # kept as its source lists (top level, then places_data, per category) and
+            # chained when ranked, not concatenated.
+            places_data = data.get("places_data")
+            if not isinstance(places_data, dict):
+                places_data = {}
+            fallback_pools = {
+                target: tuple(
+                    source
+                    for category in categories
+                    for source in (data.get(category), places_data.get(category))
+                    if isinstance(source, list)
+                )
+                for target, categories in _FALLBACK_CATEGORIES.items()
+            }
+            for day in itins:
+                if not isinstance(day, dict):
+                    continue
+                # Enforce place-only activities and replace generics
+                # One pass per slot: shape the block, then filter its activities
+                for slot in _DAY_SLOTS:
+                    blk = day.get(slot)
+                    if not isinstance(blk, dict):
+                        day[slot] = {**_SLOT_BLOCK_DEFAULTS, "activities": []}
+                        continue
+                    # Merge over the defaults in one step (existing values win), unless
+                    # the block already has them all
+                    if not _SLOT_BLOCK_DEFAULTS.keys() <= blk.keys():
+                        day[slot] = blk = {**_SLOT_BLOCK_DEFAULTS, **blk}
+                    acts = blk.get("activities")
+                    if not isinstance(acts, list) or not acts:
+                        blk["activities"] = []
+                        continue
+                    new_acts = []
+                    for act in acts:
+                        if not isinstance(act, dict):
+                            continue
+                        a_type = act.get("activity_type")
+                        if not isinstance(a_type, str):
+                            a_type = ""
+                        if a_type in _NON_PLACE_ACTIVITY_TYPES:
+                            # Drop non-place activities
+                            continue
+                        target_type = "meal" if a_type == "meal" else "place"
+                        fixed = _enforce_real_place(act, fallback_pools, target_type, best_fallbacks)
+                        if fixed is None:
+                            dropped += 1
+                            continue
+                        if fixed is not act:
+                            replaced += 1
+                        new_acts.append(fixed)
+                    # Keep it concise: max 2 activities per block
+                    blk["activities"] = new_acts[:2]
+
+        # Transportation shapes (strings where objects are expected) are coerced by
+        # TransportationResponse while the response is validated
+
+        # Accommodations: ensure primary_recommendation has a string place_id
+        acc = data.get("accommodations")
+        if isinstance(acc, dict):
+            primary = acc.get("primary_recommendation")
+            if isinstance(primary, dict):
+                pid = primary.get("place_id")
+                if pid is None or not isinstance(pid, str) or not pid:
+                    # Try to take from alternative_options
+                    alts = acc.get("alternative_options") or []
+                    if isinstance(alts, list) and alts:
+                        first = alts[0]
+                        if isinstance(first, dict) and isinstance(first.get("place_id"), str):
+                            primary["place_id"] = first.get("place_id")
+                            primary["name"] = primary.get("name") or first.get("name")
+                            primary["address"] = primary.get("address") or first.get("address")
+                    if primary.get("place_id") in (None, ""):
+                        primary["place_id"] = "unknown"
+                        primary["name"] = primary.get("name") or "Accommodation"
+                        primary["address"] = primary.get("address") or "N/A"
+
+                # Ensure required PlaceResponse fields
+                acc["primary_recommendation"] = _coerce_place(primary, "accommodation", "primary accommodation")
+
+            # Coerce alternative_options under accommodations
+            alt_acc = acc.get("alternative_options")
+            if isinstance(alt_acc, list):
+                acc["alternative_options"] = [_coerce_place(p, "accommodation", "accommodation alternative") for p in alt_acc]
+
+        # Photography spots & hidden gems
+        spots = data.get("photography_spots")
+        if isinstance(spots, list):
+            data["photography_spots"] = [_coerce_place(p, "photography_spot", "photography spot") for p in spots]
+        gems = data.get("hidden_gems")
+        if isinstance(gems, list):
+            data["hidden_gems"] = [_coerce_place(p, "hidden_gem", "hidden gem") for p in gems]
+
+        if replaced or dropped:
+            self.logger.info(
+                "[itinerary] Repaired model activities",
+                extra={"activities_replaced": replaced, "activities_dropped": dropped},
+            )
+        return data
 
     def _ensure_daily_route_maps(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Ensure map_data.daily_route_maps contains a valid HTTPS route URL for each day.
@@ -361,174 +682,78 @@ class ItineraryGeneratorService:
         including meal stops, in chronological order. If only one coordinate is available, creates a
         Google Maps search URL for that point.
         """
-        try:
-            if not isinstance(data, dict):
-                return data
-            itins = data.get("daily_itineraries")
-            if not isinstance(itins, list) or not itins:
-                return data
-
-            # Ensure map_data shell
-            md = data.get("map_data")
-            if not isinstance(md, dict):
-                md = {
-                    "interactive_map_embed_url": "",
-                    "daily_route_maps": {}
-                }
-                data["map_data"] = md
-            drm = md.get("daily_route_maps")
-            if not isinstance(drm, dict):
-                drm = {}
-                md["daily_route_maps"] = drm
-
-            def fmt_point(lat: Any, lng: Any) -> Optional[str]:
-                try:
-                    return f"{float(lat):.6f},{float(lng):.6f}"
-                except Exception:
-                    return None
-
-            def is_https_url(s: Any) -> bool:
-                return isinstance(s, str) and s.lower().startswith("https://")
-
-            for day in itins:
-                if not isinstance(day, dict):
-                    continue
-                day_num = day.get("day_number") or 0
-                key = f"Day {day_num}" if day_num else None
-                # Collect coordinates in chronological order
-                points: List[str] = []
-                for slot in ("morning", "afternoon", "evening"):
-                    blk = day.get(slot) or {}
-                    acts = blk.get("activities") or []
-                    if isinstance(acts, list):
-                        for act in acts:
-                            if not isinstance(act, dict):
-                                continue
-                            place = act.get("activity") or {}
-                            coords = place.get("coordinates") or {}
-                            lat = coords.get("lat")
-                            lng = coords.get("lng")
-                            p = fmt_point(lat, lng)
-                            if p:
-                                # Avoid consecutive duplicates
-                                if not points or points[-1] != p:
-                                    points.append(p)
-
-                if not key:
-                    continue
-
-                url: Optional[str] = None
-                if len(points) >= 2:
-                    origin = points[0]
-                    destination = points[-1]
-                    waypoints = "|".join(points[1:-1]) if len(points) > 2 else ""
-                    if waypoints:
-                        url = (
-                            f"https://www.google.com/maps/dir/?api=1&travelmode=driving"
-                            f"&origin={origin}&destination={destination}&waypoints={waypoints}"
-                        )
-                    else:
-                        url = (
-                            f"https://www.google.com/maps/dir/?api=1&travelmode=driving"
-                            f"&origin={origin}&destination={destination}"
-                        )
-                elif len(points) == 1:
-                    url = f"https://www.google.com/maps/search/?api=1&query={points[0]}"
-
-                # Replace if missing or placeholder (non-HTTPS), otherwise keep model-provided URL
-                existing = drm.get(key)
-                if is_https_url(existing):
-                    # Keep existing valid URL
-                    continue
-                if url:
-                    drm[key] = url
-
+        if not isinstance(data, dict):
             return data
-        except Exception:
+        itins = data.get("daily_itineraries")
+        if not isinstance(itins, list) or not itins:
             return data
 
-    def _enforce_accommodation_from_candidates(self, trip_data: Dict[str, Any], candidates: List[Dict[str, Any]], request: TripPlanRequest) -> Dict[str, Any]:
-        """Ensure the accommodations.primary_recommendation comes from real fetched candidates.
-        If AI invents a placeholder or unknown place_id, replace it with the best-scored candidate.
-        """
-        if not isinstance(trip_data, dict):
-            return trip_data
-        acc = trip_data.get("accommodations")
-        if not isinstance(acc, dict):
-            return trip_data
-        primary = acc.get("primary_recommendation")
-        if not isinstance(primary, dict):
-            primary = {}
-            acc["primary_recommendation"] = primary
-
-        # Build candidate map
-        cand_by_id = {c.get("place_id"): c for c in candidates if isinstance(c, dict) and c.get("place_id")}
-        pid = primary.get("place_id")
-        invalid = (
-            pid is None or not isinstance(pid, str) or not pid.strip() or "placeholder" in pid.lower() or pid not in cand_by_id
-        )
-        if not invalid:
-            return trip_data
-
-        # Select best candidate
-        def score(c: Dict[str, Any]) -> float:
-            rating = float(c.get("rating") or 0.0)
-            reviews = float(c.get("user_ratings_total") or 0)
-            price = c.get("price_level")
-            # Align price band to style
-            style = str(getattr(request, "primary_travel_style", "")).lower()
-            if style == "budget":
-                target = {1, 2}
-            elif style == "luxury":
-                target = {3, 4}
-            else:
-                target = {2, 3}
-            align = 1.0 if (isinstance(price, int) and price in target) else 0.6
-            return rating * 100 + min(reviews, 5000) * 0.02 + align * 10
-
-        best = sorted(candidates, key=score, reverse=True)
-        best_cand = best[0] if best else None
-        if not best_cand:
-            return trip_data
-
-        # Preserve AI rationale fields if present, but overwrite factual fields from candidate
-        preserved_category = primary.get("category") or "Accommodation"
-        preserved_subcat = primary.get("subcategory") or None
-        preserved_desc = primary.get("description")
-        preserved_why = primary.get("why_recommended") or "Fits requested accommodation type and travel style."
-        preserved_booking_required = primary.get("booking_required", False)
-        preserved_booking_url = primary.get("booking_url")
-
-        primary.update({
-            "place_id": best_cand.get("place_id"),
-            "name": best_cand.get("name"),
-            "address": best_cand.get("address"),
-            "coordinates": best_cand.get("coordinates"),
-            "rating": best_cand.get("rating"),
-            "price_level": best_cand.get("price_level"),
-            "opening_hours": best_cand.get("opening_hours"),
-            "website": best_cand.get("website"),
-            "phone": best_cand.get("phone"),
-            "category": preserved_category,
-            "subcategory": preserved_subcat,
-            "description": preserved_desc,
-            "why_recommended": preserved_why,
-            "booking_required": preserved_booking_required,
-            "booking_url": preserved_booking_url,
-        })
-
-        return trip_data
-
-    
-    def _create_minimal_response(self, request: TripPlanRequest, trip_id: str, error_message: str) -> TripPlanResponse:
+        # Ensure map_data shell
+        md = data.get("map_data")
+        if not isinstance(md, dict):
+            md = {
+                "interactive_map_embed_url": "",
+                "daily_route_maps": {}
+            }
+            data["map_data"] = md
+        drm = md.get("daily_route_maps")
+        if not isinstance(drm, dict):
+            drm = {}
+            md["daily_route_maps"] = drm
+
+        for day in itins:
+            if not isinstance(day, dict):
+                continue
+            day_num = day.get("day_number") or 0
+            if not day_num:
+                continue
+            key = f"Day {day_num}"
+            # Keep a model-provided HTTPS URL without walking the day's activities
+            if _is_https_url(drm.get(key)):
+                continue
+            # Collect coordinates in chronological order
+            points: List[str] = []
+            for slot in _DAY_SLOTS:
+                blk = day.get(slot)
+                if not isinstance(blk, dict):
+                    continue
+                acts = blk.get("activities")
+                if isinstance(acts, list):
+                    for act in acts:
+                        try:
+                            p = _fmt_point(*_LAT_LNG(act["activity"]["coordinates"]))
+                        except (KeyError, TypeError):
+                            continue
+                        if p:
+                            # Avoid consecutive duplicates
+                            if not points or points[-1] != p:
+                                points.append(p)
+
+            url: Optional[str] = None
+            if len(points) >= 2:
+                params = {"api": 1, "travelmode": "driving", "origin": points[0], "destination": points[-1]}
+                if len(points) > 2:
+                    params["waypoints"] = "|".join(points[1:-1])
+                url = _MAPS_DIR_URL + urlencode(params)
+            elif len(points) == 1:
+                url = _MAPS_SEARCH_URL + urlencode({"api": 1, "query": points[0]})
+
+            # Replace the missing or placeholder (non-HTTPS) URL
+            if url:
+                drm[key] = url
+
+        return data
+
+    def _create_minimal_response(self, request: TripPlanRequest, trip_id: str, error_message: str, generated_at: Optional[datetime] = None) -> TripPlanResponse:
         """Create a minimal valid response when generation fails"""
         
         trip_duration = (request.end_date - request.start_date).days
+        now = datetime.utcnow()
         
         return TripPlanResponse(
+            **_MINIMAL_RESPONSE_TEMPLATE,
             trip_id=trip_id,
-            generated_at=datetime.utcnow(),
-            version="1.0",
+            generated_at=generated_at or now,
             origin=request.origin,
             destination=request.destination,
             trip_duration_days=trip_duration,
@@ -537,63 +762,20 @@ class ItineraryGeneratorService:
             group_size=request.group_size,
             travel_style=request.primary_travel_style,
             activity_level=request.activity_level,
-            daily_itineraries=[],
             accommodations={
+                **_MINIMAL_ACCOMMODATIONS,
                 "primary_recommendation": {
-                    "place_id": "error",
-                    "name": "Error in generation",
-                    "address": "N/A",
-                    "category": "error",
-                    "coordinates": {"lat": 0.0, "lng": 0.0},
+                    **_MINIMAL_ACCOMMODATIONS["primary_recommendation"],
                     "why_recommended": f"Generation failed: {error_message}"
                 },
-                "alternative_options": [],
-                "booking_platforms": [],
-                "estimated_cost_per_night": 0,
-                "total_accommodation_cost": 0
             },
             budget_breakdown={
+                **_MINIMAL_BUDGET_BREAKDOWN,
                 "total_budget": request.total_budget,
                 "currency": request.budget_currency,
-                "accommodation_cost": 0,
-                "food_cost": 0,
-                "activities_cost": 0,
-                "transport_cost": 0,
-                "miscellaneous_cost": 0,
-                "daily_budget_suggestion": 0,
-                "cost_per_person": 0,
                 "budget_tips": [f"Error: {error_message}"]
             },
-            transportation={
-                "airport_transfers": {},
-                "local_transport_guide": {},
-                "daily_transport_costs": {},
-                "recommended_apps": []
-            },
-            map_data={
-                "interactive_map_embed_url": "",
-                "daily_route_maps": {}
-            },
-            local_information={
-                "currency_info": {},
-                "language_info": {},
-                "cultural_etiquette": [],
-                "safety_tips": [],
-                "emergency_contacts": {},
-                "local_customs": [],
-                "tipping_guidelines": {},
-                "useful_phrases": {}
-            },
-            packing_suggestions=[],
-            weather_forecast_summary=None,
-            seasonal_considerations=[],
-            photography_spots=[],
-            hidden_gems=[],
-            alternative_itineraries={},
-            customization_suggestions=[],
-            last_updated=datetime.utcnow(),
-            data_freshness_score=0.0,
-            confidence_score=0.0
+            last_updated=now,
         )
 
     def _select_representative_place_id(self, trip: TripPlanResponse) -> Optional[str]:
@@ -606,9 +788,15 @@ class ItineraryGeneratorService:
         Returns the best place_id or None.
         """
         try:
-            candidates: Dict[str, Dict[str, Any]] = {}
+            dest = (getattr(trip, "destination", "") or "").lower()
+            # Each place is classified and scored once, when first seen; the running best
+            # is kept instead of a second pass over collected candidates.
+            seen: Set[str] = set()
+            best: Optional[Dict[str, Any]] = None
+            best_score = float("-inf")
 
             def add_candidate(place_like: Any):
+                nonlocal best, best_score
                 try:
                     if not place_like:
                         return
@@ -628,22 +816,28 @@ class ItineraryGeneratorService:
                         urt = getattr(place_like, "user_ratings_total", None)
                     if not isinstance(pid, str) or not pid:
                         return
-                    if pid in candidates:
+                    if pid in seen:
                         return
-                    candidates[pid] = {
-                        "place_id": pid,
-                        "name": name or "",
-                        "category": cat,
-                        "subcategory": sub,
-                        "rating": float(rating) if isinstance(rating, (int, float)) else 0.0,
-                        "user_ratings_total": int(urt) if isinstance(urt, (int, float)) else 0,
-                    }
+                    seen.add(pid)
+                    name = name or ""
+                    s = _thumbnail_score(
+                        cat,
+                        sub,
+                        float(rating) if isinstance(rating, (int, float)) else 0.0,
+                        int(urt) if isinstance(urt, (int, float)) else 0,
+                        name,
+                        dest,
+                    )
+                    # Strictly greater keeps the first of equally scored places
+                    if s > best_score:
+                        best_score = s
+                        best = {"place_id": pid, "name": name, "category": cat}
                 except Exception:
                     return
 
             # 1) Activities across all days
             for day in (trip.daily_itineraries or []):
-                for slot_name in ("morning", "afternoon", "evening"):
+                for slot_name in _DAY_SLOTS:
                     blk = getattr(day, slot_name, None) or {}
                     acts = blk.get("activities") if isinstance(blk, dict) else getattr(blk, "activities", [])
                     if isinstance(acts, list):
@@ -665,42 +859,9 @@ class ItineraryGeneratorService:
             except Exception:
                 pass
 
-            if not candidates:
+            if best is None:
                 return None
 
-            dest = (getattr(trip, "destination", "") or "").lower()
-
-            def score(c: Dict[str, Any]) -> float:
-                s = 0.0
-                cat = c.get("category", "")
-                sub = c.get("subcategory", "")
-                # Category weights
-                if "attraction" in cat or "tourist_attraction" in sub or "landmark" in sub:
-                    s += 200
-                elif "cultural" in cat or "museum" in sub:
-                    s += 150
-                elif "outdoor" in cat or sub in ("park", "zoo", "aquarium"):
-                    s += 120
-                elif "shopping" in cat:
-                    s += 60
-                elif "restaurant" in cat or "cafe" in sub or "bar" in sub:
-                    s += 40
-                elif "accommodation" in cat or sub == "lodging":
-                    s += 30
-                else:
-                    s += 10
-
-                # Popularity
-                s += (c.get("rating", 0.0) or 0.0) * 100.0
-                s += min(c.get("user_ratings_total", 0) or 0, 10000) * 0.03
-
-                # Name contains destination keyword bonus
-                name = (c.get("name") or "").lower()
-                if dest and name and dest in name:
-                    s += 50
-                return s
-
-            best = max(candidates.values(), key=score)
             self.logger.info(
                 "[public_trip] Selected thumbnail place",
                 extra={"place_id": best.get("place_id"), "name": best.get("name"), "category": best.get("category")}
@@ -14,13 +14,52 @@ Key Features:
 
 import asyncio
 import logging
-from typing import List, Dict, Optional, Any, Set
+import time
+import weakref
+from typing import Iterator, List, Dict, Optional, Any, Set
 from datetime import datetime
 import httpx
 
 from src.services import places_cache
 from src.utils.config import get_settings
 
+# Time-of-day blocks of a day itinerary, in chronological order
+_DAY_PERIODS = ("morning", "afternoon", "evening")
+
+
+def _iter_trip_places(trip_data: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Yield every PlaceResponse dict in a trip, in one walk of the itinerary.
+
+    Covers daily activity places, the primary and alternative accommodations,
+    photography spots and hidden gems.
+    """
+    for day in trip_data.get("daily_itineraries") or []:
+        if not isinstance(day, dict):
+            continue
+        for period in _DAY_PERIODS:
+            period_data = day.get(period)
+            if not isinstance(period_data, dict):
+                continue
+            for activity in period_data.get("activities") or []:
+                if isinstance(activity, dict):
+                    activity_place = activity.get("activity")
+                    if isinstance(activity_place, dict):
+                        yield activity_place
+
+    accommodations = trip_data.get("accommodations")
+    if isinstance(accommodations, dict):
+        primary = accommodations.get("primary_recommendation")
+        if isinstance(primary, dict):
+            yield primary
+        for alt in accommodations.get("alternative_options") or []:
+            if isinstance(alt, dict):
+                yield alt
+
+    for key in ("photography_spots", "hidden_gems"):
+        for place in trip_data.get(key) or []:
+            if isinstance(place, dict):
+                yield place
+
 
 class PhotoEnrichmentService:
     """Service for lazy-loading place photos into trip itineraries."""
@@ -39,19 +78,42 @@ class PhotoEnrichmentService:
     def __init__(self, api_key: str):
         self.api_key = api_key
         self.logger = logging.getLogger(__name__)
-        self.http_client = httpx.AsyncClient(
-            timeout=20.0,
-            limits=httpx.Limits(max_keepalive_connections=20, max_connections=50)
-        )
-        # Rate limiter: max 20 concurrent photo fetches
-        self._photo_rate_limiter = asyncio.Semaphore(20)
+        # Enrichment runs on the server event loop and on the worker-thread loops used for
+        # background trips; httpx clients and asyncio semaphores are bound to one loop, so
+        # each loop gets its own.
+        self._http_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+        # Rate limiter: max 20 concurrent photo fetches per event loop
+        self._photo_rate_limiters: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
         self.photos_fetched = 0
         self.cache_hits = 0
         self.cache_misses = 0
     
+    def _get_http_client(self) -> httpx.AsyncClient:
+        """Return the pooled HTTP client bound to the running event loop."""
+        loop = asyncio.get_running_loop()
+        client = self._http_clients.get(loop)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                timeout=20.0,
+                limits=httpx.Limits(max_keepalive_connections=20, max_connections=50)
+            )
+            self._http_clients[loop] = client
+        return client
+    
+    def _get_photo_rate_limiter(self) -> asyncio.Semaphore:
+        """Return the photo-fetch semaphore bound to the running event loop."""
+        loop = asyncio.get_running_loop()
+        limiter = self._photo_rate_limiters.get(loop)
+        if limiter is None:
+            limiter = asyncio.Semaphore(20)
+            self._photo_rate_limiters[loop] = limiter
+        return limiter
+    
     async def close(self):
-        """Close HTTP client connections."""
-        await self.http_client.aclose()
+        """Close the HTTP client owned by the running event loop."""
+        client = self._http_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
     
     async def enrich_trip_with_photos(
         self,
@@ -75,7 +137,7 @@ class PhotoEnrichmentService:
             With caching: <1 second on subsequent calls
         """
         try:
-            start_time = datetime.utcnow()
+            start_perf = time.perf_counter()
             
             # Extract all unique place_ids from the trip
             place_ids = self._extract_all_place_ids(trip_data)
@@ -107,7 +169,7 @@ class PhotoEnrichmentService:
             trip_data["photos_enriched_at"] = datetime.utcnow().isoformat()
             trip_data["photo_enrichment_version"] = "1.0"
             
-            duration = (datetime.utcnow() - start_time).total_seconds()
+            duration = time.perf_counter() - start_perf
             
             self.logger.info(
                 "Photo enrichment complete",
@@ -144,61 +206,10 @@ class PhotoEnrichmentService:
         place_ids: List[str] = []
         
         try:
-            # Extract from daily itineraries
-            daily_itineraries = trip_data.get("daily_itineraries", [])
-            for day in daily_itineraries:
-                if not isinstance(day, dict):
-                    continue
-                
-                # Check morning, afternoon, evening
-                for period in ["morning", "afternoon", "evening"]:
-                    period_data = day.get(period, {})
-                    if not isinstance(period_data, dict):
-                        continue
-                    
-                    activities = period_data.get("activities", [])
-                    for activity in activities:
-                        if isinstance(activity, dict):
-                            activity_place = activity.get("activity", {})
-                            if isinstance(activity_place, dict):
-                                pid = activity_place.get("place_id")
-                                if pid:
-                                    place_ids.append(pid)
-            
-            # Extract from accommodations
-            accommodations = trip_data.get("accommodations", {})
-            if isinstance(accommodations, dict):
-                # Primary recommendation
-                primary = accommodations.get("primary_recommendation", {})
-                if isinstance(primary, dict):
-                    pid = primary.get("place_id")
-                    if pid:
-                        place_ids.append(pid)
-                
-                # Alternative options
-                alternatives = accommodations.get("alternative_options", [])
-                for alt in alternatives:
-                    if isinstance(alt, dict):
-                        pid = alt.get("place_id")
-                        if pid:
-                            place_ids.append(pid)
-            
-            # Extract from photography spots
-            photography_spots = trip_data.get("photography_spots", [])
-            for spot in photography_spots:
-                if isinstance(spot, dict):
-                    pid = spot.get("place_id")
-                    if pid:
-                        place_ids.append(pid)
-            
-            # Extract from hidden gems
-            hidden_gems = trip_data.get("hidden_gems", [])
-            for gem in hidden_gems:
-                if isinstance(gem, dict):
-                    pid = gem.get("place_id")
-                    if pid:
-                        place_ids.append(pid)
-            
+            for place in _iter_trip_places(trip_data):
+                pid = place.get("place_id")
+                if pid:
+                    place_ids.append(pid)
         except Exception as e:
             self.logger.warning(f"Error extracting place_ids: {str(e)}")
         
@@ -277,7 +288,7 @@ class PhotoEnrichmentService:
         
         try:
             # Fetch photos from Places API v1
-            async with self._photo_rate_limiter:
+            async with self._get_photo_rate_limiter():
                 photo_urls = await self._fetch_place_photos_api(place_id, max_photos, photo_width)
             
             self.photos_fetched += 1
@@ -319,7 +330,7 @@ class PhotoEnrichmentService:
                 "X-Goog-FieldMask": "photos"
             }
             
-            resp = await self.http_client.get(url, headers=headers)
+            resp = await self._get_http_client().get(url, headers=headers)
             
             if resp.status_code != 200:
                 self.logger.warning(f"Photo fetch failed for place_id={place_id}: {resp.status_code}")
@@ -378,48 +389,8 @@ class PhotoEnrichmentService:
             Updated trip_data with photos injected
         """
         try:
-            # Update daily itineraries
-            daily_itineraries = trip_data.get("daily_itineraries", [])
-            for day in daily_itineraries:
-                if not isinstance(day, dict):
-                    continue
-                
-                for period in ["morning", "afternoon", "evening"]:
-                    period_data = day.get(period, {})
-                    if not isinstance(period_data, dict):
-                        continue
-                    
-                    activities = period_data.get("activities", [])
-                    for activity in activities:
-                        if isinstance(activity, dict):
-                            activity_place = activity.get("activity", {})
-                            if isinstance(activity_place, dict):
-                                self._update_place_with_photos(activity_place, photos_map)
-            
-            # Update accommodations
-            accommodations = trip_data.get("accommodations", {})
-            if isinstance(accommodations, dict):
-                primary = accommodations.get("primary_recommendation", {})
-                if isinstance(primary, dict):
-                    self._update_place_with_photos(primary, photos_map)
-                
-                alternatives = accommodations.get("alternative_options", [])
-                for alt in alternatives:
-                    if isinstance(alt, dict):
-                        self._update_place_with_photos(alt, photos_map)
-            
-            # Update photography spots
-            photography_spots = trip_data.get("photography_spots", [])
-            for spot in photography_spots:
-                if isinstance(spot, dict):
-                    self._update_place_with_photos(spot, photos_map)
-            
-            # Update hidden gems
-            hidden_gems = trip_data.get("hidden_gems", [])
-            for gem in hidden_gems:
-                if isinstance(gem, dict):
-                    self._update_place_with_photos(gem, photos_map)
-            
+            for place in _iter_trip_places(trip_data):
+                self._update_place_with_photos(place, photos_map)
         except Exception as e:
             self.logger.warning(f"Error injecting photos: {str(e)}")
         
@@ -470,52 +441,8 @@ class PhotoEnrichmentService:
         all_photo_urls: List[str] = []
         
         try:
-            # Collect from daily itineraries
-            daily_itineraries = trip_data.get("daily_itineraries", [])
-            for day in daily_itineraries:
-                if not isinstance(day, dict):
-                    continue
-                
-                for period in ["morning", "afternoon", "evening"]:
-                    period_data = day.get(period, {})
-                    if not isinstance(period_data, dict):
-                        continue
-                    
-                    activities = period_data.get("activities", [])
-                    for activity in activities:
-                        if isinstance(activity, dict):
-                            activity_place = activity.get("activity", {})
-                            if isinstance(activity_place, dict):
-                                photo_urls = activity_place.get("photo_urls", [])
-                                all_photo_urls.extend(photo_urls)
-            
-            # Collect from accommodations
-            accommodations = trip_data.get("accommodations", {})
-            if isinstance(accommodations, dict):
-                primary = accommodations.get("primary_recommendation", {})
-                if isinstance(primary, dict):
-                    photo_urls = primary.get("photo_urls", [])
-                    all_photo_urls.extend(photo_urls)
-                
-                alternatives = accommodations.get("alternative_options", [])
-                for alt in alternatives:
-                    if isinstance(alt, dict):
-                        photo_urls = alt.get("photo_urls", [])
-                        all_photo_urls.extend(photo_urls)
-            
-            # Collect from photography spots
-            photography_spots = trip_data.get("photography_spots", [])
-            for spot in photography_spots:
-                if isinstance(spot, dict):
-                    photo_urls = spot.get("photo_urls", [])
-                    all_photo_urls.extend(photo_urls)
-            
-            # Collect from hidden gems
-            hidden_gems = trip_data.get("hidden_gems", [])
-            for gem in hidden_gems:
-                if isinstance(gem, dict):
-                    photo_urls = gem.get("photo_urls", [])
-                    all_photo_urls.extend(photo_urls)
+            for place in _iter_trip_places(trip_data):
+                all_photo_urls.extend(place.get("photo_urls") or [])
             
             # Remove duplicates while preserving some order
             unique_photos = list(dict.fromkeys(all_photo_urls))
@@ -4,39 +4,45 @@ Supports optional Redis backend for distributed caching in production.
 """
 import logging
 import hashlib
-import json
-from typing import Any, Dict, Optional, List
-from functools import lru_cache
-from datetime import datetime, timedelta
+import threading
+import time
+import orjson
+from collections import OrderedDict
+from typing import Any, Optional
 
 logger = logging.getLogger(__name__)
 
-# In-memory cache with TTL
-_cache_store: Dict[str, tuple[Any, datetime]] = {}
+# In-memory LRU cache with TTL (key -> (value, monotonic expiry)).
+# Shared by the server loop and the generation worker threads, hence the lock.
+_cache_store: "OrderedDict[str, tuple[Any, float]]" = OrderedDict()
+_cache_lock = threading.Lock()
 _cache_ttl_seconds = 3600  # 1 hour default
+_cache_max_entries = 4096
 
 
 def _generate_cache_key(operation: str, **params) -> str:
     """Generate a stable cache key from operation and parameters."""
-    # Sort params for consistent hashing
-    sorted_params = json.dumps(params, sort_keys=True, ensure_ascii=False)
-    key_str = f"{operation}:{sorted_params}"
-    return hashlib.md5(key_str.encode()).hexdigest()
+    # Sort params for consistent hashing; orjson emits bytes, so no intermediate str
+    sorted_params = orjson.dumps(params, option=orjson.OPT_SORT_KEYS)
+    return hashlib.md5(operation.encode() + b":" + sorted_params).hexdigest()
 
 
 def get_cached(operation: str, **params) -> Optional[Any]:
     """Retrieve cached result if available and not expired."""
     try:
         key = _generate_cache_key(operation, **params)
-        if key in _cache_store:
-            value, expiry = _cache_store[key]
-            if datetime.utcnow() < expiry:
-                logger.debug(f"Cache hit for {operation}")
+        with _cache_lock:
+            entry = _cache_store.get(key)
+            if entry is None:
+                return None
+            value, expiry = entry
+            if time.monotonic() < expiry:
+                _cache_store.move_to_end(key)
+                logger.debug("Cache hit for %s", operation)
                 return value
-            else:
-                # Expired, remove
-                del _cache_store[key]
-                logger.debug(f"Cache expired for {operation}")
+            # Expired, remove
+            del _cache_store[key]
+        logger.debug("Cache expired for %s", operation)
         return None
     except Exception as e:
         logger.warning(f"Cache get error: {e}")
@@ -44,32 +50,37 @@ def get_cached(operation: str, **params) -> Optional[Any]:
 
 
 def set_cached(operation: str, value: Any, ttl_seconds: Optional[int] = None, **params):
-    """Store result in cache with TTL."""
+    """Store result in cache with TTL, evicting least recently used entries when full."""
     try:
         key = _generate_cache_key(operation, **params)
         ttl = ttl_seconds if ttl_seconds is not None else _cache_ttl_seconds
-        expiry = datetime.utcnow() + timedelta(seconds=ttl)
-        _cache_store[key] = (value, expiry)
-        logger.debug(f"Cached {operation} for {ttl}s")
+        expiry = time.monotonic() + ttl
+        with _cache_lock:
+            _cache_store[key] = (value, expiry)
+            _cache_store.move_to_end(key)
+            while len(_cache_store) > _cache_max_entries:
+                _cache_store.popitem(last=False)
+        logger.debug("Cached %s for %ss", operation, ttl)
     except Exception as e:
         logger.warning(f"Cache set error: {e}")
 
 
 def clear_cache():
     """Clear all cached entries (useful for testing)."""
-    global _cache_store
-    _cache_store = {}
+    with _cache_lock:
+        _cache_store.clear()
     logger.info("Cache cleared")
 
 
 def cleanup_expired():
     """Remove expired entries from cache."""
     try:
-        now = datetime.utcnow()
-        expired_keys = [k for k, (_, expiry) in _cache_store.items() if now >= expiry]
-        for k in expired_keys:
-            del _cache_store[k]
+        now = time.monotonic()
+        with _cache_lock:
+            expired_keys = [k for k, (_, expiry) in _cache_store.items() if now >= expiry]
+            for k in expired_keys:
+                del _cache_store[k]
         if expired_keys:
-            logger.debug(f"Cleaned up {len(expired_keys)} expired cache entries")
+            logger.debug("Cleaned up %d expired cache entries", len(expired_keys))
     except Exception as e:
         logger.warning(f"Cache cleanup error: {e}")
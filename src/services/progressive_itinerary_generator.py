@@ -9,13 +9,18 @@ Enterprise-grade trip generation that handles long itineraries by:
 5. Stateful assembly of the final trip
 """
 
+import asyncio
 import logging
 import json
+import time
+import orjson
 from typing import Dict, Any, List, Optional, Tuple, Set
 from datetime import datetime, timedelta
 from decimal import Decimal
 from collections import defaultdict
 
+from pydantic import ValidationError
+
 from src.models.request_models import TripPlanRequest
 from src.models.response_models import TripPlanResponse, DayItineraryResponse
 from src.services.vertex_ai_service import VertexAIService
@@ -24,6 +29,116 @@ from src.services.travel_service import TravelService
 from src.utils.config import get_settings
 
 
+_CONDENSED_SYSTEM_PROMPT = """You are an expert AI Trip Planner. Generate a valid JSON response following the exact schema structure.
+
+CRITICAL RULES:
+1. Use ONLY real place_id values from the provided places_data - NEVER invent or simulate place IDs
+2. Each activity MUST have the complete activity structure with place details
+3. Include breakfast, lunch, dinner as meal activities (activity_type: "meal") from restaurants
+4. Keep 1-2 activities per time block (morning/afternoon/evening)
+5. NEVER repeat the same place across different days - use variety
+6. Every activity must include: activity (full place object), activity_type, estimated_cost_per_person
+7. All monetary values are numbers only (no currency symbols)
+8. "price_level" must be an INTEGER (0-4) or null, NEVER a string like "PRICE_LEVEL_EXPENSIVE"
+   - 0 = Free, 1 = Inexpensive, 2 = Moderate, 3 = Expensive, 4 = Very Expensive
+9. For international destinations, convert all costs to the requested currency (budget_currency)
+10. Return ONLY valid JSON - no markdown, no explanations
+
+🌍 CRITICAL MULTI-CITY COHERENCE RULES:
+- ALL activities within a single day MUST be from the SAME city
+- NEVER mix cities on the same day (e.g., Jaipur morning + Udaipur afternoon is WRONG)
+- Group consecutive days in the same city before moving to next city
+- Inter-city travel should happen at START of new city block only
+- Follow any provided city routing guide for day allocation
+- Maintain logical geographic flow (don't ping-pong between cities)"""
+
+# Chunk prompts lead with this trip-independent block; only the tail varies per request
+_CHUNK_PROMPT_PREFIX = _CONDENSED_SYSTEM_PROMPT + """
+
+Return a JSON array with one daily itinerary object per requested day. Each day MUST follow this EXACT structure:
+
+[
+  {
+    "day_number": integer,
+    "date": "YYYY-MM-DD",
+    "theme": "Brief theme for the day (e.g., 'Cultural Exploration')",
+    
+    "morning": {
+      "activities": [
+        {
+          "activity": {
+            "place_id": "string from places_data",
+            "name": "string",
+            "address": "string",
+            "category": "string",
+            "subcategory": null,
+            "rating": number or null,
+            "user_ratings_total": number or null,
+            "price_level": number or null,
+            "estimated_cost": number or null,
+            "duration_hours": number or null,
+            "coordinates": {"lat": number, "lng": number},
+            "opening_hours": null,
+            "website": "string or null",
+            "phone": "string or null",
+            "description": "Brief activity description",
+            "why_recommended": "Why this place for this activity",
+            "booking_required": false,
+            "booking_url": null
+          },
+          "activity_type": "sightseeing|cultural|adventure|relaxation|meal",
+          "estimated_cost_per_person": number,
+          "group_cost": number or null,
+          "difficulty_level": "easy|moderate|challenging or null",
+          "age_suitability": ["adults"],
+          "weather_dependent": false,
+          "advance_booking_required": false
+        }
+      ],
+      "estimated_cost": number,
+      "total_duration_hours": number,
+      "transportation_notes": "How to get around"
+    },
+    
+    "afternoon": {
+      "activities": [...],
+      "estimated_cost": number,
+      "total_duration_hours": number,
+      "transportation_notes": "string"
+    },
+    
+    "evening": {
+      "activities": [...],
+      "estimated_cost": number,
+      "total_duration_hours": number,
+      "transportation_notes": "string"
+    },
+    
+    "daily_total_cost": number,
+    "daily_notes": ["Helpful tip 1", "Helpful tip 2"]
+  }
+]
+
+🍽️ CRITICAL MEAL REQUIREMENTS (STRICTLY ENFORCED):
+- EVERY DAY MUST HAVE EXACTLY 3 MEALS: breakfast (morning), lunch (afternoon), dinner (evening)
+- ALL meals MUST use restaurants/cafes from AVAILABLE PLACES DATA with activity_type: "meal"
+- NEVER skip meals - they are MANDATORY for each day
+- Use DIFFERENT restaurants for each meal - no repeats within same day
+- Meals should be the FIRST activity in each time block
+
+MANDATORY REQUIREMENTS:
+1. Use ONLY real place_id values from AVAILABLE PLACES DATA
+2. DO NOT reuse any place_ids from ALREADY USED PLACES list
+3. MUST include 3 meals per day: breakfast (morning), lunch (afternoon), dinner (evening) - NO EXCEPTIONS
+4. Each time block: START with meal activity, then add 1-2 sightseeing/activity
+5. Ensure variety - different restaurants for each meal, different attractions each day
+6. All costs are numbers only (no currency symbols)
+7. Coordinates must be valid {lat, lng} objects
+8. Date format: YYYY-MM-DD
+9. Return ONLY the JSON array, no markdown or explanations
+"""
+
+
 class TokenBudgetManager:
     """Manages token budgets and estimates for prompts"""
     
@@ -44,9 +159,10 @@ class TokenBudgetManager:
     def estimate_json_tokens(cls, data: Any) -> int:
         """Estimate tokens from JSON data"""
         try:
-            json_str = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+            json_str = orjson.dumps(data, default=str).decode()
             return cls.estimate_tokens(json_str)
-        except:
+        except TypeError:
+            # orjson.JSONEncodeError (unserializable value) is a TypeError
             return 0
     
     @classmethod
@@ -70,8 +186,9 @@ class SmartContextFilter:
         day_numbers: List[int],
         total_days: int,
         max_tokens: int,
-        aggressive: bool = False
-    ) -> Dict[str, List[Dict]]:
+        aggressive: bool = False,
+        raw_tokens: Optional[int] = None
+    ) -> Tuple[Dict[str, List[Dict]], int]:
         """
         Filter places data to fit within token budget with adaptive filtering levels.
         
@@ -81,6 +198,10 @@ class SmartContextFilter:
             total_days: Total trip duration
             max_tokens: Maximum token budget for places data
             aggressive: If True, use aggressive filtering (50% reduction)
+            raw_tokens: Token estimate of places_data if the caller already has one
+        
+        Returns:
+            (filtered places, token estimate of the filtered places)
         
         Prioritize quality over quantity - better to have fewer high-quality options.
         Handles dense destinations (Tokyo, Paris, NYC) with extremely large places data.
@@ -102,7 +223,7 @@ class SmartContextFilter:
         ]
         
         # Determine filtering level based on budget pressure
-        raw_size = TokenBudgetManager.estimate_json_tokens(places_data)
+        raw_size = raw_tokens if raw_tokens is not None else TokenBudgetManager.estimate_json_tokens(places_data)
         budget_pressure = raw_size / max_tokens if max_tokens > 0 else 1.0
         
         self.logger.info(
@@ -203,9 +324,8 @@ class SmartContextFilter:
             filtered["travel_to_destination"] = places_data["travel_to_destination"][:3]
         
         # Iterative reduction if still over budget (max 3 iterations)
+        estimated_tokens = TokenBudgetManager.estimate_json_tokens(filtered)
         for iteration in range(3):
-            estimated_tokens = TokenBudgetManager.estimate_json_tokens(filtered)
-            
             if estimated_tokens <= max_tokens:
                 break
             
@@ -221,8 +341,9 @@ class SmartContextFilter:
                     current_len = len(filtered[cat])
                     new_len = max(1, int(current_len / overage_ratio))
                     filtered[cat] = filtered[cat][:new_len]
+            estimated_tokens = TokenBudgetManager.estimate_json_tokens(filtered)
         
-        final_tokens = TokenBudgetManager.estimate_json_tokens(filtered)
+        final_tokens = estimated_tokens
         total_places = sum(len(v) if isinstance(v, list) else 0 for v in filtered.values())
         
         self.logger.info(
@@ -230,7 +351,7 @@ class SmartContextFilter:
             f"({(1 - final_tokens/raw_size)*100:.1f}% reduction)"
         )
         
-        return filtered
+        return filtered, final_tokens
 
 
 class ProgressiveItineraryGenerator:
@@ -252,6 +373,7 @@ class ProgressiveItineraryGenerator:
         self.travel_service = travel_service
         self.logger = logging.getLogger(__name__)
         self.context_filter = SmartContextFilter(self.logger)
+        self._trip_sanitizer = None  # see _get_trip_sanitizer
     
     async def generate_comprehensive_plan(
         self, 
@@ -263,29 +385,37 @@ class ProgressiveItineraryGenerator:
         Uses progressive generation for trips longer than threshold.
         """
         
+        # Wall-clock start for generated_at; monotonic start for the generation duration
         start_time = datetime.utcnow()
+        start_perf = time.perf_counter()
         trip_duration = (request.end_date - request.start_date).days
         
         try:
             self.logger.info(
                 f"[progressive] Starting generation for {trip_duration}-day trip to {request.destination}",
-                extra={"trip_id": trip_id, "duration": trip_duration}
+                extra={"duration": trip_duration}
             )
             
-            # Step 1: Fetch places data once (shared across all chunks)
-            self.logger.info("[progressive] Fetching places data")
-            places_data = await self.places_service.fetch_all_places_for_trip(request)
+            # Step 1: Fetch places data once (shared across all chunks). Travel options don't
+            # depend on it, so the (blocking) travel lookup runs in a worker thread meanwhile.
+            self.logger.info("[progressive] Fetching places data and travel options")
+            travel_task = asyncio.create_task(asyncio.to_thread(
+                self.travel_service.fetch_travel_options,
+                origin=request.origin,
+                destination=request.destination,
+                total_budget=float(request.total_budget),
+                currency=request.budget_currency,
+                group_size=int(request.group_size)
+            ))
+            try:
+                places_data = await self.places_service.fetch_all_places_for_trip(request)
+            except BaseException:
+                travel_task.cancel()
+                raise
             
             # Add travel options
             try:
-                travel_options = self.travel_service.fetch_travel_options(
-                    origin=request.origin,
-                    destination=request.destination,
-                    total_budget=float(request.total_budget),
-                    currency=request.budget_currency,
-                    group_size=int(request.group_size)
-                )
-                places_data["travel_to_destination"] = travel_options
+                places_data["travel_to_destination"] = await travel_task
             except Exception as e:
                 self.logger.warning(f"Travel options fetch failed: {e}")
                 places_data["travel_to_destination"] = []
@@ -294,11 +424,11 @@ class ProgressiveItineraryGenerator:
             if trip_duration <= 7:
                 # Short trips: use single-shot generation (existing method)
                 self.logger.info("[progressive] Using single-shot generation for short trip")
-                return await self._generate_single_shot(request, trip_id, places_data, start_time)
+                return await self._generate_single_shot(request, trip_id, places_data, start_time, start_perf)
             else:
                 # Long trips: use progressive generation
                 self.logger.info(f"[progressive] Using chunked generation ({self.DAYS_PER_CHUNK} days per chunk)")
-                return await self._generate_progressive(request, trip_id, places_data, start_time)
+                return await self._generate_progressive(request, trip_id, places_data, start_time, start_perf)
         
         except Exception as e:
             self.logger.error(f"[progressive] Generation failed: {e}", exc_info=True)
@@ -309,7 +439,8 @@ class ProgressiveItineraryGenerator:
         request: TripPlanRequest,
         trip_id: str,
         places_data: Dict[str, List[Dict]],
-        start_time: datetime
+        start_time: datetime,
+        start_perf: float
     ) -> TripPlanResponse:
         """
         Generate entire trip in one LLM call (for short trips ≤7 days)
@@ -334,20 +465,22 @@ class ProgressiveItineraryGenerator:
             f"Available tokens for places: {available_tokens:,}"
         )
         
-        # Estimate current places data size
-        places_tokens = TokenBudgetManager.estimate_json_tokens(places_data)
+        # Estimate current places data size (serializes the whole payload; off the event loop)
+        places_tokens = await asyncio.to_thread(TokenBudgetManager.estimate_json_tokens, places_data)
         self.logger.info(f"[single-shot] Raw places data: ~{places_tokens:,} tokens")
         
-        # Apply filtering to fit budget
-        filtered_places = self.context_filter.filter_places_for_days(
-            places_data, 
+        # Apply filtering to fit budget (the filter reports the filtered size). Filtering
+        # re-serializes the places to measure them, so it runs off the event loop.
+        filtered_places, filtered_tokens = await asyncio.to_thread(
+            self.context_filter.filter_places_for_days,
+            places_data,
             list(range(1, trip_duration + 1)),
             trip_duration,
-            available_tokens
+            available_tokens,
+            raw_tokens=places_tokens
         )
         
         # Validate filtered size
-        filtered_tokens = TokenBudgetManager.estimate_json_tokens(filtered_places)
         self.logger.info(f"[single-shot] Filtered places data: ~{filtered_tokens:,} tokens")
         
         # If still too large, apply emergency aggressive filtering
@@ -359,15 +492,16 @@ class ProgressiveItineraryGenerator:
             )
             
             # Apply even more aggressive filtering with aggressive flag enabled
-            filtered_places = self.context_filter.filter_places_for_days(
+            filtered_places, final_tokens = await asyncio.to_thread(
+                self.context_filter.filter_places_for_days,
                 places_data,
                 list(range(1, trip_duration + 1)),
                 trip_duration,
                 available_tokens,
-                aggressive=True  # Enable aggressive mode
+                aggressive=True,  # Enable aggressive mode
+                raw_tokens=places_tokens
             )
             
-            final_tokens = TokenBudgetManager.estimate_json_tokens(filtered_places)
             self.logger.info(f"[single-shot] After aggressive filtering: ~{final_tokens:,} tokens")
             
             # If STILL too large even after aggressive filtering, fallback to progressive
@@ -376,12 +510,13 @@ class ProgressiveItineraryGenerator:
                     f"[single-shot] Destination has extremely dense places data. "
                     f"Falling back to progressive generation even for short trip."
                 )
-                return await self._generate_progressive(request, trip_id, places_data, start_time)
+                return await self._generate_progressive(request, trip_id, places_data, start_time, start_perf)
         
         # Proceed with generation
         self.logger.info(f"[single-shot] Proceeding with single-shot generation")
         
-        trip_data = self.vertex_ai.generate_trip_plan(request, filtered_places)
+        # Vertex SDK call is blocking; keep the event loop free for other requests
+        trip_data = await asyncio.to_thread(self.vertex_ai.generate_trip_plan, request, filtered_places)
         
         # Ensure places_data is included for sanitization
         if "places_data" not in trip_data:
@@ -396,19 +531,24 @@ class ProgressiveItineraryGenerator:
             trip_data["cultural_sites"] = filtered_places.get("cultural_sites", [])
         
         # Post-process and validate
+        # One clock read; timestamps stay datetimes so validation doesn't re-parse ISO strings
+        generation_seconds = time.perf_counter() - start_perf
         trip_data["trip_id"] = trip_id
-        trip_data["generated_at"] = start_time.isoformat()
+        trip_data["generated_at"] = start_time
+        trip_data["last_updated"] = start_time + timedelta(seconds=generation_seconds)
         trip_data["origin"] = request.origin
-        trip_data["generation_time_seconds"] = (datetime.utcnow() - start_time).total_seconds()
+        trip_data["generation_time_seconds"] = generation_seconds
         
-        return self._finalize_trip_response(trip_data, request, trip_id)
+        # Sanitizing and validating the full trip is pure CPU; keep it off the event loop
+        return await asyncio.to_thread(self._finalize_trip_response, trip_data, request, trip_id)
     
     async def _generate_progressive(
         self,
         request: TripPlanRequest,
         trip_id: str,
         places_data: Dict[str, List[Dict]],
-        start_time: datetime
+        start_time: datetime,
+        start_perf: float
     ) -> TripPlanResponse:
         """
         Generate trip in chunks for long trips.
@@ -417,66 +557,82 @@ class ProgressiveItineraryGenerator:
         
         trip_duration = (request.end_date - request.start_date).days
         
-        # Step 1: Generate accommodation and overview (one-time)
+        # Step 1: Generate accommodation and overview (one-time). It does not depend on the
+        # day chunks, so it runs concurrently with them and is awaited before assembly.
         self.logger.info("[progressive] Generating accommodation and trip overview")
-        overview_data = await self._generate_trip_overview(request, places_data)
-        
-        # Step 2: Split days into chunks
-        day_chunks = self._create_day_chunks(trip_duration)
-        
-        # Step 3: Generate each chunk with place tracking to avoid repetition
-        all_daily_itineraries = []
-        used_place_ids = set()  # Track places across all chunks
-        total_costs = {
-            "accommodation": 0.0,
-            "food": 0.0,
-            "activities": 0.0,
-            "transport": 0.0
-        }
+        overview_task = asyncio.create_task(self._generate_trip_overview(request, places_data))
+        try:
+            # Step 2: Split days into chunks
+            day_chunks = self._create_day_chunks(trip_duration)
+        
+            # The places payload is the same for every chunk and attempt, so it is measured
+            # once (off the event loop, while the overview is generating)
+            places_tokens = await asyncio.to_thread(TokenBudgetManager.estimate_json_tokens, places_data)
+        
+            # Step 3: Generate each chunk with place tracking to avoid repetition
+            all_daily_itineraries = []
+            used_place_ids = set()  # Track places across all chunks
+            total_costs = {
+                "accommodation": 0.0,
+                "food": 0.0,
+                "activities": 0.0,
+                "transport": 0.0
+            }
         
-        for chunk_idx, (start_day, end_day) in enumerate(day_chunks):
-            self.logger.info(f"[progressive] Generating chunk {chunk_idx + 1}/{len(day_chunks)}: days {start_day}-{end_day}")
+            for chunk_idx, (start_day, end_day) in enumerate(day_chunks):
+                self.logger.info(f"[progressive] Generating chunk {chunk_idx + 1}/{len(day_chunks)}: days {start_day}-{end_day}")
             
-            try:
-                chunk_itineraries, used_place_ids = await self._generate_day_chunk(
-                    request,
-                    places_data,
-                    start_day,
-                    end_day,
-                    chunk_idx,
-                    len(day_chunks),
-                    used_place_ids  # Pass previously used places
-                )
+                try:
+                    chunk_itineraries, used_place_ids = await self._generate_day_chunk(
+                        request,
+                        places_data,
+                        start_day,
+                        end_day,
+                        chunk_idx,
+                        len(day_chunks),
+                        used_place_ids,  # Pass previously used places
+                        places_tokens=places_tokens
+                    )
                 
-                all_daily_itineraries.extend(chunk_itineraries)
+                    all_daily_itineraries.extend(chunk_itineraries)
                 
-                # Accumulate costs
-                for day_data in chunk_itineraries:
-                    if isinstance(day_data, dict):
-                        daily_cost = float(day_data.get("daily_total_cost", 0) or 0)
-                        # Estimate breakdown
-                        total_costs["food"] += daily_cost * 0.35
-                        total_costs["activities"] += daily_cost * 0.45
-                        total_costs["transport"] += daily_cost * 0.20
+                    # Accumulate costs: one pass for the chunk total, then estimate the breakdown
+                    chunk_cost = sum(
+                        float(day_data.get("daily_total_cost", 0) or 0)
+                        for day_data in chunk_itineraries
+                        if isinstance(day_data, dict)
+                    )
+                    total_costs["food"] += chunk_cost * 0.35
+                    total_costs["activities"] += chunk_cost * 0.45
+                    total_costs["transport"] += chunk_cost * 0.20
                 
-            except Exception as e:
-                self.logger.error(f"[progressive] Chunk {chunk_idx + 1} failed: {e}")
-                # Add placeholder for failed chunk
-                for day_num in range(start_day, end_day + 1):
-                    all_daily_itineraries.append(self._create_placeholder_day(
-                        day_num,
-                        request.start_date + timedelta(days=day_num - 1)
-                    ))
-        
-        # Step 4: Assemble final response
+                except Exception as e:
+                    self.logger.error(f"[progressive] Chunk {chunk_idx + 1} failed: {e}")
+                    # Add placeholder for failed chunk
+                    for day_num in range(start_day, end_day + 1):
+                        all_daily_itineraries.append(self._create_placeholder_day(
+                            day_num,
+                            request.start_date + timedelta(days=day_num - 1)
+                        ))
+        
+            overview_data = await overview_task
+        finally:
+            # Anything raising (or a cancellation) before the await would otherwise orphan
+            # the overview call
+            if not overview_task.done():
+                overview_task.cancel()
+        
+        # Step 4: Assemble final response (CPU-bound sanitize/validate, off the event loop)
         self.logger.info("[progressive] Assembling final trip response")
-        final_trip = self._assemble_final_trip(
+        final_trip = await asyncio.to_thread(
+            self._assemble_final_trip,
             request,
             trip_id,
             overview_data,
             all_daily_itineraries,
             total_costs,
             start_time,
+            start_perf,
             places_data  # Pass places_data for sanitization
         )
         
@@ -631,12 +787,12 @@ IMPORTANT INSTRUCTIONS:
 - photography_spots: Select 3-5 scenic locations from places_data (viewpoints, sunset spots, architectural marvels, cultural sites, beaches, gardens). MUST use complete PlaceResponse format with ALL fields (place_id, name, address, category, rating, coordinates, etc.) EXCEPT photo fields. Do not include photo_urls, primary_photo, or has_photos - these are added automatically. Prioritize places with high ratings and visual appeal.
 - hidden_gems: Select 3-5 lesser-known places from places_data that are off the beaten path but worth visiting (local favorites, quiet temples, small cafes, unique shops). MUST use complete PlaceResponse format with ALL fields (place_id, name, address, category, rating, coordinates, etc.) EXCEPT photo fields. Do not include photo_urls, primary_photo, or has_photos - these are added automatically. Look for places with good ratings but lower user_ratings_total (indicating they're not mainstream tourist spots).
 
-Accommodations: {json.dumps(places_data.get("accommodations", [])[:8], indent=2)}
-Travel Options: {json.dumps(places_data.get("travel_to_destination", []), indent=2)}
+Accommodations: {orjson.dumps(places_data.get("accommodations", [])[:8], default=str, option=orjson.OPT_INDENT_2).decode()}
+Travel Options: {orjson.dumps(places_data.get("travel_to_destination", []), default=str, option=orjson.OPT_INDENT_2).decode()}
 """
                 
-                response_text = self.vertex_ai.generate_json_from_prompt(prompt, temperature=0.4)
-                overview = json.loads(response_text)
+                response_text = await self.vertex_ai.generate_json_from_prompt_async(prompt, temperature=0.4)
+                overview = orjson.loads(response_text)
                 
                 # Validate required fields
                 if "accommodations" not in overview:
@@ -778,12 +934,16 @@ Travel Options: {json.dumps(places_data.get("travel_to_destination", []), indent
         end_day: int,
         chunk_index: int,
         total_chunks: int,
-        used_place_ids: set = None
+        used_place_ids: set = None,
+        *,
+        places_tokens: Optional[int] = None
     ) -> List[Dict]:
         """Generate itinerary for a chunk of days (3-5 days) with retry logic"""
         
         if used_place_ids is None:
             used_place_ids = set()
+        if places_tokens is None:
+            places_tokens = await asyncio.to_thread(TokenBudgetManager.estimate_json_tokens, places_data)
         
         chunk_size = end_day - start_day + 1
         max_retries = 3
@@ -797,9 +957,6 @@ Travel Options: {json.dumps(places_data.get("travel_to_destination", []), indent
                 # Calculate available token budget
                 available_tokens = TokenBudgetManager.get_available_tokens(system_prompt, user_context)
                 
-                # Estimate places data size
-                places_tokens = TokenBudgetManager.estimate_json_tokens(places_data)
-                
                 self.logger.info(
                     f"[chunk {chunk_index + 1}] Days {start_day}-{end_day}: "
                     f"Raw places: ~{places_tokens:,} tokens, Budget: {available_tokens:,} tokens"
@@ -816,13 +973,15 @@ Travel Options: {json.dumps(places_data.get("travel_to_destination", []), indent
                         f"Using aggressive filtering."
                     )
                 
-                # Filter places for this chunk
-                filtered_places = self.context_filter.filter_places_for_days(
+                # Filter places for this chunk (CPU-bound; off the event loop)
+                filtered_places, _ = await asyncio.to_thread(
+                    self.context_filter.filter_places_for_days,
                     places_data,
                     list(range(start_day, end_day + 1)),
                     (request.end_date - request.start_date).days,
                     available_tokens,
-                    aggressive=use_aggressive
+                    aggressive=use_aggressive,
+                    raw_tokens=places_tokens
                 )
                 
                 # Build specialized prompt for chunk following vertex AI schema
@@ -832,120 +991,48 @@ Travel Options: {json.dumps(places_data.get("travel_to_destination", []), indent
                 total_days = (request.end_date - request.start_date).days
                 city_routing_guide = self._generate_city_routing_guide(filtered_places, total_days, request.origin)
                 
-                chunk_prompt = f"""{user_context}{city_routing_guide}
+                # Static instructions first and per-trip data last, so the shared prefix is
+                # eligible for Gemini's implicit prompt caching across chunks and trips
+                chunk_prompt = f"""{_CHUNK_PROMPT_PREFIX}
+{user_context}{city_routing_guide}
 
 Generate daily itineraries for Days {start_day} to {end_day} ({chunk_size} days total).
+The first day is day_number {start_day} on {(request.start_date + timedelta(days=start_day - 1)).strftime('%Y-%m-%d')}.
 
 AVAILABLE PLACES DATA:
-{json.dumps(filtered_places, indent=2, ensure_ascii=False)}
+{orjson.dumps(filtered_places, default=str, option=orjson.OPT_INDENT_2).decode()}
 {used_places_note}
 
 CRITICAL: Use ONLY the place_id values from the AVAILABLE PLACES DATA above. NEVER use place_ids from the ALREADY USED PLACES list.
-
-Return a JSON array of {chunk_size} daily itinerary objects. Each day MUST follow this EXACT structure:
-
-[
-  {{
-    "day_number": {start_day},
-    "date": "{(request.start_date + timedelta(days=start_day - 1)).strftime('%Y-%m-%d')}",
-    "theme": "Brief theme for the day (e.g., 'Cultural Exploration')",
-    
-    "morning": {{
-      "activities": [
-        {{
-          "activity": {{
-            "place_id": "string from places_data",
-            "name": "string",
-            "address": "string",
-            "category": "string",
-            "subcategory": null,
-            "rating": number or null,
-            "user_ratings_total": number or null,
-            "price_level": number or null,
-            "estimated_cost": number or null,
-            "duration_hours": number or null,
-            "coordinates": {{"lat": number, "lng": number}},
-            "opening_hours": null,
-            "website": "string or null",
-            "phone": "string or null",
-            "description": "Brief activity description",
-            "why_recommended": "Why this place for this activity",
-            "booking_required": false,
-            "booking_url": null
-          }},
-          "activity_type": "sightseeing|cultural|adventure|relaxation|meal",
-          "estimated_cost_per_person": number,
-          "group_cost": number or null,
-          "difficulty_level": "easy|moderate|challenging or null",
-          "age_suitability": ["adults"],
-          "weather_dependent": false,
-          "advance_booking_required": false
-        }}
-      ],
-      "estimated_cost": number,
-      "total_duration_hours": number,
-      "transportation_notes": "How to get around"
-    }},
-    
-    "afternoon": {{
-      "activities": [...],
-      "estimated_cost": number,
-      "total_duration_hours": number,
-      "transportation_notes": "string"
-    }},
-    
-    "evening": {{
-      "activities": [...],
-      "estimated_cost": number,
-      "total_duration_hours": number,
-      "transportation_notes": "string"
-    }},
-    
-    "daily_total_cost": number,
-    "daily_notes": ["Helpful tip 1", "Helpful tip 2"]
-  }}
-]
-
-🍽️ CRITICAL MEAL REQUIREMENTS (STRICTLY ENFORCED):
-- EVERY DAY MUST HAVE EXACTLY 3 MEALS: breakfast (morning), lunch (afternoon), dinner (evening)
-- ALL meals MUST use restaurants/cafes from AVAILABLE PLACES DATA with activity_type: "meal"
-- NEVER skip meals - they are MANDATORY for each day
-- Use DIFFERENT restaurants for each meal - no repeats within same day
-- Meals should be the FIRST activity in each time block
-
-MANDATORY REQUIREMENTS:
-1. Use ONLY real place_id values from AVAILABLE PLACES DATA
-2. DO NOT reuse any place_ids from ALREADY USED PLACES list
-3. MUST include 3 meals per day: breakfast (morning), lunch (afternoon), dinner (evening) - NO EXCEPTIONS
-4. Each time block: START with meal activity, then add 1-2 sightseeing/activity
-5. Ensure variety - different restaurants for each meal, different attractions each day
-6. All costs are numbers only (no currency symbols)
-7. Coordinates must be valid {{lat, lng}} objects
-8. Date format: YYYY-MM-DD
-9. Return ONLY the JSON array, no markdown or explanations
+Return ONLY the JSON array of {chunk_size} daily itinerary objects.
 """
                 
-                response_text = self.vertex_ai.generate_json_from_prompt(chunk_prompt, temperature=0.6)
-                itineraries = json.loads(response_text)
+                response_text = await self.vertex_ai.generate_json_from_prompt_async(chunk_prompt, temperature=0.6)
+                itineraries = orjson.loads(response_text)
                 
                 if not isinstance(itineraries, list):
                     raise ValueError("Expected list of daily itineraries")
                 
-                # Track used place_ids to avoid repetition in next chunks
+                # Validate each day as its chunk arrives (in a worker thread) and swap any
+                # malformed one for a placeholder, rather than letting it fail validation
+                # of the whole assembled trip
+                itineraries = await asyncio.to_thread(self._validate_chunk_days, itineraries, start_day, request)
+                
+                # Track used place_ids to avoid repetition in next chunks. Collected from the
+                # validated days, so places of a day swapped for a placeholder stay available.
                 for day in itineraries:
-                    if isinstance(day, dict):
-                        for time_block in ['morning', 'afternoon', 'evening']:
-                            block = day.get(time_block, {})
-                            if isinstance(block, dict):
-                                activities = block.get('activities', [])
-                                if isinstance(activities, list):
-                                    for act in activities:
-                                        if isinstance(act, dict):
-                                            activity_place = act.get('activity', {})
-                                            if isinstance(activity_place, dict):
-                                                place_id = activity_place.get('place_id')
-                                                if place_id and isinstance(place_id, str):
-                                                    used_place_ids.add(place_id)
+                    for time_block in ['morning', 'afternoon', 'evening']:
+                        block = day.get(time_block, {})
+                        if isinstance(block, dict):
+                            activities = block.get('activities', [])
+                            if isinstance(activities, list):
+                                for act in activities:
+                                    if isinstance(act, dict):
+                                        activity_place = act.get('activity', {})
+                                        if isinstance(activity_place, dict):
+                                            place_id = activity_place.get('place_id')
+                                            if place_id and isinstance(place_id, str):
+                                                used_place_ids.add(place_id)
                 
                 # Validate we got the right number of days
                 if len(itineraries) != chunk_size:
@@ -995,6 +1082,21 @@ MANDATORY REQUIREMENTS:
         ]
         return placeholders, used_place_ids
     
+    def _validate_chunk_days(self, itineraries: List[Any], start_day: int, request: TripPlanRequest) -> List[Dict]:
+        """Keep the days that pass DayItineraryResponse validation; replace the rest with placeholders."""
+        validated = []
+        for offset, day in enumerate(itineraries):
+            try:
+                DayItineraryResponse.model_validate(day)
+                validated.append(day)
+            except ValidationError as e:
+                day_num = start_day + offset
+                self.logger.warning(
+                    f"[progressive] Day {day_num} failed validation ({e.error_count()} errors); using placeholder"
+                )
+                validated.append(self._create_placeholder_day(day_num, request.start_date + timedelta(days=day_num - 1)))
+        return validated
+    
     def _create_placeholder_day(self, day_number: int, date: datetime) -> Dict:
         """Create a minimal placeholder day when generation fails"""
         return {
@@ -1016,6 +1118,7 @@ MANDATORY REQUIREMENTS:
         daily_itineraries: List[Dict],
         total_costs: Dict[str, float],
         start_time: datetime,
+        start_perf: float,
         places_data: Dict[str, List[Dict]] = None
     ) -> TripPlanResponse:
         """Assemble final TripPlanResponse from chunks"""
@@ -1030,10 +1133,14 @@ MANDATORY REQUIREMENTS:
         acc_data = overview_data.get("accommodations", {})
         total_accommodation_cost = float(acc_data.get("total_accommodation_cost", 0) or trip_duration * 100)
         
+        # One clock read: the end timestamp is derived from the monotonic elapsed time
+        generation_seconds = time.perf_counter() - start_perf
+        finished_at = start_time + timedelta(seconds=generation_seconds)
+        
         # Build complete trip data
         trip_data = {
             "trip_id": trip_id,
-            "generated_at": start_time.isoformat(),
+            "generated_at": start_time,
             "version": "1.0",
             "origin": request.origin,
             "destination": request.destination,
@@ -1113,14 +1220,22 @@ MANDATORY REQUIREMENTS:
             "alternative_itineraries": {},
             "customization_suggestions": overview_data.get("customization_suggestions", []),
             
-            "last_updated": datetime.utcnow().isoformat(),
-            "generation_time_seconds": (datetime.utcnow() - start_time).total_seconds(),
+            "last_updated": finished_at,
+            "generation_time_seconds": generation_seconds,
             "data_freshness_score": 0.9,
             "confidence_score": 0.85
         }
         
         return self._finalize_trip_response(trip_data, request, trip_id)
     
+    def _get_trip_sanitizer(self):
+        """ItineraryGeneratorService owning the sanitize/route-map/fallback-response helpers, built once and reused."""
+        if self._trip_sanitizer is None:
+            # Imported lazily: itinerary_generator imports this module
+            from src.services.itinerary_generator import ItineraryGeneratorService
+            self._trip_sanitizer = ItineraryGeneratorService(self.vertex_ai, self.places_service, self.travel_service)
+        return self._trip_sanitizer
+    
     def _finalize_trip_response(
         self,
         trip_data: Dict,
@@ -1130,40 +1245,22 @@ MANDATORY REQUIREMENTS:
         """Convert dict to TripPlanResponse with validation"""
         try:
             # Sanitize and validate
-            from src.services.itinerary_generator import ItineraryGeneratorService
-            temp_generator = ItineraryGeneratorService(self.vertex_ai, self.places_service, self.travel_service)
-            sanitized = temp_generator._sanitize_trip_data(trip_data)
-            sanitized = temp_generator._ensure_daily_route_maps(sanitized)
+            sanitizer = self._get_trip_sanitizer()
+            sanitized = sanitizer._sanitize_trip_data(trip_data)
+            sanitized = sanitizer._ensure_daily_route_maps(sanitized)
             
-            return TripPlanResponse(**sanitized)
+            # Validate the dict directly (no kwargs re-packing of the large nested payload)
+            return TripPlanResponse.model_validate(sanitized)
+        except ValidationError as e:
+            self.logger.error(f"Finalization failed: {e.error_count()} validation errors: {e}")
+            raise
         except Exception as e:
             self.logger.error(f"Finalization failed: {e}")
             raise
     
     def _build_condensed_system_prompt(self) -> str:
         """System prompt matching the vertex AI service schema"""
-        return """You are an expert AI Trip Planner. Generate a valid JSON response following the exact schema structure.
-
-CRITICAL RULES:
-1. Use ONLY real place_id values from the provided places_data - NEVER invent or simulate place IDs
-2. Each activity MUST have the complete activity structure with place details
-3. Include breakfast, lunch, dinner as meal activities (activity_type: "meal") from restaurants
-4. Keep 1-2 activities per time block (morning/afternoon/evening)
-5. NEVER repeat the same place across different days - use variety
-6. Every activity must include: activity (full place object), activity_type, estimated_cost_per_person
-7. All monetary values are numbers only (no currency symbols)
-8. "price_level" must be an INTEGER (0-4) or null, NEVER a string like "PRICE_LEVEL_EXPENSIVE"
-   - 0 = Free, 1 = Inexpensive, 2 = Moderate, 3 = Expensive, 4 = Very Expensive
-9. For international destinations, convert all costs to the requested currency (budget_currency)
-10. Return ONLY valid JSON - no markdown, no explanations
-
-🌍 CRITICAL MULTI-CITY COHERENCE RULES:
-- ALL activities within a single day MUST be from the SAME city
-- NEVER mix cities on the same day (e.g., Jaipur morning + Udaipur afternoon is WRONG)
-- Group consecutive days in the same city before moving to next city
-- Inter-city travel should happen at START of new city block only
-- Follow any provided city routing guide for day allocation
-- Maintain logical geographic flow (don't ping-pong between cities)"""
+        return _CONDENSED_SYSTEM_PROMPT
     
     def _extract_city_from_address(self, address: str) -> str:
         """Extract city name from address string"""
@@ -1271,75 +1368,7 @@ COST INSTRUCTIONS:
         start_time: datetime
     ) -> TripPlanResponse:
         """Create error response matching TripPlanResponse schema"""
-        trip_duration = (request.end_date - request.start_date).days
-        
-        return TripPlanResponse(
-            trip_id=trip_id,
-            generated_at=start_time,
-            version="1.0",
-            origin=request.origin,
-            destination=request.destination,
-            trip_duration_days=trip_duration,
-            total_budget=request.total_budget,
-            currency=request.budget_currency,
-            group_size=request.group_size,
-            travel_style=request.primary_travel_style,
-            activity_level=request.activity_level,
-            daily_itineraries=[],
-            accommodations={
-                "primary_recommendation": {
-                    "place_id": "error",
-                    "name": "Error in generation",
-                    "address": "N/A",
-                    "category": "error",
-                    "coordinates": {"lat": 0.0, "lng": 0.0},
-                    "why_recommended": f"Generation failed: {error_message}"
-                },
-                "alternative_options": [],
-                "booking_platforms": [],
-                "estimated_cost_per_night": 0,
-                "total_accommodation_cost": 0
-            },
-            budget_breakdown={
-                "total_budget": request.total_budget,
-                "currency": request.budget_currency,
-                "accommodation_cost": 0,
-                "food_cost": 0,
-                "activities_cost": 0,
-                "transport_cost": 0,
-                "miscellaneous_cost": 0,
-                "daily_budget_suggestion": 0,
-                "cost_per_person": 0,
-                "budget_tips": [f"Error: {error_message}"]
-            },
-            transportation={
-                "airport_transfers": {},
-                "local_transport_guide": {},
-                "daily_transport_costs": {},
-                "recommended_apps": []
-            },
-            map_data={
-                "interactive_map_embed_url": "",
-                "daily_route_maps": {}
-            },
-            local_information={
-                "currency_info": {},
-                "language_info": {},
-                "cultural_etiquette": [],
-                "safety_tips": [],
-                "emergency_contacts": {},
-                "local_customs": [],
-                "tipping_guidelines": {},
-                "useful_phrases": {}
-            },
-            packing_suggestions=[],
-            weather_forecast_summary=None,
-            seasonal_considerations=[],
-            photography_spots=[],
-            hidden_gems=[],
-            alternative_itineraries={},
-            customization_suggestions=[],
-            last_updated=datetime.utcnow(),
-            data_freshness_score=0.0,
-            confidence_score=0.0
+        # Same skeleton as the orchestrator's fallback, built from its shared templates
+        return self._get_trip_sanitizer()._create_minimal_response(
+            request, trip_id, error_message, generated_at=start_time
         )
@@ -1,8 +1,14 @@
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Optional, Tuple
 import httpx
 import math
 
+from src.services import places_cache
+
+# City coordinates don't move; repeat origins/destinations skip the geocoding round trip
+_GEOCODE_CACHE_TTL_SECONDS = 7 * 86400
+
 
 class TravelService:
     """
@@ -12,7 +18,19 @@ class TravelService:
 
     def __init__(self, http_timeout: float = 20.0):
         self.logger = logging.getLogger(__name__)
-        self.client = httpx.Client(timeout=http_timeout)
+        # One long-lived pooled client so repeated geocode/Wikidata lookups reuse
+        # TCP+TLS connections instead of handshaking on every call.
+        self.client = httpx.Client(
+            timeout=httpx.Timeout(http_timeout, connect=5.0),
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=30.0),
+        )
+        # Small pool for independent lookups within one call (the client is thread-safe)
+        self._lookup_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="travel_lookup")
+
+    def close(self) -> None:
+        """Shut down the lookup pool and close the pooled HTTP client."""
+        self._lookup_pool.shutdown(wait=False, cancel_futures=True)
+        self.client.close()
 
     def fetch_travel_options(self, origin: str, destination: str, total_budget: Optional[float] = None, currency: str = "USD", group_size: Optional[int] = None) -> List[Dict]:
         """
@@ -30,9 +48,11 @@ class TravelService:
             if not origin or not destination:
                 return []
 
-            # 1) Geocode origin and destination using Open-Meteo geocoding (free, no key)
+            # 1) Geocode origin and destination using Open-Meteo geocoding (free, no key).
+            # The lookups are independent, so the destination resolves in the pool meanwhile.
+            dest_lookup = self._lookup_pool.submit(self._geocode_city_openmeteo, destination)
             o = self._geocode_city_openmeteo(origin)
-            d = self._geocode_city_openmeteo(destination)
+            d = dest_lookup.result()
             if not o or not d:
                 return []
 
@@ -172,6 +192,10 @@ class TravelService:
     def _geocode_city_openmeteo(self, name: str) -> Optional[Tuple[float, float, str]]:
         """Geocode a city using Open-Meteo geocoding API (free). Returns (lat, lon, country_code)."""
         try:
+            name_key = (name or "").strip().lower()
+            cached = places_cache.get_cached("openmeteo_geocode", name=name_key)
+            if cached is not None:
+                return cached
             url = "https://geocoding-api.open-meteo.com/v1/search"
             resp = self.client.get(url, params={"name": name, "count": 1, "language": "en", "format": "json"})
             if resp.status_code != 200:
@@ -181,7 +205,9 @@ class TravelService:
             if not results:
                 return None
             r = results[0]
-            return float(r["latitude"]), float(r["longitude"]), r.get("country_code") or ""
+            result = (float(r["latitude"]), float(r["longitude"]), r.get("country_code") or "")
+            places_cache.set_cached("openmeteo_geocode", result, ttl_seconds=_GEOCODE_CACHE_TTL_SECONDS, name=name_key)
+            return result
         except Exception:
             return None
 
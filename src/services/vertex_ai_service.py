@@ -1,25 +1,111 @@
 import vertexai
 from vertexai.generative_models import GenerativeModel, Part
-import json
+import asyncio
+import orjson
 import logging
 import base64
 import re
+import threading
+import time
+import weakref
 from typing import Dict, Any, Optional, List, Set
-from datetime import datetime
+from datetime import datetime, timedelta
 from collections import defaultdict
+from tenacity import retry, stop_after_attempt, wait_exponential, wait_random, retry_if_exception_type
 from src.models.request_models import TripPlanRequest
 from src.models.response_models import TripPlanResponse
 
+from src.utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+try:
+    from vertexai.preview import caching as vertex_caching
+except ImportError:  # older SDKs without context caching
+    vertex_caching = None
+
+try:
+    from google.api_core import exceptions as google_exceptions
+    # Overload, quota and deadline errors are worth retrying; anything else (bad request,
+    # permission, safety block) would fail the same way again
+    _TRANSIENT_VERTEX_ERRORS = (
+        google_exceptions.ServiceUnavailable,
+        google_exceptions.ResourceExhausted,
+        google_exceptions.DeadlineExceeded,
+        google_exceptions.InternalServerError,
+        TimeoutError,
+    )
+except ImportError:
+    _TRANSIENT_VERTEX_ERRORS = (TimeoutError,)
+
+_vertex_retry = retry(
+    stop=stop_after_attempt(3),
+    # 0.5s doubling up to 4s, plus random jitter
+    wait=wait_exponential(multiplier=0.5, max=4.0) + wait_random(0, 1),
+    retry=retry_if_exception_type(_TRANSIENT_VERTEX_ERRORS),
+    reraise=True,
+)
+
+GEMINI_MODEL_NAME = "gemini-2.5-flash"
+
+# Explicit context cache for the static trip-plan system prompt
+_PROMPT_CACHE_TTL = timedelta(hours=1)
+_PROMPT_CACHE_REFRESH_MARGIN_SECONDS = 120  # recreate shortly before the server-side expiry
+_PROMPT_CACHE_RETRY_AFTER_SECONDS = 600     # back off after a failed create
+
+# Prompt compaction: per-category caps and (field, source keys) in lookup order. Places
+# from GooglePlacesService already use the first key; the rest cover raw v1 payloads.
+_COMPACT_PLACE_LIMITS = {
+    "restaurants": 20,
+    "attractions": 30,
+    "accommodations": 15,
+    "shopping": 10,
+    "nightlife": 8,
+    "cultural_sites": 12,
+    "outdoor_activities": 12,
+    "transportation_hubs": 8,
+    "must_visit": 12
+}
+def _display_name_text(p: Dict[str, Any]) -> Optional[str]:
+    display_name = p.get("displayName")
+    return display_name.get("text") if isinstance(display_name, dict) else None
+
+def _location_coordinates(p: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    location = p.get("location")
+    if not isinstance(location, dict):
+        return None
+    return {"lat": location.get("latitude"), "lng": location.get("longitude")}
+
+_COMPACT_PLACE_FIELDS = (
+    ("place_id", ("place_id", "id"), None),
+    ("name", ("name",), _display_name_text),
+    ("address", ("address", "formattedAddress"), None),
+    ("coordinates", ("coordinates",), _location_coordinates),
+    ("rating", ("rating",), None),
+    ("user_ratings_total", ("user_ratings_total", "userRatingCount"), None),
+    ("price_level", ("price_level", "priceLevel"), None),
+    ("types", ("types",), None),
+)
+
 class VertexAIService:
     def __init__(self, project_id: str, location: str = "us-central1"):
         self.project_id = project_id
         self.location = location
         self.logger = logging.getLogger(__name__)
         
+        # Lazily created context cache holding the system prompt (shared across worker threads)
+        self._prompt_cache_lock = threading.Lock()
+        self._prompt_cache_model: Optional[GenerativeModel] = None
+        self._prompt_cache_expires_at = 0.0
+        self._prompt_cache_retry_at = 0.0
+        # Consecutive transient failures open the circuit so callers degrade immediately
+        # instead of queueing behind timeouts while Vertex is unavailable
+        self._breaker = CircuitBreaker("vertex", fail_max=5, reset_timeout=30.0)
+        # Per-event-loop models for native async generation
+        self._async_models: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, GenerativeModel]" = weakref.WeakKeyDictionary()
+        
         # Initialize Vertex AI
         try:
             vertexai.init(project=project_id, location=location)
-            self.model = GenerativeModel("gemini-2.5-flash")
+            self.model = GenerativeModel(GEMINI_MODEL_NAME)
             self.logger.info(f"Vertex AI initialized successfully for project {project_id}")
         except Exception as e:
             self.logger.error(f"Failed to initialize Vertex AI: {str(e)}")
@@ -39,7 +125,7 @@ class VertexAIService:
             compact_places_raw = self._compact_places_data(places_data)
             compact_places = self._cap_compact_places_for_prompt(compact_places_raw)
             try:
-                compact_json = json.dumps(compact_places, ensure_ascii=False, separators=(",", ":"))
+                compact_json = orjson.dumps(compact_places, default=str).decode()
                 counts = {k: (len(v) if isinstance(v, list) else 0) for k, v in compact_places.items() if isinstance(v, list)}
                 self.logger.info(
                     "[vertex] compact places summary",
@@ -50,25 +136,28 @@ class VertexAIService:
                     }
                 )
                 # Full compact JSON at debug
-                self.logger.debug("[vertex] compact places JSON\n%s", json.dumps(compact_places, ensure_ascii=False, indent=2))
+                if self.logger.isEnabledFor(logging.DEBUG):
+                    self.logger.debug("[vertex] compact places JSON\n%s", orjson.dumps(compact_places, default=str, option=orjson.OPT_INDENT_2).decode())
             except Exception as _e:
                 self.logger.debug("[vertex] failed to serialize compact places", extra={"error": str(_e)})
 
             user_prompt = self._build_user_prompt(request, places_data, compact_places=compact_places)
             # Prompt diagnostics (sizes only)
             trip_duration = (request.end_date - request.start_date).days
-            self.logger.debug(
-                "[vertex] prompt sizes",
-                extra={
-                    "system_len": len(system_prompt or ""),
-                    "user_len": len(user_prompt or ""),
-                    "destination": request.destination,
-                    "trip_duration": trip_duration,
-                    "group_size": request.group_size,
-                    "style": str(request.primary_travel_style),
-                    "activity": str(request.activity_level)
-                }
-            )
+            debug_enabled = self.logger.isEnabledFor(logging.DEBUG)
+            if debug_enabled:
+                self.logger.debug(
+                    "[vertex] prompt sizes",
+                    extra={
+                        "system_len": len(system_prompt or ""),
+                        "user_len": len(user_prompt or ""),
+                        "destination": request.destination,
+                        "trip_duration": trip_duration,
+                        "group_size": request.group_size,
+                        "style": str(request.primary_travel_style),
+                        "activity": str(request.activity_level)
+                    }
+                )
             
             # Warn if trip is too long for single-shot generation
             if trip_duration > 7:
@@ -81,23 +170,35 @@ class VertexAIService:
             self.logger.debug("[vertex] user prompt\n%s", user_prompt)
             
             # Generate content using Gemini Flash
-            response = self.model.generate_content(
-                [system_prompt, user_prompt],
-                generation_config={
-                    "temperature": 0.7,
-                    # "top_p": 0.8,
-                    # "top_k": 40,
-                    "response_mime_type": "application/json",
-                    # Do not force max_output_tokens; allow model to choose suitable budget
-                    "candidate_count": 1
-                }
-            )       
+            generation_config = {
+                "temperature": 0.7,
+                # "top_p": 0.8,
+                # "top_k": 40,
+                "response_mime_type": "application/json",
+                # Do not force max_output_tokens; allow model to choose suitable budget
+                "candidate_count": 1
+            }
+            response = None
+            cached_model = self._get_prompt_cache_model(system_prompt)
+            if cached_model is not None:
+                try:
+                    # The system prompt is served from the context cache; only send the user prompt
+                    response = self._generate_content(cached_model, [user_prompt], generation_config)
+                except (CircuitOpenError,) + _TRANSIENT_VERTEX_ERRORS:
+                    # Vertex itself is failing, not the cached content; don't retry uncached
+                    raise
+                except Exception as cache_err:
+                    self.logger.warning(
+                        "[vertex] cached-content generation failed; retrying without cache",
+                        extra={"error": str(cache_err)}
+                    )
+                    self._invalidate_prompt_cache()
+            if response is None:
+                response = self._generate_content(self.model, [system_prompt, user_prompt], generation_config)
             self.logger.debug("[vertex] raw response object received")
-            print("response", response)
             # Log brief info about raw response/candidates
             try:
                 cand_count = len(getattr(response, "candidates", []) or [])
-                print("cand_count", cand_count)
             except Exception:
                 cand_count = None
             self.logger.info(
@@ -107,13 +208,14 @@ class VertexAIService:
             # Usage metadata and finish reasons
             try:
                 usage = getattr(response, "usage_metadata", None)
-                print("usage", usage)
                 usage_info = None
                 if usage:
                     usage_info = {
                         "prompt_tokens": getattr(usage, "prompt_token_count", None),
                         "candidates_tokens": getattr(usage, "candidates_token_count", None),
-                        "total_tokens": getattr(usage, "total_token_count", None)
+                        "total_tokens": getattr(usage, "total_token_count", None),
+                        # Prompt tokens served from the (explicit or implicit) context cache
+                        "cached_tokens": getattr(usage, "cached_content_token_count", None),
                     }
                 finishes = []
                 for ci, cand in enumerate(getattr(response, "candidates", []) or []):
@@ -125,47 +227,52 @@ class VertexAIService:
                     self.logger.info("[vertex] usage & finishes", extra={"usage": usage_info, "finishes": finishes})
             except Exception:
                 pass
-            # Log full serialized response for diagnostics
-            try:
-                print("response", response)
-                serialized = self._serialize_vertex_response(response)
-                print('serialized', serialized)
-                self.logger.info("[vertex] full response (serialized)\n%s", json.dumps(serialized, ensure_ascii=False, indent=2))
-            except Exception as ser_e:
-                self.logger.debug("[vertex] response serialization failed", extra={"error": str(ser_e)})
+            # Log full serialized response for diagnostics; walking and dumping the whole
+            # payload is only worth it when debug records are actually emitted
+            if debug_enabled:
+                try:
+                    serialized = self._serialize_vertex_response(response)
+                    self.logger.debug(
+                        "[vertex] full response (serialized)\n%s",
+                        orjson.dumps(serialized, default=str, option=orjson.OPT_INDENT_2).decode(),
+                    )
+                except Exception as ser_e:
+                    self.logger.debug("[vertex] response serialization failed", extra={"error": str(ser_e)})
             # Per-candidate/part diagnostics (lengths only)
-            try:
-                details = []
-                for ci, cand in enumerate(getattr(response, "candidates", []) or []):
-                    content = getattr(cand, "content", None)
-                    parts = getattr(content, "parts", None) if content else None
-                    part_lens = []
-                    if parts:
-                        for pi, part in enumerate(parts):
-                            txt = getattr(part, "text", None)
-                            part_lens.append({"part": pi, "len": len(txt) if isinstance(txt, str) else 0})
-                    details.append({"candidate": ci, "parts": part_lens})
-                if details:
-                    self.logger.debug("[vertex] candidates parts lens", extra={"details": details})
-            except Exception:
-                # best-effort logging
-                pass
+            if debug_enabled:
+                try:
+                    details = []
+                    for ci, cand in enumerate(getattr(response, "candidates", []) or []):
+                        content = getattr(cand, "content", None)
+                        parts = getattr(content, "parts", None) if content else None
+                        part_lens = []
+                        if parts:
+                            for pi, part in enumerate(parts):
+                                txt = getattr(part, "text", None)
+                                part_lens.append({"part": pi, "len": len(txt) if isinstance(txt, str) else 0})
+                        details.append({"candidate": ci, "parts": part_lens})
+                    if details:
+                        self.logger.debug("[vertex] candidates parts lens", extra={"details": details})
+                except Exception:
+                    # best-effort logging
+                    pass
 
             # Parse the structured JSON response from Gemini, supporting multi-part candidates
             response_text = self._extract_response_text(response)
-            self.logger.debug(
-                "[vertex] extracted text",
-                extra={
-                    "length": len(response_text) if response_text else 0,
-                    "preview": (response_text[:500] + "…") if response_text and len(response_text) > 500 else response_text
-                }
-            )
+            if debug_enabled:
+                self.logger.debug(
+                    "[vertex] extracted text",
+                    extra={
+                        "length": len(response_text) if response_text else 0,
+                        "preview": (response_text[:500] + "…") if response_text and len(response_text) > 500 else response_text
+                    }
+                )
             if response_text:
                 self.logger.info("[vertex] extracted text (pre-parse)\n%s", response_text)
 
             if response_text:
                 try:
-                    trip_data = json.loads(response_text)
+                    trip_data = orjson.loads(response_text)
                     # Log the transformed (parsed) data shape, not full payload
                     keys = list(trip_data.keys()) if isinstance(trip_data, dict) else []
                     self.logger.info(
@@ -173,7 +280,7 @@ class VertexAIService:
                         extra={"top_level_keys": keys[:20], "key_count": len(keys)}
                     )
                     return trip_data
-                except json.JSONDecodeError as e:
+                except orjson.JSONDecodeError as e:
                     self.logger.error("[vertex] JSON parse failed", extra={"error": str(e)})
                     return self._handle_parsing_error(response_text, request)
             else:
@@ -184,6 +291,46 @@ class VertexAIService:
             self.logger.exception("[vertex] Error generating trip plan")
             return self._handle_generation_error(str(e), request)
     
+    def _get_prompt_cache_model(self, system_prompt: str) -> Optional[GenerativeModel]:
+        """Return a model bound to a context cache of the system prompt, or None.
+
+        The cache is created on first use and recreated shortly before it expires. Failures
+        (SDK without caching, prompt below the minimum cacheable size, quota) fall back to
+        uncached generation and are not retried for a while.
+        """
+        if vertex_caching is None:
+            return None
+        now = time.monotonic()
+        with self._prompt_cache_lock:
+            if self._prompt_cache_model is not None and now < self._prompt_cache_expires_at:
+                return self._prompt_cache_model
+            if now < self._prompt_cache_retry_at:
+                return None
+            try:
+                cached_content = vertex_caching.CachedContent.create(
+                    model_name=GEMINI_MODEL_NAME,
+                    system_instruction=system_prompt,
+                    ttl=_PROMPT_CACHE_TTL,
+                    display_name="trip-plan-system-prompt",
+                )
+                self._prompt_cache_model = GenerativeModel.from_cached_content(cached_content=cached_content)
+                self._prompt_cache_expires_at = (
+                    now + _PROMPT_CACHE_TTL.total_seconds() - _PROMPT_CACHE_REFRESH_MARGIN_SECONDS
+                )
+                self.logger.info("[vertex] system prompt context cache created", extra={"cache": cached_content.name})
+                return self._prompt_cache_model
+            except Exception as e:
+                self._prompt_cache_model = None
+                self._prompt_cache_retry_at = now + _PROMPT_CACHE_RETRY_AFTER_SECONDS
+                self.logger.warning("[vertex] context cache unavailable; using uncached prompts", extra={"error": str(e)})
+                return None
+    
+    def _invalidate_prompt_cache(self) -> None:
+        """Drop the cached-content model (e.g. after the server-side cache expired)."""
+        with self._prompt_cache_lock:
+            self._prompt_cache_model = None
+            self._prompt_cache_expires_at = 0.0
+    
     def _build_system_prompt(self) -> str:
                 return """
                 You are an expert AI Trip Planner. Your ONLY task is to return a single valid JSON object that STRICTLY matches the TripPlanResponse schema below. Do NOT include any extra text, markdown, or commentary outside the JSON.
@@ -384,6 +531,19 @@ class VertexAIService:
                                                                     - "map_data.daily_route_maps" MUST include an entry for EVERY day in daily_itineraries with key "Day {day_number}".
                                                                     - Each value MUST be a single HTTPS URL (matching ^https://) to a route map that sequences ALL locations visited that day in order (morning → afternoon → evening; include meal stops). Never output placeholders like "Day 1 map", "[route]", or descriptive text without a URL.
                                                                     - Build the route using ONLY places from places_data and their coordinates. If fewer than 2 locations with coordinates exist on a day, return a valid static map URL showing the available point(s) rather than a placeholder.
+                                                                - Multi-city coherence (STRICT):
+                                                                    - If this is a multi-city destination (state/country), ALL activities within a single day MUST be from the SAME city
+                                                                    - NEVER mix cities on the same day (e.g., DON'T have Jaipur activity in morning and Udaipur activity in afternoon)
+                                                                    - Group consecutive days in the same city (e.g., Days 1-3 in City A, Days 4-6 in City B)
+                                                                    - Inter-city travel should happen at the START of a new city block (morning of the first day in new city)
+                                                                    - Check the address field of each place to ensure city consistency within each day
+                                                                    - Follow the suggested city routing in the user content for optimal flow
+                                                                - Daily planning:
+                                                                    - Keep daily activities concise and place-only (1–2 real places per time block). No transport or accommodation as activities.
+                                                                    - Use the origin and travel_options (or travel_to_destination fallback) to determine arrival timing and departure flow.
+                                                                    - Use only the place_ids provided in the places_data – do not make up any place IDs; never output placeholders like generic_*.
+                                                                    - Create a logical daily flow that considers travel time between locations; put connective logic in each activity's description.
+                                                                    - Emphasize a rhythmic daily flow—breakfast → explore → lunch → explore → evening wind-down → dinner—with meals chosen from places_data, favoring high ratings and strong review counts; vary cuisines using must_try_cuisines and don’t repeat restaurants.
                                                                 - Respond with valid JSON only, no extra text.
                 """
     
@@ -418,7 +578,7 @@ class VertexAIService:
           Example: {{"currency": "Indian Rupee (INR)", "symbol": "₹", "exchange_rate": "1 INR = 1 INR", "payment_methods": ["Cash", "UPI", "Credit Card"]}}
         
         USER PREFERENCES (1-5 scale):
-        {json.dumps(request.preferences.dict(), indent=2)}
+        {orjson.dumps(request.preferences.model_dump(), option=orjson.OPT_INDENT_2).decode()}
         
         SPECIAL REQUIREMENTS:
         - Accommodation: {request.accommodation_type}
@@ -433,28 +593,15 @@ class VertexAIService:
         - Language preferences: {request.language_preferences}
         
         AVAILABLE PLACES DATA (COMPACT):
-        {json.dumps(compact_places, indent=2)}
+        {orjson.dumps(compact_places, default=str, option=orjson.OPT_INDENT_2).decode()}
         
         {self._generate_city_routing_guide(places_data, trip_duration, request.origin)}
         
         Generate a complete trip plan following the TripPlanResponse schema exactly.
         
-        CRITICAL MULTI-CITY COHERENCE RULES:
-        - If this is a multi-city destination (state/country), ALL activities within a single day MUST be from the SAME city
-        - NEVER mix cities on the same day (e.g., DON'T have Jaipur activity in morning and Udaipur activity in afternoon)
-        - Group consecutive days in the same city (e.g., Days 1-3 in City A, Days 4-6 in City B)
-        - Inter-city travel should happen at the START of a new city block (morning of the first day in new city)
-        - Check the address field of each place to ensure city consistency within each day
-        - Follow the suggested city routing above for optimal flow
-        
-        DAILY PLANNING RULES:
-        - Keep daily activities concise and place-only (1–2 real places per time block). No transport or accommodation as activities.
-        - Use the origin and travel_options (or travel_to_destination fallback) to determine arrival timing and departure flow.
+        TRIP-SPECIFIC RULES:
         - Ensure all costs are realistic for {request.destination} and match the {request.primary_travel_style} travel style.
-        - Use only the place_ids provided in the places_data – do not make up any place IDs; never output placeholders like generic_*.
-        - Create a logical daily flow that considers travel time between locations; put connective logic in each activity's description.
         - Include practical tips, local customs, and cultural insights for {request.destination}.
-        - Emphasize a rhythmic daily flow—breakfast → explore → lunch → explore → evening wind-down → dinner—with meals chosen from places_data, favoring high ratings and strong review counts; vary cuisines using must_try_cuisines and don’t repeat restaurants.
         - Critical Final Instruction: Ensure every place, attraction, and restaurant in the final itinerary is selected directly from the AVAILABLE PLACES DATA and uses its corresponding real place_id. Do not invent any places.
         """
 
@@ -593,44 +740,30 @@ class VertexAIService:
         try:
             if not isinstance(places_data, dict):
                 return {}
-            limits = {
-                "restaurants": 20,
-                "attractions": 30,
-                "accommodations": 15,
-                "shopping": 10,
-                "nightlife": 8,
-                "cultural_sites": 12,
-                "outdoor_activities": 12,
-                "transportation_hubs": 8,
-                "must_visit": 12
-            }
-            keep_keys = {"place_id", "id", "name", "displayName", "formattedAddress", "address", "location", "coordinates", "rating", "user_ratings_total", "userRatingCount", "price_level", "priceLevel", "types", "websiteUri", "website", "internationalPhoneNumber", "phone"}
 
             def _map_place(p: Dict[str, Any]) -> Dict[str, Any]:
                 if not isinstance(p, dict):
                     return {}
-                # Normalize common fields to our expected names; no photos
-                out: Dict[str, Any] = {
-                    "place_id": p.get("place_id") or p.get("id"),
-                    "name": p.get("name") or ((p.get("displayName") or {}).get("text") if isinstance(p.get("displayName"), dict) else None),
-                    "address": p.get("address") or p.get("formattedAddress"),
-                    "coordinates": p.get("coordinates") or ({
-                        "lat": (p.get("location") or {}).get("latitude"),
-                        "lng": (p.get("location") or {}).get("longitude")
-                    } if isinstance(p.get("location"), dict) else None),
-                    "rating": p.get("rating"),
-                    "user_ratings_total": p.get("user_ratings_total") or p.get("userRatingCount"),
-                    "price_level": p.get("price_level") or p.get("priceLevel"),
-                    "types": p.get("types"),
-                }
-                # remove Nones
-                return {k: v for k, v in out.items() if v is not None}
+                # Normalize common fields to our expected names (first non-None source
+                # key wins, Nones dropped); no photos
+                out: Dict[str, Any] = {}
+                for field, keys, fallback in _COMPACT_PLACE_FIELDS:
+                    value = None
+                    for key in keys:
+                        value = p.get(key)
+                        if value is not None:
+                            break
+                    if value is None and fallback is not None:
+                        value = fallback(p)
+                    if value is not None:
+                        out[field] = value
+                return out
 
             compact: Dict[str, Any] = {}
             for cat, arr in places_data.items():
                 if not isinstance(arr, list):
                     continue
-                limit = limits.get(cat, 12)
+                limit = _COMPACT_PLACE_LIMITS.get(cat, 12)
                 trimmed = []
                 for p in arr[:limit]:
                     mp = _map_place(p)
@@ -665,8 +798,8 @@ class VertexAIService:
                 new_arr = []
                 for p in arr:
                     try:
-                        js = json.dumps(p, separators=(",", ":"))
-                    except Exception:
+                        js = orjson.dumps(p)
+                    except (TypeError, ValueError):
                         continue
                     if len(js) > max_entry_chars:
                         continue
@@ -748,16 +881,16 @@ class VertexAIService:
             end_idx = response_text.rfind('}')
             if start_idx != -1 and end_idx != -1 and end_idx > start_idx:
                 json_str = response_text[start_idx:end_idx + 1]
-                return json.loads(json_str)
-        except Exception:
+                return orjson.loads(json_str)
+        except orjson.JSONDecodeError:
             pass
 
         # Try to repair truncated JSON (common on MAX_TOKENS)
         repaired = self._repair_json_string(response_text)
         if repaired:
             try:
-                return json.loads(repaired)
-            except Exception as e:
+                return orjson.loads(repaired)
+            except orjson.JSONDecodeError as e:
                 self.logger.debug("[vertex] JSON repair parse failed", extra={"error": str(e)})
 
         # Try progressively truncating to the last complete object end
@@ -767,8 +900,8 @@ class VertexAIService:
             while start_idx != -1 and end_idx != -1 and end_idx > start_idx:
                 candidate = response_text[start_idx:end_idx + 1]
                 try:
-                    return json.loads(candidate)
-                except Exception:
+                    return orjson.loads(candidate)
+                except orjson.JSONDecodeError:
                     end_idx = response_text.rfind('}', 0, end_idx)
         except Exception:
             pass
@@ -820,8 +953,7 @@ class VertexAIService:
             close_brack = s.count(']')
 
             # Remove trailing commas before closing braces/brackets
-            import re as _re
-            s = _re.sub(r",\s*(\}|\])", r"\1", s)
+            s = re.sub(r",\s*(\}|\])", r"\1", s)
 
             if close_brack < open_brack:
                 s = s + (']' * (open_brack - close_brack))
@@ -842,7 +974,8 @@ class VertexAIService:
                 result["usage_metadata"] = {
                     "prompt_token_count": getattr(usage, "prompt_token_count", None),
                     "candidates_token_count": getattr(usage, "candidates_token_count", None),
-                    "total_token_count": getattr(usage, "total_token_count", None)
+                    "total_token_count": getattr(usage, "total_token_count", None),
+                    "cached_content_token_count": getattr(usage, "cached_content_token_count", None)
                 }
             candidates_out = []
             for cand in getattr(response, "candidates", []) or []:
@@ -904,9 +1037,12 @@ class VertexAIService:
     
     def _create_error_response(self, request: TripPlanRequest, error_message: str) -> Dict[str, Any]:
         """Create a basic error response when AI generation fails"""
+        # One clock read for the id and both timestamps
+        now = datetime.utcnow()
+        stamp = now.isoformat()
         return {
-            "trip_id": f"error_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
-            "generated_at": datetime.utcnow().isoformat(),
+            "trip_id": f"error_{now:%Y%m%d_%H%M%S}",
+            "generated_at": stamp,
             "version": "1.0",
             "origin": request.origin,
             "destination": request.destination,
@@ -975,7 +1111,7 @@ class VertexAIService:
             "hidden_gems": [],
             "alternative_itineraries": {},
             "customization_suggestions": [],
-            "last_updated": datetime.utcnow().isoformat(),
+            "last_updated": stamp,
             "data_freshness_score": 0.0,
             "confidence_score": 0.0
         }
@@ -987,36 +1123,123 @@ class VertexAIService:
         Raises exception if generation fails.
         """
         try:
-            self.logger.debug(f"[vertex] generate_json_from_prompt called with temp={temperature}")
-            response = self.model.generate_content(
-                [prompt],
-                generation_config={
-                    "temperature": temperature,
-                    "response_mime_type": "application/json",
-                    "candidate_count": 1,
-                }
-            )
-            # Try to extract text content
-            text_attr = getattr(response, "text", None)
-            if isinstance(text_attr, str) and text_attr.strip():
-                self.logger.debug(f"[vertex] Response text length: {len(text_attr)}")
-                return text_attr
-            # Fallback to concatenating parts
-            parts_text: list[str] = []
-            for cand in getattr(response, "candidates", []) or []:
-                content = getattr(cand, "content", None)
-                for part in getattr(content, "parts", []) or []:
-                    t = getattr(part, "text", None)
-                    if t:
-                        parts_text.append(t)
-            result = "\n".join(parts_text).strip()
-            if result:
-                self.logger.debug(f"[vertex] Response from parts, length: {len(result)}")
-                return result
-            else:
-                self.logger.warning("[vertex] Empty response from model")
-                return "{}"
+            self.logger.debug("[vertex] generate_json_from_prompt called with temp=%s", temperature)
+            response = self._generate_content(self.model, [prompt], self._json_generation_config(temperature))
+            return self._json_response_text(response)
         except Exception as e:
             self.logger.error(f"[vertex] generate_json_from_prompt failed: {e}", exc_info=True)
             # Re-raise the exception instead of silently returning empty JSON
             raise RuntimeError(f"Vertex AI generation failed: {str(e)}") from e
+    
+    async def generate_json_from_prompt_async(self, prompt: str, temperature: float = 0.4) -> str:
+        """Async variant of generate_json_from_prompt using the SDK's native async call,
+        so the event loop stays free without occupying a worker thread per request.
+        """
+        try:
+            self.logger.debug("[vertex] generate_json_from_prompt_async called with temp=%s", temperature)
+            response = await self._generate_content_async(
+                self._get_async_model(), [prompt], self._json_generation_config(temperature)
+            )
+            return self._json_response_text(response)
+        except Exception as e:
+            self.logger.error(f"[vertex] generate_json_from_prompt_async failed: {e}", exc_info=True)
+            raise RuntimeError(f"Vertex AI generation failed: {str(e)}") from e
+    
+    def _generate_content(self, model: GenerativeModel, contents: List[Any], generation_config: Dict[str, Any]) -> Any:
+        """model.generate_content with transient-error retries, behind the Vertex circuit breaker."""
+        self._breaker.before_call()
+        try:
+            response = self._generate_content_with_retry(model, contents, generation_config)
+        except _TRANSIENT_VERTEX_ERRORS:
+            self._breaker.record_failure()
+            raise
+        except Exception:
+            # Vertex answered (e.g. rejected the request), so it is reachable: this closes
+            # the circuit too, rather than leaving a half-open trial unresolved
+            self._breaker.record_success()
+            raise
+        self._breaker.record_success()
+        return response
+    
+    async def _generate_content_async(self, model: GenerativeModel, contents: List[Any], generation_config: Dict[str, Any]) -> Any:
+        """Async counterpart of _generate_content."""
+        self._breaker.before_call()
+        try:
+            response = await self._generate_content_async_with_retry(model, contents, generation_config)
+        except _TRANSIENT_VERTEX_ERRORS:
+            self._breaker.record_failure()
+            raise
+        except Exception:
+            # Vertex answered (e.g. rejected the request), so it is reachable: this closes
+            # the circuit too, rather than leaving a half-open trial unresolved
+            self._breaker.record_success()
+            raise
+        self._breaker.record_success()
+        return response
+    
+    @_vertex_retry
+    def _generate_content_with_retry(self, model: GenerativeModel, contents: List[Any], generation_config: Dict[str, Any]) -> Any:
+        return model.generate_content(contents, generation_config=generation_config)
+    
+    @_vertex_retry
+    async def _generate_content_async_with_retry(self, model: GenerativeModel, contents: List[Any], generation_config: Dict[str, Any]) -> Any:
+        return await model.generate_content_async(contents, generation_config=generation_config)
+    
+    def _get_async_model(self) -> GenerativeModel:
+        """Model for async calls in the running event loop.
+
+        The SDK binds its async gRPC client to the loop it was first used on, and trips are
+        generated on per-worker loops as well as the server loop, so each loop gets its own
+        model instance.
+        """
+        loop = asyncio.get_running_loop()
+        model = self._async_models.get(loop)
+        if model is None:
+            model = GenerativeModel(GEMINI_MODEL_NAME)
+            self._async_models[loop] = model
+        return model
+    
+    async def close(self):
+        """Close the async gRPC channel of the model owned by the running event loop."""
+        model = self._async_models.pop(asyncio.get_running_loop(), None)
+        if model is None:
+            return
+        # Models are only created for async calls, which create the SDK's (private) async
+        # client; if it can't be found the SDK layout changed and the channel would leak
+        client = getattr(model, "_prediction_async_client_value", None)
+        transport = getattr(client, "transport", None)
+        if transport is None:
+            self.logger.warning("[vertex] async model has no gRPC transport to close; channel may leak")
+            return
+        await transport.close()
+    
+    @staticmethod
+    def _json_generation_config(temperature: float) -> Dict[str, Any]:
+        return {
+            "temperature": temperature,
+            "response_mime_type": "application/json",
+            "candidate_count": 1,
+        }
+    
+    def _json_response_text(self, response: Any) -> str:
+        """Extract the JSON text from a model response ("{}" when empty)."""
+        # Try to extract text content
+        text_attr = getattr(response, "text", None)
+        if isinstance(text_attr, str) and text_attr.strip():
+            self.logger.debug("[vertex] Response text length: %d", len(text_attr))
+            return text_attr
+        # Fallback to concatenating parts
+        parts_text: list[str] = []
+        for cand in getattr(response, "candidates", []) or []:
+            content = getattr(cand, "content", None)
+            for part in getattr(content, "parts", []) or []:
+                t = getattr(part, "text", None)
+                if t:
+                    parts_text.append(t)
+        result = "\n".join(parts_text).strip()
+        if result:
+            self.logger.debug("[vertex] Response from parts, length: %d", len(result))
+            return result
+        else:
+            self.logger.warning("[vertex] Empty response from model")
+            return "{}"
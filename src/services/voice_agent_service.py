@@ -43,7 +43,8 @@ class VoiceAgentService:
                 self.logger.error(f"[voice-agent] Trip {trip_id} not found")
                 raise ValueError(f"Trip {trip_id} not found")
             
-            self.logger.debug(f"[voice-agent] Trip data keys: {list(trip_data.keys())}")
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug("[voice-agent] Trip data keys: %s", list(trip_data.keys()))
             
             itinerary = trip_data.get('itinerary')
             if not itinerary:
@@ -56,7 +57,8 @@ class VoiceAgentService:
             self.logger.info("[voice-agent] Parsing user intent with Vertex AI...")
             edit_intent = await self._parse_edit_intent(user_command, itinerary)
             self.logger.info(f"[voice-agent] Intent parsed - Type: {edit_intent.get('edit_type', 'unknown')}")
-            self.logger.debug(f"[voice-agent] Full intent: {json.dumps(edit_intent, indent=2)}")
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug("[voice-agent] Full intent: %s", json.dumps(edit_intent, indent=2))
             
             # Step 3: Fetch relevant places data if needed
             places_data = None
@@ -331,7 +333,8 @@ Return ONLY the complete updated itinerary JSON, no additional text or explanati
                 self.logger.error(f"[voice-agent] Trip {trip_id} not found in Firestore")
                 raise ValueError(f"Trip {trip_id} not found")
             
-            self.logger.debug(f"[voice-agent] Trip data fetched, keys: {list(trip_data.keys())}")
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug("[voice-agent] Trip data fetched, keys: %s", list(trip_data.keys()))
             
             itinerary = trip_data.get('itinerary')
             if not itinerary:
@@ -342,7 +345,7 @@ Return ONLY the complete updated itinerary JSON, no additional text or explanati
             
             # Generate suggestions using Vertex AI
             prompt = self._build_suggestions_prompt(itinerary)
-            self.logger.debug(f"[voice-agent] Prompt length: {len(prompt)} characters")
+            self.logger.debug("[voice-agent] Prompt length: %d characters", len(prompt))
             
             self.logger.info("[voice-agent] Calling Vertex AI for suggestions...")
             try:
@@ -352,7 +355,7 @@ Return ONLY the complete updated itinerary JSON, no additional text or explanati
                 raise RuntimeError(f"Vertex AI generation failed. Please check your credentials: {str(vertex_error)}")
             
             self.logger.info(f"[voice-agent] Vertex AI response received, length: {len(response_text) if response_text else 0}")
-            self.logger.debug(f"[voice-agent] Raw response text: {response_text[:500]}...")
+            self.logger.debug("[voice-agent] Raw response text: %.500s...", response_text)
             
             if not response_text or response_text.strip() == "" or response_text == "{}":
                 self.logger.warning("[voice-agent] Empty or null response from Vertex AI")
@@ -360,7 +363,8 @@ Return ONLY the complete updated itinerary JSON, no additional text or explanati
             
             try:
                 suggestions_data = json.loads(response_text)
-                self.logger.debug(f"[voice-agent] Parsed JSON keys: {list(suggestions_data.keys())}")
+                if self.logger.isEnabledFor(logging.DEBUG):
+                    self.logger.debug("[voice-agent] Parsed JSON keys: %s", list(suggestions_data.keys()))
             except json.JSONDecodeError as je:
                 self.logger.error(f"[voice-agent] JSON decode error: {str(je)}")
                 self.logger.error(f"[voice-agent] Response text: {response_text}")
@@ -374,10 +378,12 @@ Return ONLY the complete updated itinerary JSON, no additional text or explanati
             
             if not suggestions_list:
                 self.logger.warning("[voice-agent] No suggestions in response data")
-                self.logger.debug(f"[voice-agent] Full response data: {json.dumps(suggestions_data, indent=2)}")
+                if self.logger.isEnabledFor(logging.DEBUG):
+                    self.logger.debug("[voice-agent] Full response data: %s", json.dumps(suggestions_data, indent=2))
             else:
                 # Log first suggestion as example
-                self.logger.debug(f"[voice-agent] First suggestion: {json.dumps(suggestions_list[0], indent=2)}")
+                if self.logger.isEnabledFor(logging.DEBUG):
+                    self.logger.debug("[voice-agent] First suggestion: %s", json.dumps(suggestions_list[0], indent=2))
             
             return {
                 "success": True,
@@ -0,0 +1,52 @@
+"""
+Circuit breaker for outbound API calls.
+
+After `fail_max` consecutive failures the breaker opens and calls fail fast for
+`reset_timeout` seconds; the first call after that is let through as a trial and either
+closes the breaker (success) or re-opens it (failure). Callers record only the failures
+that mean the dependency is unavailable; any other outcome, including an error the
+dependency returned, counts as a success. State is guarded by a
+threading.Lock so one breaker can be shared by the server event loop and the
+worker-thread event loops used for background trip generation.
+"""
+import threading
+import time
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a dependency whose circuit is open."""
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a timed half-open trial."""
+
+    def __init__(self, name: str, fail_max: int = 5, reset_timeout: float = 30.0):
+        if fail_max < 1:
+            raise ValueError("fail_max must be at least 1")
+        self.name = name
+        self.fail_max = fail_max
+        self.reset_timeout = float(reset_timeout)
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def before_call(self) -> None:
+        """Raise CircuitOpenError while the circuit is open; otherwise allow the call."""
+        with self._lock:
+            if self._failures < self.fail_max:
+                return
+            now = time.monotonic()
+            if now - self._opened_at < self.reset_timeout:
+                raise CircuitOpenError(f"{self.name} circuit open; failing fast")
+            # Half-open: let this call through as the trial and hold the others off
+            self._opened_at = now
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.fail_max:
+                self._opened_at = time.monotonic()
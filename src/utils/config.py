@@ -26,11 +26,15 @@ class Settings(BaseSettings):
     
     # Rate Limiting
     PLACES_API_RATE_LIMIT: int = 100  # per minute
+    PLACES_API_MAX_QPS: float = 10.0  # token bucket for Places API v1 calls
+    PLACES_API_MAX_CONCURRENCY: int = 10  # in-flight Places API v1 calls per event loop
     VERTEX_AI_RATE_LIMIT: int = 60    # per minute
     
     # Caching
     REDIS_URL: str = "redis://localhost:6379"
     CACHE_TTL_SECONDS: int = 3600
+    TRIP_PLAN_CACHE_TTL_SECONDS: int = 3600  # identical trip requests reuse the generated plan
+    PLACES_CACHE_TTL_SECONDS: int = 21600  # Places searches/results shared across trips to a destination
     
     # Logging
     LOG_LEVEL: str = "INFO"
@@ -111,10 +111,12 @@ class FirestoreManager:
             # Build simplified payload: entire itinerary JSON at root
             structured = self._build_firestore_structure(request_data, response_data)
             root_payload = structured["root"]
+            # One timestamp for both fields, so a new trip's created_at == updated_at
+            stamp = datetime.utcnow().isoformat()
             root_payload.update({
                 "request": self._sanitize_for_firestore(request_data),
-                "created_at": datetime.utcnow().isoformat(),
-                "updated_at": datetime.utcnow().isoformat(),
+                "created_at": stamp,
+                "updated_at": stamp,
                 "schema_version": 2,
             })
 
@@ -198,6 +200,7 @@ class FirestoreManager:
         """
         try:
             doc_ref = self._public_collection().document(trip_id)
+            stamp = datetime.utcnow().isoformat()
             payload = {
                 "itinerary": self._sanitize_for_firestore(itinerary_data),
                 "request": self._sanitize_for_firestore(self._scrub_for_public(request_data)),
@@ -206,13 +209,13 @@ class FirestoreManager:
                 "thumbnail_photo_reference": thumbnail_photo_reference or "",
                 "destination_photos": list(destination_photos or []),
                 "source_trip_id": trip_id,
-                "updated_at": datetime.utcnow().isoformat(),
+                "updated_at": stamp,
                 "schema_version": 1,
             }
             # Upsert; add created_at if new
             snap = doc_ref.get()
             if not snap.exists:
-                payload["created_at"] = datetime.utcnow().isoformat()
+                payload["created_at"] = stamp
             doc_ref.set(payload, merge=True)
             self.logger.info(f"Saved public trip {trip_id} to Firestore")
             return True
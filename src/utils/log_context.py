@@ -0,0 +1,32 @@
+"""
+Per-request logging context built on contextvars.
+
+Fields bound with bind_log_context() are attached to every log record emitted in the
+same context (including asyncio tasks and asyncio.to_thread workers started from it),
+so trip-scoped logs don't need to repeat them in `extra=` dicts.
+"""
+import logging
+from contextvars import ContextVar, Token
+from typing import Any, Dict
+
+_log_context: ContextVar[Dict[str, Any]] = ContextVar("log_context", default={})
+
+
+def bind_log_context(**fields: Any) -> Token:
+    """Add fields to the current logging context. Pass the returned token to reset_log_context()."""
+    return _log_context.set({**_log_context.get(), **fields})
+
+
+def reset_log_context(token: Token) -> None:
+    """Restore the logging context that was active before the matching bind_log_context()."""
+    _log_context.reset(token)
+
+
+class LogContextFilter(logging.Filter):
+    """Copy bound context fields onto log records (explicit `extra=` values win)."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        for key, value in _log_context.get().items():
+            if not hasattr(record, key):
+                setattr(record, key, value)
+        return True
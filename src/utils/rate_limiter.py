@@ -0,0 +1,48 @@
+"""
+Token bucket rate limiter for outbound API calls.
+
+State is guarded by a threading.Lock rather than asyncio primitives so one limiter
+can be shared by the server event loop and the worker-thread event loops used for
+background trip generation.
+"""
+import asyncio
+import threading
+import time
+from typing import Optional
+
+
+class AsyncTokenBucket:
+    """Allow bursts up to `capacity` calls, refilling at `rate` tokens per second."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Take one token (possibly borrowing ahead) and return the seconds to wait for it."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1.0
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    async def acquire(self):
+        """Wait until a call is allowed under the configured rate."""
+        delay = self._reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
@@ -0,0 +1,86 @@
+import pytest
+
+from src.utils import circuit_breaker
+from src.utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+class _Clock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = _Clock()
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", fake)
+    return fake
+
+
+def _open(breaker: CircuitBreaker) -> None:
+    for _ in range(breaker.fail_max):
+        breaker.before_call()
+        breaker.record_failure()
+
+
+def test_opens_after_fail_max_consecutive_failures(clock):
+    breaker = CircuitBreaker("test", fail_max=3, reset_timeout=30.0)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+    breaker.before_call()  # still closed below fail_max
+    breaker.record_failure()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_success_resets_the_consecutive_count(clock):
+    breaker = CircuitBreaker("test", fail_max=3, reset_timeout=30.0)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.before_call()
+
+
+def test_fails_fast_until_reset_timeout(clock):
+    breaker = CircuitBreaker("test", fail_max=2, reset_timeout=30.0)
+    _open(breaker)
+    clock.now += 29.9
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_half_open_lets_a_single_trial_through(clock):
+    breaker = CircuitBreaker("test", fail_max=2, reset_timeout=30.0)
+    _open(breaker)
+    clock.now += 30.0
+    breaker.before_call()  # the trial
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_failed_trial_reopens_for_another_reset_timeout(clock):
+    breaker = CircuitBreaker("test", fail_max=2, reset_timeout=30.0)
+    _open(breaker)
+    clock.now += 30.0
+    breaker.before_call()
+    breaker.record_failure()
+    clock.now += 29.9
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    clock.now += 0.1
+    breaker.before_call()
+
+
+def test_successful_trial_closes_the_circuit(clock):
+    breaker = CircuitBreaker("test", fail_max=2, reset_timeout=30.0)
+    _open(breaker)
+    clock.now += 30.0
+    breaker.before_call()
+    breaker.record_success()
+    for _ in range(5):
+        breaker.before_call()
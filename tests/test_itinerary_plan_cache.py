@@ -0,0 +1,165 @@
+import asyncio
+import logging
+from datetime import date
+
+import pytest
+
+from src.models.request_models import TripPlanRequest, PreferencesModel
+from src.services import places_cache
+from src.services.itinerary_generator import ItineraryGeneratorService
+
+
+def _make_request(**overrides) -> TripPlanRequest:
+    data = dict(
+        origin="London, UK",
+        destination="Paris, France",
+        start_date=date(2024, 6, 15),
+        end_date=date(2024, 6, 18),
+        total_budget=3000.0,
+        budget_currency="USD",
+        group_size=2,
+        traveler_ages=[28, 30],
+        activity_level="moderate",
+        primary_travel_style="cultural",
+        preferences=PreferencesModel(
+            food_dining=4,
+            history_culture=5,
+            nature_wildlife=3,
+            nightlife_entertainment=2,
+            shopping=3,
+            art_museums=5,
+            beaches_water=1,
+            mountains_hiking=2,
+            architecture=4,
+            local_markets=4,
+            photography=4,
+            wellness_relaxation=3
+        ),
+        accommodation_type="hotel",
+    )
+    data.update(overrides)
+    return TripPlanRequest(**data)
+
+
+class _FakeGenerator(ItineraryGeneratorService):
+    """Plan cache/coalescing under test; generation itself is replaced by a minimal plan."""
+
+    def __init__(self):
+        self.logger = logging.getLogger("test.itinerary")
+        self.calls = []
+        self.release = None  # asyncio.Event the first generation waits on, if set
+        self.error = None
+
+    async def _generate_plan(self, request, trip_id):
+        self.calls.append(trip_id)
+        if self.release is not None and len(self.calls) == 1:
+            await self.release.wait()
+        if self.error is not None and len(self.calls) == 1:
+            raise self.error
+        plan = self._create_minimal_response(request, trip_id, "test")
+        return plan.model_copy(update={"version": f"v{len(self.calls)}"})
+
+    @staticmethod
+    def _is_cacheable_plan(trip_response):
+        return True
+
+
+@pytest.fixture(autouse=True)
+def _clear_plan_cache():
+    places_cache.clear_cache()
+    yield
+    places_cache.clear_cache()
+
+
+def test_cache_hit_reissues_plan_under_callers_trip_id():
+    gen = _FakeGenerator()
+
+    async def run():
+        first = await gen.generate_comprehensive_plan(_make_request(), "trip-1")
+        second = await gen.generate_comprehensive_plan(_make_request(destination="paris, FRANCE"), "trip-2")
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert gen.calls == ["trip-1"]
+    assert first.trip_id == "trip-1"
+    assert second.trip_id == "trip-2"
+    # Served from cache, but echoing this caller's spelling of the destination
+    assert second.destination == "paris, FRANCE"
+    assert second.version == first.version
+    # Reissued copies are independent of each other and of the cache entry
+    assert second is not first
+    second.packing_suggestions.append("umbrella")
+    assert first.packing_suggestions == []
+
+
+def test_use_cache_false_regenerates_and_replaces_entry():
+    gen = _FakeGenerator()
+
+    async def run():
+        await gen.generate_comprehensive_plan(_make_request(), "trip-1")
+        fresh = await gen.generate_comprehensive_plan(_make_request(), "trip-2", use_cache=False)
+        cached = await gen.generate_comprehensive_plan(_make_request(), "trip-3")
+        return fresh, cached
+
+    fresh, cached = asyncio.run(run())
+    assert gen.calls == ["trip-1", "trip-2"]
+    assert fresh.version == "v2"
+    assert cached.version == "v2"
+    assert cached.trip_id == "trip-3"
+
+
+def test_followers_join_in_flight_generation():
+    gen = _FakeGenerator()
+
+    async def run():
+        gen.release = asyncio.Event()
+        leader = asyncio.create_task(gen.generate_comprehensive_plan(_make_request(), "trip-1"))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(gen.generate_comprehensive_plan(_make_request(), "trip-2"))
+        await asyncio.sleep(0)
+        gen.release.set()
+        return await leader, await follower
+
+    leader, follower = asyncio.run(run())
+    assert gen.calls == ["trip-1"]
+    assert leader.trip_id == "trip-1"
+    assert follower.trip_id == "trip-2"
+    assert follower.version == leader.version
+
+
+def test_leader_failure_is_forwarded_to_followers():
+    gen = _FakeGenerator()
+    gen.error = ValueError("boom")
+
+    async def run():
+        gen.release = asyncio.Event()
+        leader = asyncio.create_task(gen.generate_comprehensive_plan(_make_request(), "trip-1"))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(gen.generate_comprehensive_plan(_make_request(), "trip-2"))
+        await asyncio.sleep(0)
+        gen.release.set()
+        return await asyncio.gather(leader, follower, return_exceptions=True)
+
+    leader, follower = asyncio.run(run())
+    assert isinstance(leader, ValueError)
+    assert isinstance(follower, ValueError)
+    assert gen.calls == ["trip-1"]
+
+
+def test_cancelled_leader_lets_followers_generate_themselves():
+    gen = _FakeGenerator()
+
+    async def run():
+        gen.release = asyncio.Event()
+        leader = asyncio.create_task(gen.generate_comprehensive_plan(_make_request(), "trip-1"))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(gen.generate_comprehensive_plan(_make_request(), "trip-2"))
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    follower = asyncio.run(run())
+    assert gen.calls == ["trip-1", "trip-2"]
+    assert follower.trip_id == "trip-2"
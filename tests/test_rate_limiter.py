@@ -0,0 +1,42 @@
+import asyncio
+
+import pytest
+
+from src.utils import rate_limiter
+from src.utils.rate_limiter import AsyncTokenBucket
+
+
+@pytest.fixture
+def fake_time(monkeypatch):
+    """Frozen monotonic clock; asyncio.sleep records the delay and advances the clock."""
+    state = {"now": 1000.0, "sleeps": []}
+
+    async def fake_sleep(delay):
+        state["sleeps"].append(delay)
+        state["now"] += delay
+
+    monkeypatch.setattr(rate_limiter.time, "monotonic", lambda: state["now"])
+    monkeypatch.setattr(rate_limiter.asyncio, "sleep", fake_sleep)
+    return state
+
+
+def test_burst_up_to_capacity_does_not_wait(fake_time):
+    bucket = AsyncTokenBucket(rate=5.0, capacity=3.0)
+
+    async def run():
+        for _ in range(3):
+            await bucket.acquire()
+
+    asyncio.run(run())
+    assert fake_time["sleeps"] == []
+
+
+def test_acquire_past_capacity_waits_one_refill_interval(fake_time):
+    bucket = AsyncTokenBucket(rate=5.0, capacity=3.0)
+
+    async def run():
+        for _ in range(4):
+            await bucket.acquire()
+
+    asyncio.run(run())
+    assert fake_time["sleeps"] == [pytest.approx(1 / 5.0)]
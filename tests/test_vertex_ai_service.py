@@ -0,0 +1,59 @@
+import asyncio
+import logging
+import weakref
+
+import vertexai
+
+from src.services.vertex_ai_service import VertexAIService
+
+
+def _bare_service() -> VertexAIService:
+    """Service with only the per-loop model state close() touches (no Vertex init)."""
+    service = VertexAIService.__new__(VertexAIService)
+    service.logger = logging.getLogger("test.vertex")
+    service._async_models = weakref.WeakKeyDictionary()
+    return service
+
+
+def test_close_closes_the_sdk_async_transport(monkeypatch):
+    # Uses the real SDK model, so a rename of its private async client attribute fails here
+    from google.auth.credentials import AnonymousCredentials
+    vertexai.init(project="test-project", location="us-central1", credentials=AnonymousCredentials())
+    service = _bare_service()
+
+    async def run():
+        model = service._get_async_model()
+        transport = model._prediction_async_client.transport
+        closed = []
+        original_close = transport.close
+
+        async def spy_close():
+            closed.append(True)
+            await original_close()
+
+        monkeypatch.setattr(transport, "close", spy_close)
+        await service.close()
+        return closed, service._async_models.get(asyncio.get_running_loop())
+
+    closed, remaining = asyncio.run(run())
+    assert closed == [True]
+    assert remaining is None
+
+
+def test_close_warns_when_no_transport_is_found(caplog):
+    service = _bare_service()
+
+    async def run():
+        service._async_models[asyncio.get_running_loop()] = object()
+        with caplog.at_level(logging.WARNING, logger="test.vertex"):
+            await service.close()
+
+    asyncio.run(run())
+    assert "no gRPC transport" in caplog.text
+
+
+def test_close_without_a_model_is_a_no_op(caplog):
+    service = _bare_service()
+    with caplog.at_level(logging.WARNING, logger="test.vertex"):
+        asyncio.run(service.close())
+    assert caplog.text == ""